@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zipfile
+
+import aiohttp
+
+from logs import log
+from storage import atomic_write
+
+
+# Formats déjà compressés : les recompresser en DEFLATE ne fait que coûter du CPU
+ALREADY_COMPRESSED = {"png", "gif", "webp", "jpg"}
+
+
+def extension_for(content_type):
+    if "gif" in content_type:
+        return "gif"
+    if "webp" in content_type:
+        return "webp"
+    if "jpeg" in content_type or "jpg" in content_type:
+        return "jpg"
+    return "png"
+
+
+def avatar_filename(member, ext):
+    # sanitize filename
+    name = re.sub(r"[^\w\-_. ]", "", member.display_name)[:50] or str(member.id)
+    return f"{name}_{member.id}.{ext}"
+
+
+class ZipWriter(threading.Thread):
+    """Écrit les fichiers reçus dans le ZIP depuis un thread dédié, hors de la boucle asyncio."""
+
+    _DONE = object()
+
+    def __init__(self, path, maxsize=0):
+        super().__init__(name="avatars-zip", daemon=True)
+        self.path = path
+        # File bornée : les producteurs attendent l'écriture au lieu d'accumuler les avatars en mémoire
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.written = 0
+        self.missing = 0  # fichiers du cache disparus avant d'être lus (éviction, suppression)
+
+    async def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # File pleine : attente dans un thread, sans bloquer la boucle asyncio
+            await asyncio.get_running_loop().run_in_executor(None, self.queue.put, item)
+
+    async def put(self, filename, content, ext):
+        await self._put((filename, content, ext, None))
+
+    async def put_file(self, filename, path, ext):
+        """Ajoute un fichier déjà sur disque (lu depuis le thread d'écriture)"""
+        await self._put((filename, None, ext, path))
+
+    async def close(self):
+        await self._put(self._DONE)
+
+    def run(self):
+        try:
+            with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as zf:
+                while True:
+                    item = self.queue.get()
+                    if item is self._DONE:
+                        break
+                    filename, content, ext, path = item
+                    if content is None:
+                        try:
+                            with open(path, "rb") as f:
+                                content = f.read()
+                        except OSError:
+                            self.missing += 1
+                            continue
+                    compress = zipfile.ZIP_STORED if ext in ALREADY_COMPRESSED else zipfile.ZIP_DEFLATED
+                    zf.writestr(filename, content, compress_type=compress)
+                    self.written += 1
+        except Exception as e:
+            self.error = e
+            # Vider la file pour ne pas bloquer les producteurs
+            while self.queue.get() is not self._DONE:
+                pass
+
+
+class AvatarCache:
+    """Cache disque des avatars, indexé par le hash d'avatar Discord (`Asset.key`).
+
+    Un avatar dont le hash n'a pas changé est relu depuis le disque au lieu
+    d'être retéléchargé. Les avatars par défaut partagent la même clé. Le
+    cache est borné à `max_bytes`, en évinçant les entrées les moins récemment
+    utilisées ; l'index est sauvegardé dans `index.json`.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    entries = json.load(f)
+                entries = {key: e for key, e in entries.items()
+                           if isinstance(e.get("used"), (int, float)) and isinstance(e.get("size"), int) and e.get("ext")}
+            except (OSError, ValueError, AttributeError) as e:
+                # Index illisible : on repart d'un cache vide, les fichiers seront réécrits au fil des exports
+                log("avatars.cache", "Index du cache d'avatars illisible, cache réinitialisé", path=self.index_path,
+                    error=repr(e), level=logging.WARNING)
+                entries = {}
+        # Ordre LRU : du moins au plus récemment utilisé
+        self.entries = dict(sorted(entries.items(), key=lambda x: x[1]["used"]))
+        self.total_bytes = sum(e["size"] for e in self.entries.values())
+        self._writing = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # La limite a pu baisser depuis le dernier lancement
+        self._evict()
+
+    @staticmethod
+    def key_for(member):
+        return member.display_avatar.key
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def lookup(self, key):
+        """(chemin, extension) si l'avatar est en cache, sinon None"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        path = self._path(key, entry["ext"])
+        if not os.path.exists(path):
+            # Fichier supprimé hors du cache : l'entrée est oubliée et l'avatar retéléchargé
+            self.total_bytes -= entry["size"]
+            self.misses += 1
+            return None
+        entry["used"] = time.time()
+        self.entries[key] = entry
+        self.hits += 1
+        return path, entry["ext"]
+
+    def _write_file(self, path, content):
+        with open(path, "wb") as f:
+            f.write(content)
+
+    async def store(self, key, content, ext):
+        if key in self._writing:
+            return  # même avatar déjà en cours d'écriture par un autre worker
+        # Retirer l'ancienne entrée avant d'écrire, pour qu'une éviction ne supprime pas le nouveau fichier
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old["size"]
+        self._writing.add(key)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_file, self._path(key, ext), content)
+        finally:
+            self._writing.discard(key)
+        self.entries[key] = {"ext": ext, "size": len(content), "used": time.time()}
+        self.total_bytes += len(content)
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            entry = self.entries.pop(key)
+            self.total_bytes -= entry["size"]
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key, entry["ext"]))
+            except OSError:
+                pass
+
+    async def save(self):
+        payload = json.dumps(self.entries)
+        await asyncio.get_running_loop().run_in_executor(None, atomic_write, self.index_path, payload)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class AvatarArchiver:
+    """Téléchargement concurrent des avatars vers un ZIP.
+
+    `concurrency` téléchargements au plus en parallèle (workers et pool de
+    connexions par hôte bornés), avec reprise et backoff exponentiel sur 429/5xx.
+    Les fichiers sont transmis au fur et à mesure à un ZipWriter. Avec un
+    AvatarCache, seuls les avatars nouveaux ou modifiés sont téléchargés ; en
+    mode `cache_only`, le ZIP est construit sans aucun accès réseau.
+    """
+
+    def __init__(self, concurrency=8, max_retries=4, backoff=0.5, progress_interval=2.0,
+                 cache=None, cache_only=False):
+        self.cache = cache
+        self.cache_only = cache_only
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress_interval = progress_interval
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.from_cache = 0
+        self.skipped = 0
+
+    async def _download(self, session, url):
+        """Renvoie (contenu, extension) ou None si l'avatar est indisponible"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.get(url) as resp:
+                    if resp.status == 200:
+                        return await resp.read(), extension_for(resp.headers.get("Content-Type", ""))
+                    if resp.status != 429 and resp.status < 500:
+                        return None
+                    retry_after = resp.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                retry_after = None
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            delay = float(retry_after) if retry_after else self.backoff * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, self.backoff))
+        return None
+
+    async def archive(self, members, out_path, progress=None):
+        """Construit le ZIP ; `progress(fait, total)` est appelé au plus toutes les progress_interval secondes"""
+        members = list(members)
+        total = len(members)
+        writer = ZipWriter(out_path, maxsize=2 * self.concurrency)
+        writer.start()
+        pending = iter(members)
+        last_progress = time.monotonic()
+
+        async def report():
+            nonlocal last_progress
+            now = time.monotonic()
+            if progress is None or now - last_progress < self.progress_interval:
+                return
+            last_progress = now
+            try:
+                await progress(self.done, total)
+            except Exception:
+                pass
+
+        async def worker(session):
+            for m in pending:
+                self.done += 1
+                key = self.cache.key_for(m) if self.cache is not None else None
+                cached = self.cache.lookup(key) if key is not None else None
+                if cached is not None:
+                    path, ext = cached
+                    await writer.put_file(avatar_filename(m, ext), path, ext)
+                    self.from_cache += 1
+                elif self.cache_only:
+                    self.skipped += 1
+                else:
+                    url = str(m.display_avatar.url)
+                    result = await self._download(session, url) if url else None
+                    if result is None:
+                        self.failed += 1
+                    else:
+                        content, ext = result
+                        await writer.put(avatar_filename(m, ext), content, ext)
+                        if key is not None:
+                            await self.cache.store(key, content, ext)
+                await report()
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        try:
+            async with aiohttp.ClientSession(connector=connector) as session:
+                # Les workers se partagent un même itérateur : au plus `concurrency` requêtes en vol
+                await asyncio.gather(*(worker(session) for _ in range(min(self.concurrency, total) or 1)))
+        finally:
+            await writer.close()
+            await asyncio.get_running_loop().run_in_executor(None, writer.join)
+            if self.cache is not None:
+                await self.cache.save()
+        if writer.error is not None:
+            raise writer.error
+        # Un fichier évincé entre la consultation du cache et sa lecture par le ZipWriter manque au ZIP
+        self.from_cache -= writer.missing
+        self.failed += writer.missing
+        return {
+            "members": total,
+            "written": writer.written,
+            "from_cache": self.from_cache,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
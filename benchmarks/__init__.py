@@ -0,0 +1 @@
+"""Mesures de performance hors Discord (`python -m benchmarks.<nom>`)."""
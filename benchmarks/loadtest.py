@@ -0,0 +1,405 @@
+"""Charge simulée sur les vrais handlers de bot.py, sans connexion à Discord.
+
+    python -m benchmarks.loadtest --users 2000 --concurrency 200 --interactions 20000
+
+Des joueurs virtuels enchaînent /blackjack (jusqu'à la fin de la main),
+/roulette (case, mise, lancer), /slots, /daily, /leaderboard, /voc et des
+entrées/sorties de vocal. Le scénario `table` (hors mélange par défaut) mise
+sur la table de roulette partagée du salon, tirée toutes les `--table-window`
+secondes : à comparer avec `--scenarios roulette`. `Interaction`, `Member`, `Guild` et les événements
+vocaux sont remplacés par des objets factices ; les réponses à Discord sont
+sérialisées (embeds, composants) puis attendent `--rest-ms` millisecondes,
+inclus dans les latences des handlers. Le blocage de la boucle est mesuré par
+une sonde qui se réveille toutes les `--stall-interval` millisecondes.
+Les données sont écrites dans un dossier temporaire, jamais dans data.json.
+"""
+import argparse
+import asyncio
+import datetime
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Poids des scénarios par défaut (proportion des interactions)
+MIX = {
+    "blackjack": 25,
+    "roulette": 15,
+    "slots": 25,
+    "daily": 10,
+    "leaderboard": 5,
+    "voc": 5,
+    "voice": 15,
+    "table": 15,
+}
+DEFAULT_SCENARIOS = [name for name in MIX if name != "table"]
+
+
+# ---------------- Objets Discord factices ----------------
+class FakeMessage:
+    def __init__(self, harness):
+        self.harness = harness
+        self.jump_url = "https://discord.com/channels/0/0/0"
+
+    async def edit(self, **payload):
+        await self.harness.rest(payload)
+        return self
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _send(self, payload):
+        if self._done:
+            raise RuntimeError("interaction déjà répondue")
+        self._done = True
+        # Vue jointe à la réponse : le joueur virtuel clique ensuite sur ses composants
+        self.interaction.view = payload.get("view")
+        await self.interaction.harness.rest(payload)
+
+    async def send_message(self, content=None, **payload):
+        await self._send(payload)
+
+    async def edit_message(self, **payload):
+        await self._send(payload)
+
+    async def defer(self, **payload):
+        await self._send(payload)
+
+
+class FakeFollowup:
+    def __init__(self, harness):
+        self.harness = harness
+
+    async def send(self, content=None, **payload):
+        await self.harness.rest(payload)
+        return FakeMessage(self.harness)
+
+
+class FakeMember:
+    def __init__(self, user_id, guild):
+        self.id = user_id
+        self.guild = guild
+        self.name = f"joueur{user_id % 100000}"
+        self.display_name = self.name
+        self.global_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.roles = []
+        self.guild_permissions = SimpleNamespace(administrator=False)
+
+
+class FakeGuild:
+    def __init__(self, guild_id, member_ids):
+        self.id = guild_id
+        self.name = "Serveur de charge"
+        self._members = {uid: FakeMember(uid, self) for uid in member_ids}
+        self.voice_channels = []
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeInteraction:
+    def __init__(self, harness, member, data=None):
+        self.harness = harness
+        self.user = member
+        self.guild = member.guild
+        self.guild_id = member.guild.id
+        self.channel_id = member.guild.id + 2
+        self.data = data or {}
+        self.view = None
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(harness)
+
+    async def original_response(self):
+        return FakeMessage(self.harness)
+
+    async def edit_original_response(self, **payload):
+        await self.harness.rest(payload)
+
+
+class VoiceChannel:
+    def __init__(self, guild):
+        self.guild = guild
+        self.id = guild.id + 1
+
+
+# ---------------- Mesures ----------------
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def watch_loop(interval, stalls):
+    """Retard de réveil de la boucle : tout ce qui dépasse `interval` est du temps bloqué"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        stalls.append(max(loop.time() - start - interval, 0.0))
+
+
+class Harness:
+    def __init__(self, bot, users, rest_ms, seed):
+        self.bot = bot
+        self.rest_delay = rest_ms / 1000
+        self.rng = random.Random(seed)
+        self.guild = FakeGuild(10**17, [10**17 + 1 + i for i in range(users)])
+        self.members = self.guild.members
+        self.channel = VoiceChannel(self.guild)
+        self.in_voice = set()
+        self.tables = []
+        self.rest_calls = 0
+        self.latencies = {}  # scénario -> [ms]
+        self.handlers = {}   # handler -> [ms]
+
+    async def rest(self, payload):
+        """Aller-retour REST simulé : sérialisation comme discord.py, puis attente réseau"""
+        self.rest_calls += 1
+        embed = payload.get("embed")
+        if embed is not None:
+            embed.to_dict()
+        view = payload.get("view")
+        if view is not None:
+            view.to_components()
+        # Même à 0 ms, rend la main à la boucle comme le ferait un vrai appel réseau
+        await asyncio.sleep(self.rest_delay)
+
+    async def call(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self.handlers.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+    def interaction(self, member, **data):
+        return FakeInteraction(self, member, data)
+
+    # ---- Scénarios ----
+    async def blackjack(self, member, bet):
+        interaction = self.interaction(member)
+        await self.call("/blackjack", self.bot.blackjack.callback, interaction, mise=bet)
+        view = interaction.view
+        while view is not None and not view.game.finished:
+            button = view.hit if view.game.hand.total < 17 else view.stand
+            await self.call(f"blackjack.{button.label.split()[0].lower()}", button.callback, self.interaction(member))
+        if view is not None:
+            view.stop()
+
+    async def roulette(self, member, bet):
+        interaction = self.interaction(member)
+        await self.call("/roulette", self.bot.roulette.callback, interaction)
+        view = interaction.view
+        if view is None:
+            return
+        for _ in range(self.rng.randint(1, 3)):
+            case = self.rng.choice([opt.value for opt in view.case_select.options])
+            await self.call("roulette.case", view.case_callback, self.interaction(member, values=[case]))
+            view.mise_select._values = [self.rng.choice([opt.value for opt in view.mise_select.options])]
+            await self.call("roulette.mise", view.mise_callback, self.interaction(member))
+        await self.call("roulette.launch", view.launch_callback, self.interaction(member))
+        view.stop()
+
+    async def table(self, member, bet):
+        """Mises sur la table du salon ; la première arrivée l'ouvre"""
+        bot = self.bot
+        table = bot.roulette_tables.get(self.guild.id + 2)
+        if table is None or table.closed:
+            await self.call("/roulette_table", bot.roulette_table.callback, self.interaction(member))
+            table = bot.roulette_tables.get(self.guild.id + 2)
+            self.tables.append(table)
+        view = table.view
+        for _ in range(self.rng.randint(1, 3)):
+            case = self.rng.choice([opt.value for opt in view.case_select.options])
+            await self.call("roulette_table.case", view.case_callback, self.interaction(member, values=[case]))
+            mise = self.rng.choice([opt.value for opt in view.mise_select.options])
+            await self.call("roulette_table.mise", view.mise_callback, self.interaction(member, values=[mise]))
+
+    async def slots(self, member, bet):
+        await self.call("/slots", self.bot.slots.callback, self.interaction(member), mise=bet)
+
+    async def daily(self, member, bet):
+        await self.call("/daily", self.bot.daily.callback, self.interaction(member))
+
+    async def leaderboard(self, member, bet):
+        await self.call("/leaderboard", self.bot.leaderboard.callback, self.interaction(member))
+
+    async def voc(self, member, bet):
+        await self.call("/voc", self.bot.voc.callback, self.interaction(member), user=None)
+
+    async def voice(self, member, bet):
+        """Entrée ou sortie de vocal (événement gateway)"""
+        inside = member.id in self.in_voice
+        before = SimpleNamespace(channel=self.channel if inside else None)
+        after = SimpleNamespace(channel=None if inside else self.channel)
+        (self.in_voice.discard if inside else self.in_voice.add)(member.id)
+        await self.call("on_voice_state_update", self.bot.on_voice_state_update, member, before, after)
+
+    async def player(self, queue, scenarios, weights, bet):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            scenario = self.rng.choices(scenarios, weights)[0]
+            member = self.rng.choice(self.members)
+            start = time.perf_counter()
+            await getattr(self, scenario)(member, bet)
+            self.latencies.setdefault(scenario, []).append((time.perf_counter() - start) * 1000)
+
+
+def load_bot(workdir, backend, table_window):
+    """Importe bot.py avec des fichiers de données isolés dans `workdir`"""
+    env = {
+        "STORAGE_BACKEND": backend,
+        "DATA_FILE": os.path.join(workdir, "data.json"),
+        "DATA_JOURNAL": os.path.join(workdir, "ledger.jsonl"),
+        "SQLITE_FILE": os.path.join(workdir, "data.db"),
+        "VOICE_CHECKPOINT_FILE": os.path.join(workdir, "voice_sessions.json"),
+        "COMMAND_SNAPSHOT_FILE": os.path.join(workdir, "command_sync.json"),
+        "AVATAR_CACHE_DIR": os.path.join(workdir, "avatar_cache"),
+        "LOG_FILE": os.path.join(workdir, "bot.log"),
+        "LOG_CONSOLE": "0",
+        "METRICS_PORT": "0",
+        "ROULETTE_TABLE_WINDOW": str(table_window),
+        "ROULETTE_TABLE_REFRESH": str(min(table_window, 3.0)),
+        "SHARD_COUNT": "0",
+        "SHARD_IDS": "",
+    }
+    os.environ.update(env)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return importlib.import_module("bot")
+
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+async def run(args, workdir):
+    bot = load_bot(workdir, args.backend, args.table_window)
+    if args.seed is not None:
+        random.seed(args.seed)
+        bot.blackjack_shoe = bot.blackjack_game.Shoe(seed=args.seed)
+    harness = Harness(bot, args.users, args.rest_ms, args.seed)
+
+    bot.store.start()
+    journal = getattr(bot.store, "journal", None)
+    journal_before = journal.seq if journal is not None else 0
+    stalls = []
+    watcher = asyncio.get_running_loop().create_task(watch_loop(args.stall_interval / 1000, stalls))
+
+    mix = {name: weight for name, weight in MIX.items() if name in args.scenarios}
+    queue = asyncio.Queue()
+    for _ in range(args.interactions):
+        queue.put_nowait(None)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(harness.player(queue, list(mix), list(mix.values()), args.bet)
+                               for _ in range(args.concurrency)))
+        # Tables encore ouvertes : leur tirage fait partie de la charge
+        await asyncio.gather(*(table.task for table in harness.tables if table is not None and table.task))
+        elapsed = time.perf_counter() - start
+        await bot.store.flush(force=True)
+    finally:
+        watcher.cancel()
+    store_stats = bot.store.stats()
+    bot.store.close()
+
+    handled = sum(len(v) for v in harness.handlers.values())
+    threshold = args.stall_interval / 1000
+    return {
+        "params": {"users": args.users, "concurrency": args.concurrency, "scenarios": args.interactions,
+                   "rest_ms": args.rest_ms, "backend": args.backend, "seed": args.seed},
+        "elapsed_s": round(elapsed, 3),
+        "scenarios_per_sec": round(args.interactions / elapsed, 1),
+        "interactions": handled,
+        "interactions_per_sec": round(handled / elapsed, 1),
+        "rest_calls": harness.rest_calls,
+        "latency": summarize([ms for values in harness.handlers.values() for ms in values]),
+        "handlers": {name: summarize(values) for name, values in sorted(harness.handlers.items())},
+        "scenario_latency": {name: summarize(values) for name, values in sorted(harness.latencies.items())},
+        "persistence": {
+            "flushes": store_stats["flushes"],
+            "coalesced": store_stats["coalesced"],
+            "journal_entries": journal.seq - journal_before if journal is not None else None,
+            "last_flush_ms": store_stats["last_flush_ms"],
+        },
+        "loop": {
+            "stall_ms": round(sum(stalls) * 1000, 1),
+            "max_stall_ms": round(max(stalls, default=0.0) * 1000, 1),
+            "stalls_over_interval": sum(1 for s in stalls if s > threshold),
+        },
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="membres du serveur factice")
+    parser.add_argument("--concurrency", type=int, default=100, help="joueurs virtuels simultanés")
+    parser.add_argument("--interactions", type=int, default=10_000, help="scénarios joués au total")
+    parser.add_argument("--scenarios", nargs="+", choices=list(MIX), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--rest-ms", type=float, default=20.0, help="latence simulée de chaque appel REST")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--table-window", type=float, default=2.0,
+                        help="fenêtre de mises de la table de roulette (s)")
+    parser.add_argument("--stall-interval", type=float, default=10.0, metavar="MS",
+                        help="période de la sonde de blocage de la boucle")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="casino_loadtest_") as workdir:
+        result = asyncio.run(run(args, workdir))
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    lat, persistence, loop = result["latency"], result["persistence"], result["loop"]
+    print(f"{result['interactions']:,} interactions en {result['elapsed_s']:.2f}s "
+          f"({result['interactions_per_sec']:,.0f}/s, {result['scenarios_per_sec']:,.0f} scénarios/s), "
+          f"{result['rest_calls']:,} appels REST")
+    print(f"latence handlers : p50 {lat['p50_ms']:.2f} ms, p99 {lat['p99_ms']:.2f} ms, max {lat['max_ms']:.2f} ms")
+    journal = persistence["journal_entries"]
+    print(f"persistance : {persistence['flushes']} écritures ({persistence['coalesced']} regroupées)"
+          + (f", {journal} entrées de journal" if journal is not None else ""))
+    print(f"boucle : {loop['stall_ms']:.0f} ms bloquée au total, pire blocage {loop['max_stall_ms']:.1f} ms")
+    print()
+    print(f"{'handler':<24}{'n':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in result["handlers"].items():
+        print(f"{name:<24}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
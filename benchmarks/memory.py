@@ -0,0 +1,149 @@
+"""Mémoire et temps d'accès : dicts de data.json contre UserRecords.
+
+    python -m benchmarks.memory --users 100000
+
+Les deux représentations sont construites depuis le même data.json synthétique
+(snowflakes réalistes, tous avec un solde, une partie avec daily et temps
+vocal) ; la mémoire est mesurée avec tracemalloc une fois le JSON libéré.
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from records import UserRecords
+
+
+def synthetic_layout(users, seed=None, daily_ratio=0.6, voc_ratio=0.4, live_ratio=0.01):
+    """Sections bank/daily/voc de data.json pour `users` utilisateurs"""
+    rng = random.Random(seed)
+    now = time.time()
+    bank, daily, voc = {}, {}, {}
+    for _ in range(users):
+        uid = str(rng.randrange(10**17, 2**63))
+        bank[uid] = rng.randrange(0, 50_000)
+        if rng.random() < daily_ratio:
+            daily[uid] = now - rng.uniform(0, 30 * 86400)
+        if rng.random() < voc_ratio:
+            live = rng.random() < live_ratio
+            voc[uid] = {"total": rng.randrange(0, 10**6), "last_join": now if live else None}
+    return {"bank": bank, "daily": daily, "voc": voc}
+
+
+def load_dicts(raw):
+    data = json.loads(raw)
+    return data["bank"], data["daily"], data["voc"]
+
+
+def load_records(raw):
+    data = json.loads(raw)
+    return UserRecords.from_layout(data["bank"], data["daily"], data["voc"])
+
+
+def traced_size(build, raw):
+    """Octets encore alloués par le résultat de `build(raw)`"""
+    gc.collect()
+    tracemalloc.start()
+    result = build(raw)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def per_second(func, ids, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ids)
+        best = min(best, time.perf_counter() - start)
+    return len(ids) / best if best else 0.0
+
+
+def run(users, seed=None):
+    layout = synthetic_layout(users, seed)
+    raw = json.dumps(layout)
+    ids = [int(uid) for uid in layout["bank"]]
+    random.Random(seed).shuffle(ids)
+    del layout
+
+    dict_bytes, (bank, daily, voc) = traced_size(load_dicts, raw)
+    record_bytes, records = traced_size(load_records, raw)
+
+    # Chemins chauds : get_balance, get_daily (cooldown) et le relevé des sessions vocales
+    def dict_balance(ids):
+        for uid in ids:
+            bank.get(str(uid))
+
+    def record_balance(ids):
+        get = records.get
+        for uid in ids:
+            rec = get(uid)
+            rec.balance if rec is not None else None
+
+    def dict_daily(ids):
+        for uid in ids:
+            daily.get(str(uid))
+
+    def record_daily(ids):
+        get = records.get
+        for uid in ids:
+            rec = get(uid)
+            rec.last_daily if rec is not None else None
+
+    def dict_sessions(ids):
+        {int(uid): d["last_join"] for uid, d in voc.items() if d.get("last_join")}
+
+    def record_sessions(ids):
+        {uid: rec.voc_join for uid, rec in records.items() if rec.voc_join}
+
+    ops = {}
+    for name, old, new in (("balance", dict_balance, record_balance),
+                           ("daily", dict_daily, record_daily),
+                           ("voc_sessions", dict_sessions, record_sessions)):
+        scale = 1 if name != "voc_sessions" else len(ids)
+        ops[name] = {"dicts": per_second(old, ids) / scale, "records": per_second(new, ids) / scale}
+
+    return {
+        "users": users,
+        "seed": seed,
+        "json_bytes": len(raw),
+        "memory": {
+            "dicts": dict_bytes,
+            "records": record_bytes,
+            "saved": 1 - record_bytes / dict_bytes if dict_bytes else 0.0,
+        },
+        "ops_per_sec": ops,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.memory", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.users, args.seed)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    mem = result["memory"]
+    print(f"{result['users']:,} utilisateurs, data.json de {result['json_bytes'] / 2**20:.1f} Mo")
+    print(f"{'mémoire':<16}{'dicts':>14}{'records':>14}{'gain':>8}")
+    print(f"{'':<16}{mem['dicts'] / 2**20:>11.1f} Mo{mem['records'] / 2**20:>11.1f} Mo{mem['saved']:>8.0%}")
+    print()
+    print(f"{'accès/s':<16}{'dicts':>14}{'records':>14}{'ratio':>8}")
+    for name, rates in result["ops_per_sec"].items():
+        ratio = rates["records"] / rates["dicts"] if rates["dicts"] else 0.0
+        print(f"{name:<16}{rates['dicts']:>14,.0f}{rates['records']:>14,.0f}{ratio:>7.1f}x")
+    print("(voc_sessions : relevés complets par seconde)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Coût de la persistance selon la taille des données et le format.
+
+    python -m benchmarks.persistence --users 1000 10000 100000 1000000 --json > persistence.json
+
+Pour chaque taille, un data.json synthétique (voir benchmarks.memory) est
+écrit puis relu dans chaque format de snapshot : JSON indent=4 (format
+actuel), JSON compact, pickle et SQLite. Sont mesurés le temps de
+sérialisation, l'écriture atomique (fsync compris), la taille du fichier, la
+relecture, le pic mémoire (tracemalloc, mesuré à part) et le chargement par
+le store au démarrage du bot. Les écritures incrémentales (journal des soldes,
+transaction SQLite) sont comparées à une réécriture complète pour
+`--changes` utilisateurs modifiés entre deux sauvegardes.
+"""
+import argparse
+import gc
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.memory import synthetic_layout
+from storage import JsonStore, Journal, SqliteStore, atomic_write
+
+
+def _json_indent(data):
+    return json.dumps(data, indent=4)
+
+
+def _json_compact(data):
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _write_text(path, payload):
+    atomic_write(path, payload)
+
+
+def _write_bytes(path, payload):
+    # atomic_write n'écrit que du texte : même séquence temporaire + fsync + rename en binaire
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _read_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# nom -> (extension, sérialisation, écriture, relecture)
+FORMATS = {
+    "json_indent": (".json", _json_indent, _write_text, _read_json),
+    "json_compact": (".json", _json_compact, _write_text, _read_json),
+    "pickle": (".pickle", lambda data: pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), _write_bytes, _read_pickle),
+}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def peak_bytes(func, *args):
+    """Pic d'allocation pendant `func(*args)` (le résultat est libéré avant de rendre la main)"""
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def sqlite_snapshot(path, data):
+    """Réécriture complète de la base, comme `storage.migrate_json_to_sqlite`"""
+    if os.path.exists(path):
+        os.unlink(path)
+    store = SqliteStore(path)
+    db = store.db
+    db.execute("BEGIN IMMEDIATE")
+    db.executemany("INSERT INTO bank (user_id, balance) VALUES (?, ?)",
+                   ((int(uid), balance) for uid, balance in data["bank"].items()))
+    db.executemany("INSERT INTO daily (user_id, last_claim) VALUES (?, ?)",
+                   ((int(uid), ts) for uid, ts in data["daily"].items()))
+    db.executemany("INSERT INTO voc (user_id, total, last_join) VALUES (?, ?, ?)",
+                   ((int(uid), d["total"], d["last_join"]) for uid, d in data["voc"].items()))
+    db.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",
+                   ((key, json.dumps(value)) for key, value in data["settings"].items()))
+    db.execute("COMMIT")
+    store.close()
+
+
+def sqlite_read(path):
+    store = SqliteStore(path)
+    rows = {table: store.db.execute(f"SELECT * FROM {table}").fetchall() for table in ("bank", "daily", "voc")}
+    store.close()
+    return rows
+
+
+def bench_formats(data, workdir, repeat):
+    results = {}
+    for name, (ext, serialize, write, read) in FORMATS.items():
+        path = os.path.join(workdir, f"{name}{ext}")
+        serialize_s = min(timed(serialize, data)[0] for _ in range(repeat))
+        payload = serialize(data)
+        write_s = min(timed(write, path, payload)[0] for _ in range(repeat))
+        load_s = min(timed(read, path)[0] for _ in range(repeat))
+        results[name] = {
+            "serialize_s": serialize_s,
+            "write_s": write_s,
+            "size_bytes": os.path.getsize(path),
+            "load_s": load_s,
+            "serialize_peak_bytes": peak_bytes(serialize, data),
+            "load_peak_bytes": peak_bytes(read, path),
+        }
+        del payload
+
+    path = os.path.join(workdir, "snapshot.db")
+    write_s = min(timed(sqlite_snapshot, path, data)[0] for _ in range(repeat))
+    results["sqlite"] = {
+        "serialize_s": None,
+        "write_s": write_s,
+        "size_bytes": os.path.getsize(path),
+        "load_s": min(timed(sqlite_read, path)[0] for _ in range(repeat)),
+        "serialize_peak_bytes": None,
+        "load_peak_bytes": peak_bytes(sqlite_read, path),
+    }
+    return results
+
+
+def bench_startup(workdir):
+    """Chargement par les stores du bot (JsonStore : parse + enregistrements + classements)"""
+    json_path = os.path.join(workdir, "json_indent.json")
+    json_s, store = timed(JsonStore, json_path)
+    store.close()
+    sqlite_s, store = timed(SqliteStore, os.path.join(workdir, "snapshot.db"))
+    store.close()
+    return {
+        "json_store_s": json_s,
+        "json_store_peak_bytes": peak_bytes(lambda: JsonStore(json_path)),
+        "sqlite_store_s": sqlite_s,
+    }
+
+
+def bench_incremental(data, workdir, changes):
+    """Sauvegarde après `changes` variations de solde : snapshot complet contre écritures incrémentales"""
+    user_ids = list(data["bank"])[:changes]
+    results = {}
+
+    def full_rewrite():
+        for uid in user_ids:
+            data["bank"][uid] += 1
+        atomic_write(os.path.join(workdir, "json_indent.json"), _json_indent(data))
+
+    results["full_json_indent_s"] = timed(full_rewrite)[0]
+
+    journal = Journal(os.path.join(workdir, "ledger.jsonl"))
+
+    def append_journal():
+        # Comme en production : chaque ligne est vidée vers l'OS, sans fsync
+        for uid in user_ids:
+            journal.append(uid, 1, "bench")
+
+    results["journal_s"] = timed(append_journal)[0]
+    journal.close()
+
+    store = SqliteStore(os.path.join(workdir, "snapshot.db"))
+
+    def sqlite_transaction():
+        for uid in user_ids:
+            store.apply_delta(int(uid), 1, "bench")
+        store.flush_sync()  # COMMIT puis fermeture
+
+    results["sqlite_transaction_s"] = timed(sqlite_transaction)[0]
+    results["changes"] = len(user_ids)
+    return results
+
+
+def run(sizes, changes, repeat, seed):
+    runs = []
+    for users in sizes:
+        data = synthetic_layout(users, seed)
+        data["settings"] = {"voc_role_rules": []}
+        with tempfile.TemporaryDirectory(prefix="casino_persistence_") as workdir:
+            formats = bench_formats(data, workdir, repeat)
+            startup = bench_startup(workdir)
+            incremental = bench_incremental(data, workdir, max(1, int(users * changes)))
+        runs.append({"users": users, "formats": formats, "startup": startup, "incremental": incremental})
+    return {
+        "benchmark": "persistence",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"changes": changes, "repeat": repeat, "seed": seed},
+        "runs": runs,
+    }
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:,.1f}"
+
+
+def _mb(size):
+    return "-" if size is None else f"{size / 2**20:,.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.persistence", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--changes", type=float, default=0.01,
+                        help="part des utilisateurs modifiés entre deux sauvegardes")
+    parser.add_argument("--repeat", type=int, default=3, help="meilleur de N mesures")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.users, args.changes, args.repeat, args.seed)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    for r in result["runs"]:
+        print(f"{r['users']:,} utilisateurs")
+        print(f"  {'format':<14}{'sérial. ms':>12}{'écriture ms':>13}{'taille Mo':>11}{'relecture ms':>14}"
+              f"{'pic sérial. Mo':>16}{'pic relect. Mo':>16}")
+        for name, f in r["formats"].items():
+            print(f"  {name:<14}{_ms(f['serialize_s']):>12}{_ms(f['write_s']):>13}{_mb(f['size_bytes']):>11}"
+                  f"{_ms(f['load_s']):>14}{_mb(f['serialize_peak_bytes']):>16}{_mb(f['load_peak_bytes']):>16}")
+        s, inc = r["startup"], r["incremental"]
+        print(f"  démarrage : JsonStore {_ms(s['json_store_s'])} ms (pic {_mb(s['json_store_peak_bytes'])} Mo), "
+              f"SqliteStore {_ms(s['sqlite_store_s'])} ms")
+        print(f"  {inc['changes']:,} modifications : réécriture JSON {_ms(inc['full_json_indent_s'])} ms, "
+              f"journal {_ms(inc['journal_s'])} ms, transaction SQLite {_ms(inc['sqlite_transaction_s'])} ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
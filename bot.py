@@ -1,12 +1,23 @@
 import discord
 from discord import app_commands
 from discord.ui import View, Button, Select
-import random, json, os, asyncio, time
+import random, os, asyncio, time
 from dotenv import load_dotenv
 import io
-import zipfile
-import re
-import aiohttp
+import logging
+from storage import JsonStore, SqliteStore
+from names import NameResolver
+from voc_roles import VocRoleReconciler
+from avatars import AvatarArchiver, AvatarCache
+from voice import VoiceHistory, VoiceTracker
+from economy import Economy
+import embeds
+from startup import Startup
+from launcher import parse_shard_ids, format_shard_ids
+import logs
+import metrics
+from logs import log
+from games import blackjack as blackjack_game, roulette as roulette_game, slots as slots_game
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -18,249 +29,294 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 intents.voice_states = True
-bot = discord.Client(intents=intents)
-tree = app_commands.CommandTree(bot)
 
-# Centralized persistence in data.json
-DATA_FILE = "data.json"
-if os.path.exists(DATA_FILE) and os.path.getsize(DATA_FILE) > 0:
-    with open(DATA_FILE, "r") as f:
-        data = json.load(f)
+# Sharding : SHARD_COUNT shards au total, SHARD_IDS (ex. "0-3" ou "0,2") ceux de ce processus.
+# Sans SHARD_COUNT, un seul client classique ; voir launcher.py pour plusieurs processus.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
+# Ce processus ne possède qu'une partie des shards : la base est partagée avec les autres
+MULTI_PROCESS = bool(SHARD_IDS) and len(SHARD_IDS) < SHARD_COUNT
+# Les commandes sont synchronisées par le seul processus qui possède le shard 0
+OWNS_SHARD_0 = not SHARD_IDS or 0 in SHARD_IDS
+# Fichiers propres au processus (checkpoint vocal, logs)
+PROCESS_SUFFIX = f".shards{format_shard_ids(SHARD_IDS)}" if MULTI_PROCESS else ""
+
+if SHARD_COUNT:
+    bot = discord.AutoShardedClient(intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
 else:
-    data = {
-        "bank": {},
-        "daily": {},
-        "voc": {},
-        "settings": {"voc_role_rules": []}
-    }
+    bot = discord.Client(intents=intents)
+tree = app_commands.CommandTree(bot)
 
-# Ensure keys exist
-data.setdefault("bank", {})
-data.setdefault("daily", {})
-data.setdefault("voc", {})
-data.setdefault("settings", {"voc_role_rules": []})
+# Persistence behind a pluggable store (voir storage.py)
+# STORAGE_BACKEND=json (data.json + journal, par défaut) ou sqlite
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+DATA_FILE = os.getenv("DATA_FILE", "data.json")
+# Journal append-only des variations de solde (replié périodiquement dans data.json)
+JOURNAL_FILE = os.getenv("DATA_JOURNAL", "ledger.jsonl")
+SQLITE_FILE = os.getenv("SQLITE_FILE", "data.db")
+FLUSH_INTERVAL = float(os.getenv("DATA_FLUSH_INTERVAL", "5"))
+FLUSH_THRESHOLD = int(os.getenv("DATA_FLUSH_THRESHOLD", "100"))
+
+if MULTI_PROCESS and STORAGE_BACKEND != "sqlite":
+    raise SystemExit("❌ SHARD_IDS ne couvre pas tous les shards : les processus doivent partager STORAGE_BACKEND=sqlite")
+
+if STORAGE_BACKEND == "sqlite":
+    store = SqliteStore(SQLITE_FILE, flush_interval=FLUSH_INTERVAL, max_dirty=FLUSH_THRESHOLD, shared=MULTI_PROCESS)
+else:
+    store = JsonStore(
+        DATA_FILE,
+        journal_path=JOURNAL_FILE,
+        flush_interval=FLUSH_INTERVAL,
+        max_dirty=FLUSH_THRESHOLD,
+    )
 
-# Local references (these are views into `data`)
-bank = data["bank"]
-daily_data = data["daily"]
-voc_data = data["voc"]
-settings = data["settings"]
+# Démarrage en phases uniques ; le sync global est sauté si l'arbre de commandes n'a pas changé
+startup = Startup(os.getenv("COMMAND_SNAPSHOT_FILE", "command_sync.json"))
 
-def save_data():
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+# Noms pour /leaderboard et /vocrank : cache membres, puis cache TTL/LRU, puis REST
+name_resolver = NameResolver(bot)
 
-def save():
-    save_data()
+@bot.event
+async def setup_hook():
+    await startup.run_once("stockage", store.start)
+    await startup.run_once("métriques", setup_metrics)
+
+# Sessions vocales en mémoire (horloge monotone), totaux écrits par checkpoints groupés
+voice_tracker = VoiceTracker(
+    store,
+    os.getenv("VOICE_CHECKPOINT_FILE", f"voice_sessions{PROCESS_SUFFIX}.json"),
+    checkpoint_interval=float(os.getenv("VOICE_CHECKPOINT_INTERVAL", "60")),
+    recover_window=float(os.getenv("VOICE_RECOVER_WINDOW", "600")),
+    # Temps vocal par jour sur les 31 derniers jours (périodes de /voc et /vocrank)
+    history=VoiceHistory(buckets=31),
+    # Un seul processus crédite un utilisateur vu en vocal sur des shards de processus différents
+    owner=f"shards{format_shard_ids(SHARD_IDS)}" if MULTI_PROCESS else "local",
+)
+
+# Rôles voc automatiques : settings "voc_role_rules" = list of {min_seconds, max_seconds, role_id}
+role_reconciler = VocRoleReconciler(bot, voice_tracker.total, lambda: store.get_setting("voc_role_rules", []))
 
-def save_daily():
-    save_data()
 
-def save_voc():
-    save_data()
+@bot.event
+@metrics.timed("on_voice_state_update")
+async def on_voice_state_update(member, before, after):
+    # Entrée/sortie de vocal ; les changements de salon et mutes sont ignorés
+    if voice_tracker.handle_voice_state(member, before, after):
+        role_reconciler.member_changed(member.id)
 
-def save_settings():
-    save_data()
 
 @bot.event
-async def on_voice_state_update(member, before, after):
-    user_id = str(member.id)
-    now = time.time()
-    # Entrée en vocal
-    if before.channel is None and after.channel is not None:
-        voc_data.setdefault(user_id, {"total": 0, "last_join": None})
-        voc_data[user_id]["last_join"] = now
-        save_voc()
-    # Sortie de vocal
-    elif before.channel is not None and after.channel is None:
-        if user_id in voc_data and voc_data[user_id].get("last_join"):
-            session = now - voc_data[user_id]["last_join"]
-            voc_data[user_id]["total"] += int(session)
-            voc_data[user_id]["last_join"] = None
-            save_voc()
-
-
-async def _voc_updater_loop():
-    # periodically flush live session time into total every minute
-    await bot.wait_until_ready()
-    while not bot.is_closed():
-        now = time.time()
-        changed = False
-        for uid, data in list(voc_data.items()):
-            lj = data.get("last_join")
-            if lj:
-                delta = now - lj
-                if delta >= 1:
-                    voc_data[uid]["total"] += int(delta)
-                    voc_data[uid]["last_join"] = now
-                    changed = True
-        if changed:
-            save_voc()
-        # Enforce voc role rules periodically (also runs every loop)
-        # settings["voc_role_rules"]: list of {min_seconds, max_seconds, role_id}
-        now = time.time()
-        # Build a mapping of uid -> total seconds including ongoing session
-        totals = {}
-        for uid, data in voc_data.items():
-            t = data.get("total", 0)
-            if data.get("last_join"):
-                t += int(now - data.get("last_join"))
-            totals[uid] = t
-
-        # For each guild, try to assign/remove roles for members present
-        for guild in bot.guilds:
-            for member in guild.members:
-                uid = str(member.id)
-                if uid not in totals:
-                    user_total = 0
-                else:
-                    user_total = totals[uid]
-
-                # Determine which rules match
-                matched_role_ids = [r["role_id"] for r in settings.get("voc_role_rules", []) if r["min_seconds"] <= user_total <= r["max_seconds"]]
-
-                # Assign roles that match and the member doesn't have
-                for rid in matched_role_ids:
-                    try:
-                        role = guild.get_role(int(rid))
-                        if role and role not in member.roles:
-                            await member.add_roles(role, reason="Rôle voc automatique")
-                    except Exception:
-                        pass
-
-                # Optionally remove roles that were assigned by rules but no longer match
-                # We only remove roles that are present in the rules to avoid touching other roles
-                rule_role_ids = [r["role_id"] for r in settings.get("voc_role_rules", [])]
-                for rid in rule_role_ids:
-                    try:
-                        role = guild.get_role(int(rid))
-                        if role and role in member.roles and rid not in matched_role_ids:
-                            await member.remove_roles(role, reason="Rôle voc automatique - condition non remplie")
-                    except Exception:
-                        pass
-        await asyncio.sleep(60)
+@metrics.timed("on_member_join")
+async def on_member_join(member):
+    role_reconciler.schedule(member.guild.id, member.id)
 
 # ---------------- Gestion des écus ----------------
+# Mises des jeux : economy.reserve() puis settle()/refund(), sérialisés par joueur
+economy = Economy(store)
+
+# Sabot partagé par toutes les parties de blackjack
+blackjack_shoe = blackjack_game.Shoe()
+
 def get_balance(user_id):
-    if str(user_id) not in bank:
-        bank[str(user_id)] = 1000
-        save()
-    return bank[str(user_id)]
-
-def update_balance(user_id, amount):
-    bank[str(user_id)] = get_balance(user_id) + amount
-    save()
-
-def can_claim_daily(user_id):
-    """Vérifie si l'utilisateur peut récupérer son daily"""
-    user_str = str(user_id)
-    if user_str not in daily_data:
-        return True
-    
-    last_claim = daily_data[user_str]
-    current_time = time.time()
-    # 86400 secondes = 24 heures
-    return (current_time - last_claim) >= 86400
+    return economy.balance(user_id)
+
+def update_balance(user_id, amount, reason):
+    """Ajoute `amount` au solde ; `reason` est inscrit dans le journal (daily, addcredits...)"""
+    economy.credit(user_id, amount, reason)
 
 def claim_daily(user_id):
-    """Enregistre que l'utilisateur a récupéré son daily"""
-    daily_data[str(user_id)] = time.time()
-    save_daily()
+    """Enregistre le daily s'il est disponible (vérification et écriture atomiques) ; renvoie True si c'est le cas"""
+    # 86400 secondes = 24 heures
+    return store.try_claim_daily(user_id, time.time(), 86400)
 
 def time_until_next_daily(user_id):
     """Retourne le temps restant en secondes avant le prochain daily"""
-    user_str = str(user_id)
-    if user_str not in daily_data:
+    last_claim = store.get_daily(user_id)
+    if last_claim is None:
         return 0
-    
-    last_claim = daily_data[user_str]
+
     current_time = time.time()
     time_passed = current_time - last_claim
     time_remaining = 86400 - time_passed
     return max(0, time_remaining)
 
 # ---------------- Logging ----------------
-def log(message):
-    print(f"[LOG] {message}")
+# Journal structuré (JSON lines) écrit par un thread dédié ; LOG_SAMPLE="blackjack.hit=10" garde 1 tirage sur 10
+logs.setup(
+    os.getenv("LOG_FILE", f"bot{PROCESS_SUFFIX}.log"),
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    max_bytes=int(float(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024),
+    backups=int(os.getenv("LOG_BACKUPS", "5")),
+    sample_rates=logs.parse_rates(os.getenv("LOG_SAMPLE", "")),
+    console=os.getenv("LOG_CONSOLE", "1") != "0",
+)
 
 # ---------------- BLACKJACK ----------------
+OUTCOME_MESSAGES = {
+    "blackjack": ("🃏 Blackjack ! Tu gagnes {gain} écus", discord.Color.green()),
+    "win": ("🎉 Tu gagnes {gain} écus", discord.Color.green()),
+    "push": ("🤝 Égalité, ta mise est rendue.", discord.Color.blurple()),
+    "lose": ("😢 Tu perds {bet} écus", discord.Color.red()),
+    "bust": ("💥 Tu dépasses 21, tu perds {bet} écus", discord.Color.red()),
+}
+
+
+BLACKJACK_ACTION = ("Action", "Choisis Hit 🟢, Stand 🔴, Double ou Split")
+
+
 class BlackjackView(View):
-    def __init__(self, player_hand, dealer_hand, mise, user_id):
+    def __init__(self, game, reservation):
         super().__init__(timeout=120)
-        self.player_hand = player_hand
-        self.dealer_hand = dealer_hand
-        self.mise = mise
-        self.user_id = user_id
-        self.finished = False
-
-    def score(self, hand):
-        s = sum(hand)
-        while s > 21 and 11 in hand:
-            hand[hand.index(11)] = 1
-            s = sum(hand)
-        return s
-
-    async def end_game(self, interaction, result_msg, color):
-        embed = discord.Embed(title="🃏 Blackjack", color=color)
-        embed.add_field(name="Ta main", value=f"{self.player_hand} → {self.score(self.player_hand)}", inline=False)
-        embed.add_field(name="Main du croupier", value=f"{self.dealer_hand} → {self.score(self.dealer_hand)}", inline=False)
-        embed.add_field(name="Résultat", value=result_msg, inline=False)
-        embed.add_field(name="Nouveau solde", value=f"{get_balance(self.user_id)} écus", inline=False)
-        self.finished = True
+        self.game = game
+        # Main -> mises réservées pour elle (mise initiale, puis double ou séparation)
+        self.reservations = {game.hand: [reservation]}
+        self.user_id = reservation.user_id
+        self.lock = asyncio.Lock()
+        self.update_buttons()
+
+    async def on_timeout(self):
+        # Partie abandonnée : les mises encore ouvertes sont rendues (sans effet sur celles déjà réglées)
+        for reservations in self.reservations.values():
+            for reservation in reservations:
+                await economy.refund(reservation)
+
+    def update_buttons(self):
+        self.double.disabled = not self.game.can_double
+        self.split.disabled = not self.game.can_split
+
+    def embed(self, *extra, color=None):
+        """Mains, main du croupier puis les champs `extra` (nom, valeur)"""
+        fields = []
+        hands = self.game.hands
+        for i, hand in enumerate(hands):
+            name = "Ta main" if len(hands) == 1 else f"Main {i + 1}"
+            if len(hands) > 1 and i == self.game.active and not self.game.finished:
+                name = f"▶ {name}"
+            suffix = " (doublée)" if hand.doubled else ""
+            fields.append((name, f"{hand.cards} → {hand.total} · {hand.bet} écus{suffix}", False))
+        dealer = self.game.dealer
+        if self.game.finished:
+            fields.append(("Main du croupier", f"{dealer.cards} → {dealer.total}", False))
+        else:
+            fields.append(("Main du croupier", f"{dealer.cards[0]} + ❓", False))
+        fields += [(name, value, False) for name, value in extra]
+        return embeds.BLACKJACK.render(color=color, extra=fields)
+
+    async def settle(self):
+        """Règle chaque main ; renvoie les lignes de résultat et la couleur de l'embed"""
+        results = self.game.results()
+        lines = []
+        net = 0
+        for hand, payout, outcome in results:
+            reservations = self.reservations[hand]
+            for reservation in reservations:
+                await economy.settle(reservation, payout * reservation.amount // hand.bet)
+            net += payout - hand.bet
+            template, _ = OUTCOME_MESSAGES[outcome]
+            lines.append(template.format(gain=payout - hand.bet, bet=hand.bet))
+        if len(lines) == 1:
+            color = OUTCOME_MESSAGES[results[0][2]][1]
+        else:
+            lines = [f"Main {i + 1} : {line}" for i, line in enumerate(lines)]
+            color = discord.Color.green() if net > 0 else (discord.Color.red() if net < 0 else discord.Color.blurple())
+        return "\n".join(lines), color
+
+    async def refresh(self, interaction):
+        if not self.game.finished:
+            self.update_buttons()
+            embed = self.embed(BLACKJACK_ACTION)
+            await interaction.response.edit_message(embed=embed, view=self)
+            return
+        result_msg, color = await self.settle()
+        embed = self.embed(("Résultat", result_msg), ("Nouveau solde", f"{get_balance(self.user_id)} écus"), color=color)
         for child in self.children:
             child.disabled = True
+        self.stop()
         await interaction.response.edit_message(embed=embed, view=self)
-        log(f"[BLACKJACK] {interaction.user} → {result_msg} (Solde: {get_balance(self.user_id)})")
+        log("blackjack.end", "fin de partie", user=self.user_id, result=result_msg, balance=get_balance(self.user_id))
+
+    async def extra_bet(self, interaction, action):
+        """Réserve une mise supplémentaire égale à celle de la main active"""
+        reservation = await economy.reserve(self.user_id, self.game.hand.bet, "blackjack")
+        if reservation is None:
+            await interaction.response.send_message(f"❌ Solde insuffisant pour {action}.", ephemeral=True)
+        return reservation
 
     @discord.ui.button(label="Hit 🟢", style=discord.ButtonStyle.green)
+    @metrics.timed("blackjack.hit")
     async def hit(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.user_id or self.finished:
+        if interaction.user.id != self.user_id:
             return
-        self.player_hand.append(random.choice([2,3,4,5,6,7,8,9,10,10,10,10,11]))
-        player_score = self.score(self.player_hand)
-        log(f"[BLACKJACK] {interaction.user} tire une carte: {self.player_hand[-1]} → main: {self.player_hand}")
-        if player_score > 21:
-            update_balance(self.user_id, -self.mise)
-            await self.end_game(interaction, f"💥 Tu dépasses 21, tu perds {self.mise} écus", discord.Color.red())
-        else:
-            embed = discord.Embed(title="🃏 Blackjack", color=discord.Color.blurple())
-            embed.add_field(name="Ta main", value=f"{self.player_hand} → {player_score}", inline=False)
-            embed.add_field(name="Main du croupier", value=f"{self.dealer_hand[0]} + ❓", inline=False)
-            embed.add_field(name="Action", value="Choisis Hit 🟢 ou Stand 🔴", inline=False)
-            await interaction.response.edit_message(embed=embed, view=self)
+        async with self.lock:
+            if self.game.finished:
+                return
+            hand = self.game.hit()
+            log("blackjack.hit", "tire une carte", user=self.user_id, card=hand.cards[-1], total=hand.total)
+            await self.refresh(interaction)
 
     @discord.ui.button(label="Stand 🔴", style=discord.ButtonStyle.red)
+    @metrics.timed("blackjack.stand")
     async def stand(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.user_id or self.finished:
+        if interaction.user.id != self.user_id:
             return
-        while self.score(self.dealer_hand) < 17:
-            self.dealer_hand.append(random.choice([2,3,4,5,6,7,8,9,10,10,10,10,11]))
-        player_score = self.score(self.player_hand)
-        dealer_score = self.score(self.dealer_hand)
-        if dealer_score > 21 or player_score > dealer_score:
-            update_balance(self.user_id, self.mise)
-            await self.end_game(interaction, f"🎉 Tu gagnes {self.mise} écus", discord.Color.green())
-        elif dealer_score == player_score:
-            await self.end_game(interaction, "🤝 Égalité, ta mise est rendue.", discord.Color.blurple())
-        else:
-            update_balance(self.user_id, -self.mise)
-            await self.end_game(interaction, f"😢 Tu perds {self.mise} écus", discord.Color.red())
+        async with self.lock:
+            if self.game.finished:
+                return
+            self.game.stand()
+            await self.refresh(interaction)
+
+    @discord.ui.button(label="Double", style=discord.ButtonStyle.blurple)
+    @metrics.timed("blackjack.double")
+    async def double(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id != self.user_id:
+            return
+        async with self.lock:
+            if not self.game.can_double:
+                return
+            reservation = await self.extra_bet(interaction, "doubler")
+            if reservation is None:
+                return
+            self.reservations[self.game.hand].append(reservation)
+            hand = self.game.double()
+            log("blackjack.double", "double", user=self.user_id, card=hand.cards[-1], total=hand.total, bet=hand.bet)
+            await self.refresh(interaction)
+
+    @discord.ui.button(label="Split", style=discord.ButtonStyle.grey)
+    @metrics.timed("blackjack.split")
+    async def split(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id != self.user_id:
+            return
+        async with self.lock:
+            if not self.game.can_split:
+                return
+            reservation = await self.extra_bet(interaction, "séparer")
+            if reservation is None:
+                return
+            reservations = self.reservations.pop(self.game.hand)
+            first, second = self.game.split()
+            self.reservations[first] = reservations
+            self.reservations[second] = [reservation]
+            log("blackjack.split", "sépare sa main", user=self.user_id, hands=len(self.game.hands))
+            await self.refresh(interaction)
 
 
 @tree.command(name="blackjack", description="Jouer au blackjack interactif")
+@metrics.timed("/blackjack")
 async def blackjack(interaction: discord.Interaction, mise: int):
-    balance = get_balance(interaction.user.id)
-    if mise <= 0 or mise > balance:
+    reservation = await economy.reserve(interaction.user.id, mise, "blackjack")
+    if reservation is None:
         await interaction.response.send_message("❌ Mise invalide.", ephemeral=True)
         return
-    player_hand = [random.choice([2,3,4,5,6,7,8,9,10,10,10,10,11]) for _ in range(2)]
-    dealer_hand = [random.choice([2,3,4,5,6,7,8,9,10,10,10,10,11]) for _ in range(2)]
-    embed = discord.Embed(title="🃏 Blackjack", color=discord.Color.blurple())
-    embed.add_field(name="Ta main", value=f"{player_hand} → {sum(player_hand)}", inline=False)
-    embed.add_field(name="Main du croupier", value=f"{dealer_hand[0]} + ❓", inline=False)
-    embed.add_field(name="Action", value="Choisis Hit 🟢 ou Stand 🔴", inline=False)
-    view = BlackjackView(player_hand, dealer_hand, mise, interaction.user.id)
-    log(f"[BLACKJACK] {interaction.user} démarre une partie avec mise: {mise}")
+    view = BlackjackView(blackjack_game.Round(blackjack_shoe, mise), reservation)
+    log("blackjack.start", "démarre une partie", user=interaction.user.id, bet=mise)
+    if view.game.finished:
+        # Blackjack servi d'entrée (joueur ou croupier) : réglé tout de suite
+        result_msg, color = await view.settle()
+        view.stop()
+        embed = view.embed(("Résultat", result_msg), ("Nouveau solde", f"{get_balance(interaction.user.id)} écus"), color=color)
+        await interaction.response.send_message(embed=embed)
+        return
+    embed = view.embed(BLACKJACK_ACTION)
     await interaction.response.send_message(embed=embed, view=view)
 
 
@@ -270,6 +326,7 @@ class RouletteView(View):
         super().__init__(timeout=300)
         self.user_id = user_id
         self.mises = {}
+        self.reservations = []  # (case, Reservation)
         self.selected_case = None
         self.finished = False
         self.message = None
@@ -283,11 +340,23 @@ class RouletteView(View):
             discord.SelectOption(label="1-12", value="dozen:1-12"),
             discord.SelectOption(label="13-24", value="dozen:13-24"),
             discord.SelectOption(label="25-36", value="dozen:25-36"),
+            discord.SelectOption(label="1re colonne", value="column:1"),
+            discord.SelectOption(label="2e colonne", value="column:2"),
+            discord.SelectOption(label="3e colonne", value="column:3"),
+            discord.SelectOption(label="Manque (1-18)", value="half:1-18"),
+            discord.SelectOption(label="Passe (19-36)", value="half:19-36"),
         ]
         self.case_select = Select(placeholder="Choisis une case", options=options_case)
         self.case_select.callback = self.case_callback
         self.add_item(self.case_select)
 
+        # Numéros pleins (un menu est limité à 25 options)
+        for low, high in ((0, 18), (19, 36)):
+            options_number = [discord.SelectOption(label=str(n), value=f"number:{n}") for n in range(low, high + 1)]
+            number_select = Select(placeholder=f"Ou un numéro ({low}-{high})", options=options_number)
+            number_select.callback = self.case_callback
+            self.add_item(number_select)
+
         # Menu mise
         options_mise = [
             discord.SelectOption(label="10", value="10"),
@@ -303,38 +372,51 @@ class RouletteView(View):
         self.launch_button.callback = self.launch_callback
         self.add_item(self.launch_button)
 
+    @metrics.timed("roulette.case")
     async def case_callback(self, interaction):
         if interaction.user.id != self.user_id:
             return
-        self.selected_case = self.case_select.values[0]
+        # Valeur du menu utilisé (case, ou numéro plein)
+        self.selected_case = interaction.data["values"][0]
         await interaction.response.send_message(f"✅ Tu as choisi **{self.selected_case}**, maintenant choisis ta mise.", ephemeral=True)
 
+    @metrics.timed("roulette.mise")
     async def mise_callback(self, interaction):
         if interaction.user.id != self.user_id:
             return
+        if self.finished:
+            await interaction.response.send_message("❌ La roulette est déjà lancée.", ephemeral=True)
+            return
         if not self.selected_case:
             await interaction.response.send_message("❌ Choisis d'abord une case.", ephemeral=True)
             return
         mise = int(self.mise_select.values[0])
         balance_before = get_balance(self.user_id)
-        if mise > balance_before:
+        reservation = await economy.reserve(self.user_id, mise, "roulette")
+        if reservation is None:
             await interaction.response.send_message("❌ Solde insuffisant.", ephemeral=True)
             return
+        if self.finished:
+            # Roulette lancée (ou expirée) pendant la réservation
+            await economy.refund(reservation)
+            await interaction.response.send_message("❌ La roulette est déjà lancée.", ephemeral=True)
+            return
+        self.reservations.append((self.selected_case, reservation))
         if self.selected_case in self.mises:
             self.mises[self.selected_case] += mise
         else:
             self.mises[self.selected_case] = mise
-        update_balance(self.user_id, -mise)
         balance_after = get_balance(self.user_id)
 
-        log(f"[ROULETTE] {interaction.user} mise {mise} écus sur {self.selected_case}. Solde avant: {balance_before}, après: {balance_after}")
+        log("roulette.bet", "mise", user=self.user_id, case=self.selected_case, bet=mise,
+            balance_before=balance_before, balance=balance_after)
 
         # Mise à jour embed
         description = "Choisis une case et une mise via les menus.\n\n**Mises actuelles :**\n"
         for case, montant in self.mises.items():
             description += f"- {case} : {montant} écus\n"
         description += f"\n**Solde restant : {balance_after} écus**"
-        embed = discord.Embed(title="🎡 Roulette", description=description, color=discord.Color.blurple())
+        embed = embeds.ROULETTE.render(description=description)
 
         if self.message:
             await self.message.edit(embed=embed, view=self)
@@ -343,6 +425,7 @@ class RouletteView(View):
             self.message = await interaction.original_response()
         self.selected_case = None
 
+    @metrics.timed("roulette.launch")
     async def launch_callback(self, interaction):
         if interaction.user.id != self.user_id or self.finished:
             return
@@ -351,140 +434,311 @@ class RouletteView(View):
             return
         self.finished = True
 
-        result_number = random.randint(0,36)
-        color_map = {0:"vert"}
-        rouge_numbers = [1,3,5,7,9,12,14,16,18,19,21,23,25,27,30,32,34,36]
-        for i in range(1,37):
-            color_map[i] = "rouge" if i in rouge_numbers else "noir"
-        result_color = color_map[result_number]
-        result_parity = "pair" if result_number!=0 and result_number%2==0 else ("impair" if result_number!=0 else "none")
-        result_dozen = "1-12" if 1<=result_number<=12 else ("13-24" if 13<=result_number<=24 else ("25-36" if 25<=result_number<=36 else "none"))
+        result_number = roulette_game.spin()
+        result_color = roulette_game.pocket_color(result_number)
+        multipliers = {selection: roulette_game.payout_multiplier(selection, result_number) for selection in self.mises}
+        for selection, reservation in self.reservations:
+            await economy.settle(reservation, reservation.amount * multipliers[selection])
 
         msg_result = ""
         for selection, mise in self.mises.items():
-            typ,val = selection.split(":")
-            gain = 0
-            if typ=="number" and int(val)==result_number:
-                gain = mise*35
-            elif typ=="color" and val==result_color:
-                gain = mise*2
-            elif typ=="parity" and val==result_parity:
-                gain = mise*2
-            elif typ=="dozen" and val==result_dozen:
-                gain = mise*3
+            gain = mise * multipliers[selection]
             if gain>0:
-                update_balance(self.user_id, gain)
                 msg_result += f"✅ {selection} : +{gain} écus\n"
             else:
                 msg_result += f"❌ {selection} : perdu {mise} écus\n"
 
-        embed = discord.Embed(title="🎡 Roulette", description=f"La bille tombe sur **{result_number}** ({result_color})", color=discord.Color.gold())
-        embed.add_field(name="Résultat des mises", value=msg_result, inline=False)
-        embed.add_field(name="Solde actuel", value=f"{get_balance(self.user_id)} écus")
+        embed = embeds.ROULETTE_RESULT.render(msg_result, f"{get_balance(self.user_id)} écus",
+                                              description=f"La bille tombe sur **{result_number}** ({result_color})")
         await interaction.response.edit_message(embed=embed, view=None)
-        log(f"[ROULETTE] {interaction.user} résultat: {result_number} ({result_color}) → Mises: {self.mises}")
+        log("roulette.spin", "résultat", user=self.user_id, number=result_number, bets=len(self.mises),
+            staked=sum(self.mises.values()), paid=sum(m * multipliers[s] for s, m in self.mises.items()))
+
+    async def on_timeout(self):
+        # Roulette jamais lancée : les mises sont rendues
+        if not self.finished:
+            self.finished = True
+            for _, reservation in self.reservations:
+                await economy.refund(reservation)
 
 @tree.command(name="roulette", description="Jouer à la roulette")
+@metrics.timed("/roulette")
 async def roulette(interaction: discord.Interaction):
     view = RouletteView(interaction.user.id)
-    embed = discord.Embed(title="🎡 Roulette", description="Choisis une case et une mise via les menus.", color=discord.Color.blurple())
-    await interaction.response.send_message(embed=embed, view=view)
-    log(f"[ROULETTE] {interaction.user} démarre une partie")
+    await interaction.response.send_message(embed=embeds.ROULETTE.render(), view=view)
+    log("roulette.start", "démarre une partie", user=interaction.user.id)
+
+# ---------------- TABLE DE ROULETTE (multijoueur) ----------------
+# Une table par salon : mises de tous les joueurs pendant la fenêtre, un seul tirage,
+# règlement groupé et un seul message de résultat
+ROULETTE_TABLE_WINDOW = float(os.getenv("ROULETTE_TABLE_WINDOW", "30"))
+# Intervalle minimal entre deux mises à jour du message de la table
+ROULETTE_TABLE_REFRESH = float(os.getenv("ROULETTE_TABLE_REFRESH", "3"))
+# Joueurs détaillés dans les messages de la table (limite de taille des embeds)
+ROULETTE_TABLE_LISTED = 15
+roulette_tables = {}  # channel_id -> RouletteTable
+
+
+class RouletteTable:
+    def __init__(self, channel_id, window, refresh):
+        self.channel_id = channel_id
+        self.window = window
+        self.refresh = refresh
+        self.bets = []  # (case, Reservation)
+        self.pending = {}  # user_id -> case choisie, en attente d'une mise
+        self.closed = False
+        self.message = None
+        self.view = RouletteTableView(self)
+        self.deadline = None
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def totals(self):
+        """{user_id: {case: montant}}"""
+        totals = {}
+        for case, reservation in self.bets:
+            cases = totals.setdefault(reservation.user_id, {})
+            cases[case] = cases.get(case, 0) + reservation.amount
+        return totals
+
+    def embed(self):
+        totals = self.totals()
+        remaining = max(0, int(self.deadline - time.monotonic())) if self.deadline else int(self.window)
+        description = f"Table ouverte à tous : mise avec les menus. Tirage dans **{remaining}s**.\n"
+        if totals:
+            description += f"\n**{len(totals)} joueur(s), {sum(r.amount for _, r in self.bets)} écus en jeu :**\n"
+            for user_id, cases in list(totals.items())[:ROULETTE_TABLE_LISTED]:
+                description += f"- <@{user_id}> : " + ", ".join(f"{c} {m}" for c, m in cases.items()) + "\n"
+            if len(totals) > ROULETTE_TABLE_LISTED:
+                description += f"… et {len(totals) - ROULETTE_TABLE_LISTED} autre(s) joueur(s)\n"
+        return embeds.ROULETTE_TABLE.render(description=description)
+
+    def changed(self):
+        self._changed.set()
+
+    async def run(self, interaction):
+        """Ouvre la table en réponse à `interaction`, fenêtre de mises (message rafraîchi au plus
+        toutes les `refresh` s), puis tirage. Le salon est libéré quoi qu'il arrive."""
+        try:
+            await interaction.response.send_message(embed=self.embed(), view=self.view)
+            self.message = await interaction.original_response()
+            # Horloge monotone : un réglage de l'heure système ne raccourcit ni ne prolonge la fenêtre
+            self.deadline = time.monotonic() + self.window
+            while True:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._changed.clear()
+                try:
+                    await self.message.edit(embed=self.embed(), view=self.view)
+                except discord.HTTPException:
+                    pass  # simple rafraîchissement : le tirage a lieu quand même
+                await asyncio.sleep(min(self.refresh, max(self.deadline - time.monotonic(), 0)))
+            self.closed = True
+            self.view.stop()
+            await self.spin()
+        except Exception as e:
+            # Tirage impossible : les mises encore ouvertes sont rendues (sans effet sur celles réglées)
+            self.closed = True
+            for _, reservation in self.bets:
+                await economy.refund(reservation)
+            log("roulette.table_error", "tirage de table impossible, mises rendues", channel=self.channel_id,
+                bets=len(self.bets), error=repr(e), level=logging.ERROR)
+        finally:
+            if roulette_tables.get(self.channel_id) is self:
+                del roulette_tables[self.channel_id]
+
+    async def spin(self):
+        if not self.bets:
+            await self.message.edit(embed=embeds.ROULETTE_TABLE.render(description="Aucune mise, table fermée."), view=None)
+            return
+        result_number = roulette_game.spin()
+        result_color = roulette_game.pocket_color(result_number)
+        payouts = [(r, r.amount * roulette_game.payout_multiplier(case, result_number)) for case, r in self.bets]
+        # Une seule écriture groupée pour tous les joueurs
+        await economy.settle_many(payouts)
+
+        staked, paid = {}, {}
+        for reservation, payout in payouts:
+            staked[reservation.user_id] = staked.get(reservation.user_id, 0) + reservation.amount
+            paid[reservation.user_id] = paid.get(reservation.user_id, 0) + payout
+        lines = []
+        ranked = sorted(staked, key=lambda uid: paid[uid] - staked[uid], reverse=True)
+        for user_id in ranked[:ROULETTE_TABLE_LISTED]:
+            net = paid[user_id] - staked[user_id]
+            lines.append(f"{'✅' if net > 0 else '❌'} <@{user_id}> : {'+' if net > 0 else ''}{net} écus")
+        if len(ranked) > ROULETTE_TABLE_LISTED:
+            lines.append(f"… et {len(ranked) - ROULETTE_TABLE_LISTED} autre(s) joueur(s)")
+        embed = embeds.ROULETTE_TABLE_RESULT.render(
+            "\n".join(lines), f"{sum(staked.values())} écus misés, {sum(paid.values())} écus payés",
+            description=f"La bille tombe sur **{result_number}** ({result_color})",
+        )
+        await self.message.edit(embed=embed, view=None)
+        log("roulette.table", "tirage de table", channel=self.channel_id, number=result_number,
+            players=len(staked), bets=len(self.bets), staked=sum(staked.values()), paid=sum(paid.values()))
+
+
+class RouletteTableView(RouletteView):
+    """Menus de la table : case et mise choisies par chaque joueur, sans bouton de lancement"""
+
+    def __init__(self, table):
+        super().__init__(user_id=None)
+        self.timeout = None
+        self.table = table
+        self.remove_item(self.launch_button)
+
+    @metrics.timed("roulette_table.case")
+    async def case_callback(self, interaction):
+        if self.table.closed:
+            await interaction.response.send_message("❌ Les mises sont closes.", ephemeral=True)
+            return
+        self.table.pending[interaction.user.id] = interaction.data["values"][0]
+        # Simple accusé de réception : le choix reste affiché dans le menu du joueur
+        await interaction.response.defer()
+
+    @metrics.timed("roulette_table.mise")
+    async def mise_callback(self, interaction):
+        user_id = interaction.user.id
+        case = self.table.pending.get(user_id)
+        if self.table.closed:
+            await interaction.response.send_message("❌ Les mises sont closes.", ephemeral=True)
+            return
+        if case is None:
+            await interaction.response.send_message("❌ Choisis d'abord une case.", ephemeral=True)
+            return
+        # Menu partagé par tous les joueurs : la valeur vient de l'interaction, pas du Select
+        mise = int(interaction.data["values"][0])
+        reservation = await economy.reserve(user_id, mise, "roulette")
+        if reservation is None:
+            await interaction.response.send_message("❌ Solde insuffisant.", ephemeral=True)
+            return
+        if self.table.closed:
+            # Tirage lancé pendant la réservation
+            await economy.refund(reservation)
+            await interaction.response.send_message("❌ Les mises sont closes.", ephemeral=True)
+            return
+        self.table.bets.append((case, reservation))
+        del self.table.pending[user_id]
+        self.table.changed()
+        mine = self.table.totals()[user_id]
+        await interaction.response.send_message(
+            f"✅ {mise} écus sur **{case}**. Tes mises : " + ", ".join(f"{c} {m}" for c, m in mine.items()),
+            ephemeral=True,
+        )
+        log("roulette.table_bet", "mise de table", user=user_id, channel=self.table.channel_id, case=case, bet=mise)
+
+    async def on_timeout(self):
+        pass
+
+
+@tree.command(name="roulette_table", description="Ouvrir (ou rejoindre) la table de roulette du salon")
+@metrics.timed("/roulette_table")
+async def roulette_table(interaction: discord.Interaction):
+    table = roulette_tables.get(interaction.channel_id)
+    if table is not None and not table.closed:
+        link = f" : {table.message.jump_url}" if table.message is not None else ""
+        await interaction.response.send_message(f"🎡 Une table est déjà ouverte dans ce salon{link}", ephemeral=True)
+        return
+    table = roulette_tables[interaction.channel_id] = RouletteTable(
+        interaction.channel_id, ROULETTE_TABLE_WINDOW, ROULETTE_TABLE_REFRESH)
+    table.task = asyncio.get_running_loop().create_task(table.run(interaction))
+    log("roulette.table_open", "ouvre une table", user=interaction.user.id, channel=interaction.channel_id)
+
 
 # ---------------- MACHINE À SOUS ----------------
 @tree.command(name="slots", description="Jouer à la machine à sous")
+@metrics.timed("/slots")
 async def slots(interaction: discord.Interaction, mise:int):
-    balance = get_balance(interaction.user.id)
-    if mise<=0 or mise>balance:
+    reservation = await economy.reserve(interaction.user.id, mise, "slots")
+    if reservation is None:
         await interaction.response.send_message("❌ Mise invalide.", ephemeral=True)
         return
-    update_balance(interaction.user.id, -mise)
-    emojis = ["🍒","🍋","🍉","⭐","💎"]
-    await interaction.response.send_message("🎰 Lancement...", ephemeral=False)
-    msg = await interaction.original_response()
-
-    # Create final 3x3 grid and animate briefly
-    grid = [[random.choice(emojis) for _ in range(3)] for _ in range(3)]
-    # simple animation: show final grid (could be enhanced)
-    display = "\n".join([" | ".join(row) for row in grid])
-    embed = discord.Embed(title="🎰 Machine à sous", description=display, color=discord.Color.blurple())
-    await msg.edit(embed=embed)
-
-    # Check win: first row all identical symbols
-    first_row = grid[0]
-    if all(x == first_row[0] for x in first_row):
-        gain = mise * 5
+    try:
+        await interaction.response.send_message("🎰 Lancement...", ephemeral=False)
+        msg = await interaction.original_response()
+
+        # Create final 3x3 grid and animate briefly
+        grid = slots_game.spin()
+        # simple animation: show final grid (could be enhanced)
+        display = "\n".join([" | ".join(row) for row in grid])
+        await msg.edit(embed=embeds.SLOTS.render(description=display))
+    except Exception:
+        # Tirage jamais affiché : la mise est rendue
+        await economy.refund(reservation)
+        raise
+
+    # Check win (see games/slots.py)
+    multiplier = slots_game.payout_multiplier(grid)
+    if multiplier:
+        gain = mise * multiplier
         msg_result = f"🎉 JACKPOT ! Tu gagnes {gain} écus"
         color = discord.Color.green()
-        update_balance(interaction.user.id, gain)
+        await economy.settle(reservation, gain)
     else:
         gain = -mise
+        await economy.settle(reservation, 0)
         msg_result = f"😢 Tu perds ta mise de {mise} écus"
         color = discord.Color.red()
 
-    embed = discord.Embed(title="🎰 Machine à sous", description=display, color=color)
-    embed.add_field(name="Résultat", value=msg_result)
-    embed.add_field(name="Nouveau solde", value=f"{get_balance(interaction.user.id)} écus")
+    embed = embeds.SLOTS_RESULT.render(msg_result, f"{get_balance(interaction.user.id)} écus", description=display, color=color)
     await msg.edit(embed=embed)
 
 
 # ---------------- LEADERBOARD ----------------
 @tree.command(name="leaderboard", description="Affiche le top 10 des joueurs")
+@metrics.timed("/leaderboard")
 async def leaderboard(interaction: discord.Interaction):
-    sorted_bank = sorted(bank.items(), key=lambda x: x[1], reverse=True)
+    rows = store.top_balances(10)
+    names = await name_resolver.resolve([uid for uid, _ in rows], interaction.guild)
     description = ""
-    for i, (user_id, credits) in enumerate(sorted_bank[:10], start=1):
-        user = await bot.fetch_user(int(user_id))
-        description += f"{i}. {user.name} → {credits} écus\n"
-    embed = discord.Embed(title="🏆 Classement général", description=description, color=discord.Color.gold())
+    for i, (user_id, credits) in enumerate(rows, start=1):
+        description += f"{i}. {names[user_id]} → {credits} écus\n"
+    embed = embeds.LEADERBOARD.render(description=description)
     await interaction.response.send_message(embed=embed)
-    log(f"[LEADERBOARD] {interaction.user} a affiché le classement")
+    log("leaderboard", "a affiché le classement", user=interaction.user.id)
+
+
+@tree.command(name="rank", description="Affiche ta position dans le classement des écus")
+@metrics.timed("/rank")
+async def rank(interaction: discord.Interaction):
+    balance = get_balance(interaction.user.id)
+    position, count = store.balance_rank(interaction.user.id)
+    embed = embeds.RANK.render(description=f"Tu es **#{position}** sur {count} joueurs avec **{balance} écus**.")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+    log("rank", "position", user=interaction.user.id, position=position, count=count)
 
 
 # ---------------- DAILY CREDITS ----------------
 @tree.command(name="daily", description="Récupérer tes écus quotidiens (500 écus)")
+@metrics.timed("/daily")
 async def daily(interaction: discord.Interaction):
     user_id = interaction.user.id
-    if can_claim_daily(user_id):
+    if claim_daily(user_id):
         # L'utilisateur peut récupérer son daily
-        balance_before = get_balance(user_id)
-        update_balance(user_id, 500)
-        claim_daily(user_id)
+        update_balance(user_id, 500, "daily")
         balance_after = get_balance(user_id)
 
-        embed = discord.Embed(
-            title="🎁 Daily Écus",
-            color=discord.Color.green(),
-            description="Tu as récupéré tes écus quotidiens !"
-        )
-        embed.add_field(name="Écus reçus", value="500 écus", inline=True)
-        embed.add_field(name="Nouveau solde", value=f"{balance_after} écus", inline=True)
-        embed.set_footer(text="Reviens demain pour récupérer tes prochains crédits !")
+        embed = embeds.DAILY_CLAIMED.render("500 écus", f"{balance_after} écus")
 
         await interaction.response.send_message(embed=embed)
-        log(f"[DAILY] {interaction.user} a récupéré ses 500 écus quotidiens (Solde: {balance_after})")
+        log("daily", "a récupéré ses 500 écus quotidiens", user=user_id, balance=balance_after)
     else:
         # L'utilisateur doit attendre
         time_remaining = time_until_next_daily(user_id)
         hours = int(time_remaining // 3600)
         minutes = int((time_remaining % 3600) // 60)
 
-        embed = discord.Embed(
-            title="⏰ Daily Écus",
-            color=discord.Color.orange(),
-            description="Tu as déjà récupéré tes écus quotidiens !"
-        )
-        embed.add_field(
-            name="Temps restant",
-            value=f"{hours}h {minutes}m",
-            inline=False
-        )
-        embed.set_footer(text="Patience, tu pourras bientôt récupérer tes prochains crédits !")
+        embed = embeds.DAILY_WAIT.render(f"{hours}h {minutes}m")
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # ---------------- ADD CREDITS (ADMIN) ----------------
 @tree.command(name="addcredits", description="[ADMIN] Ajouter des écus à un utilisateur")
+@metrics.timed("/addcredits")
 async def add_credits(interaction: discord.Interaction, user: discord.User, amount: int):
     # Vérifier si l'utilisateur a les permissions d'administrateur
     if not interaction.user.guild_permissions.administrator:
@@ -499,25 +753,22 @@ async def add_credits(interaction: discord.Interaction, user: discord.User, amou
     balance_before = get_balance(user.id)
     
     # Ajouter les écus
-    update_balance(user.id, amount)
+    update_balance(user.id, amount, "addcredits")
     balance_after = get_balance(user.id)
     
     # Créer un embed de confirmation
-    embed = discord.Embed(
-    title="💳 Écus ajoutés",
-        color=discord.Color.green(),
-    description=f"**{amount} écus** ont été ajoutés au compte de {user.mention}"
+    embed = embeds.ADD_CREDITS.render(
+        f"{balance_before} écus", f"+{amount} écus", f"{balance_after} écus",
+        description=f"**{amount} écus** ont été ajoutés au compte de {user.mention}",
+        footer=f"Action effectuée par {interaction.user.name}",
     )
-    embed.add_field(name="Solde avant", value=f"{balance_before} écus", inline=True)
-    embed.add_field(name="Montant ajouté", value=f"+{amount} écus", inline=True)
-    embed.add_field(name="Nouveau solde", value=f"{balance_after} écus", inline=True)
-    embed.set_footer(text=f"Action effectuée par {interaction.user.name}")
     
     await interaction.response.send_message(embed=embed)
-    log(f"[ADMIN] {interaction.user} a ajouté {amount} écus à {user} (Nouveau solde: {balance_after})")
+    log("admin.addcredits", "écus ajoutés", admin=interaction.user.id, user=user.id, amount=amount, balance=balance_after)
 
 # ---------------- RANDOM NUMBER ----------------
 @tree.command(name="random", description="Génère un nombre aléatoire entre 1 et le nombre choisi")
+@metrics.timed("/random")
 async def random_number(interaction: discord.Interaction, maximum: int):
     if maximum < 1:
         await interaction.response.send_message("❌ Le nombre maximum doit être supérieur ou égal à 1.", ephemeral=True)
@@ -538,198 +789,66 @@ async def random_number(interaction: discord.Interaction, maximum: int):
     embed.set_footer(text=f"Généré pour {interaction.user.display_name}")
     
     await interaction.response.send_message(embed=embed)
-    log(f"[RANDOM] {interaction.user} a généré le nombre {result} (1-{maximum})")
+    log("random", "nombre généré", user=interaction.user.id, result=result, maximum=maximum)
 
 # ---------------- HELP ----------------
 @tree.command(name="help", description="Affiche toutes les commandes et leur fonctionnement")
+@metrics.timed("/help")
 async def help_command(interaction: discord.Interaction):
-    embed = discord.Embed(
-        title="🎰 Bot Casino - Aide complète",
-        color=discord.Color.gold(),
-        description="Liste des commandes et mécaniques disponibles :"
-    )
+    # Embed statique construit une fois au chargement (voir embeds.py)
+    await interaction.response.send_message(embed=embeds.HELP, ephemeral=True)
 
-    embed.add_field(
-        name="💎 Monnaie : écus",
-        value=(
-            "- Chaque utilisateur commence avec 1000 écus.\n"
-            "- Les écus sont sauvegardés dans `data.json` (banque, daily, temps vocal, réglages).\n"
-            "- Les mises retirent automatiquement ton solde ; les gains sont ajoutés automatiquement."
-        ),
-        inline=False
-    )
 
-    embed.add_field(
-        name="/daily",
-        value=(
-            "🎁 Récupérer tes écus quotidiens (500 écus).\n"
-            "- Utilisable une seule fois toutes les 24 heures.\n"
-            "- Le cooldown est précis : attend 24h depuis ta dernière récupération."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="/blackjack <mise>",
-        value=(
-            "🃏 Blackjack interactif.\n"
-            "- Deux cartes te sont distribuées, le croupier en a une cachée.\n"
-            "- Utilise les boutons `Hit 🟢` pour tirer et `Stand 🔴` pour rester.\n"
-            "- Gains/pénalités appliqués automatiquement à ton solde."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="/roulette",
-        value=(
-            "🎡 Roulette interactive.\n"
-            "- Choisis une case (couleur, pair/impair, douzaine) puis une mise via les menus.\n"
-            "- Le message se met à jour à chaque mise pour suivre tes paris.\n"
-            "- Règles : numéro exact x35, couleur/pair/impair x2, douzaine x3."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="/slots <mise>",
-        value=(
-            "🎰 Machine à sous.\n"
-            "- Choisis une mise.\n"
-            "- Si tu alignes 3 symboles identiques sur la première ligne : x5 ta mise.\n"
-            "- Résultat affiché et solde mis à jour automatiquement."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="� /random <maximum>",
-        value=(
-            "Génère un nombre aléatoire entre 1 et le nombre choisi.\n"
-            "- Exemple : `/random 100` génère un nombre entre 1 et 100.\n"
-            "- Maximum autorisé : 1 000 000."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="�🏆 /leaderboard",
-        value=(
-            "Affiche le top 10 des joueurs par solde d'écus.\n"
-            "- Utilise les données stockées dans `data.json`."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="⏱️ /voc <utilisateur?>",
-        value=(
-            "Voir le temps passé en vocal d'un utilisateur (par défaut toi-même).\n"
-            "- Le temps est cumulé et tient compte de la session en cours."
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="🏆 /vocrank",
-        value=(
-            "Affiche le top 10 des utilisateurs par temps vocal.\n"
-            "- Les sessions en cours sont prises en compte."
-        ),
-        inline=False
-    )
+# ---------------- TEMPS VOC ----------------
+# Périodes proposées (en jours, aujourd'hui compris), servies par l'historique par jour
+VOC_PERIODS = [("Aujourd'hui", 1), ("7 derniers jours", 7), ("30 derniers jours", 30)]
 
-    embed.add_field(
-        name="🔧 Règles de rôle vocal (ADMIN)",
-        value=(
-            "/vocrole_add <role> <min_seconds> <max_seconds> — ajouter une règle qui attribue un rôle si le temps vocal de l'utilisateur est entre min et max (en secondes).\n"
-            "/vocrole_remove <role> — supprimer les règles liées à un rôle.\n"
-            "/vocrole_list — lister les règles configurées.\n"
-            "- Le bot exécute périodiquement (_voc_updater_loop) l'attribution/retrait automatique des rôles selon ces règles."
-        ),
-        inline=False
-    )
 
-    embed.add_field(
-        name="🔒 Commandes Admin",
-        value=(
-            "/addcredits <utilisateur> <montant> — ajouter des écus à un utilisateur (admins seulement).\n"
-            "/sync — forcer la synchronisation globale des commandes (admins seulement)."
-        ),
-        inline=False
-    )
+def format_duration(total):
+    return f"{total // 3600}h {(total % 3600) // 60}m {total % 60}s"
 
-    embed.add_field(
-        name="🏷️ Grades & temps requis",
-        value=(
-            "Fou de la gare → 604800s (168h / 7 jours)\n"
-            "La frite de devon → 432000s (120h / 5 jours)\n"
-            "Jessy nous devont cuit → 259200s (72h / 3 jours)\n"
-            "Chèvre de benjamin → 172800s (48h / 2 jours)\n"
-            "Toilet de libraité → 86400s (24h / 1 jour)\n"
-            "RP Kurt Cobain → 57600s (16h)\n"
-            "Creep guy next door → 28800s (8h)\n"
-            "LE 10 balles de max → 10800s (3h)\n"
-            "Le voisin d'Émile → 3600s (1h)\n"
-            "Maluce plus de briquet → 0s (gratuit)\n\n"
-        ),
-        inline=False
-    )
 
-    embed.set_footer(text="Amuse-toi bien au casino ! 🎲 — Données persistées dans data.json")
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-
-# ---------------- TEMPS VOC ----------------
 @tree.command(name="voc", description="Voir le temps passé en vocal d'un utilisateur")
+@metrics.timed("/voc")
 async def voc(interaction: discord.Interaction, user: discord.User = None):
     if user is None:
         user = interaction.user
-    user_id = str(user.id)
-    total = voc_data.get(user_id, {}).get("total", 0)
-    # Si l'utilisateur est actuellement en vocal, ajoute la session en cours
-    if user_id in voc_data and voc_data[user_id].get("last_join"):
-        total += int(time.time() - voc_data[user_id]["last_join"])
-    hours = total // 3600
-    minutes = (total % 3600) // 60
-    seconds = total % 60
+    # Inclut la session en cours si l'utilisateur est actuellement en vocal
+    total, _ = voice_tracker.total(user.id)
     embed = discord.Embed(
         title=f"⏱️ Temps vocal de {user.display_name}",
         color=discord.Color.blue(),
-        description=f"{hours}h {minutes}m {seconds}s cumulés en vocal."
+        description=f"{format_duration(total)} cumulés en vocal."
     )
+    for name, days in VOC_PERIODS:
+        embed.add_field(name=name, value=format_duration(voice_tracker.period(user.id, days)), inline=True)
     await interaction.response.send_message(embed=embed)
 
 
 @tree.command(name="vocrank", description="Affiche le top 10 des utilisateurs par temps vocal")
-async def voc_rank(interaction: discord.Interaction):
-    # Build leaderboard from voc_data totals (include ongoing sessions)
-    entries = []
-    now = time.time()
-    for uid, d in voc_data.items():
-        total = d.get("total", 0)
-        if d.get("last_join"):
-            total += int(now - d.get("last_join"))
-        entries.append((uid, total))
-    entries.sort(key=lambda x: x[1], reverse=True)
+@app_commands.describe(periode="Période du classement (par défaut : depuis toujours)")
+@app_commands.choices(periode=[app_commands.Choice(name=name, value=days) for name, days in VOC_PERIODS])
+@metrics.timed("/vocrank")
+async def voc_rank(interaction: discord.Interaction, periode: app_commands.Choice[int] = None):
+    # Top 10, sessions en cours comprises
+    if periode is None:
+        entries = store.top_voc(10, live=voice_tracker.live())
+        title = "🏆 Classement temps vocal"
+    else:
+        entries = voice_tracker.top_period(periode.value, 10)
+        title = f"🏆 Classement temps vocal — {periode.name.lower()}"
+    names = await name_resolver.resolve([uid for uid, _ in entries], interaction.guild)
     description = ""
-    for i, (uid, secs) in enumerate(entries[:10], start=1):
-        try:
-            user = await bot.fetch_user(int(uid))
-            name = user.name
-        except Exception:
-            name = uid
-        h = secs // 3600
-        m = (secs % 3600) // 60
-        s = secs % 60
-        description += f"{i}. {name} — {h}h {m}m {s}s\n"
+    for i, (uid, secs) in enumerate(entries, start=1):
+        description += f"{i}. {names[uid]} — {format_duration(secs)}\n"
     if not description:
         description = "Aucun enregistrement de temps vocal pour le moment."
-    embed = discord.Embed(title="🏆 Classement temps vocal", description=description, color=discord.Color.gold())
+    embed = discord.Embed(title=title, description=description, color=discord.Color.gold())
     await interaction.response.send_message(embed=embed)
 
 
 @tree.command(name="vocrole_add", description="[ADMIN] Ajouter une règle: si un utilisateur a entre X et Y secondes, lui donner un rôle")
+@metrics.timed("/vocrole_add")
 async def vocrole_add(interaction: discord.Interaction, role: discord.Role, min_seconds: int, max_seconds: int):
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Seuls les administrateurs peuvent utiliser cette commande.", ephemeral=True)
@@ -740,47 +859,46 @@ async def vocrole_add(interaction: discord.Interaction, role: discord.Role, min_
 
     # Store rule
     rule = {"min_seconds": int(min_seconds), "max_seconds": int(max_seconds), "role_id": int(role.id)}
-    settings.setdefault("voc_role_rules", []).append(rule)
-    save_settings()
+    if interaction.guild_id:
+        # Règle propre à ce serveur (les règles sans guild_id s'appliquent partout)
+        rule["guild_id"] = int(interaction.guild_id)
+    rules = store.get_setting("voc_role_rules", [])
+    rules.append(rule)
+    store.set_setting("voc_role_rules", rules)
+    role_reconciler.rules_changed(interaction.guild)
     await interaction.response.send_message(f"✅ Règle ajoutée: {role.name} pour {min_seconds}s - {max_seconds}s")
 
 
 @tree.command(name="vocrole_remove", description="[ADMIN] Supprimer une règle par role_id")
+@metrics.timed("/vocrole_remove")
 async def vocrole_remove(interaction: discord.Interaction, role: discord.Role):
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Seuls les administrateurs peuvent utiliser cette commande.", ephemeral=True)
         return
-    before = len(settings.get("voc_role_rules", []))
-    settings["voc_role_rules"] = [r for r in settings.get("voc_role_rules", []) if int(r["role_id"]) != int(role.id)]
-    after = len(settings.get("voc_role_rules", []))
-    save_settings()
+    rules = store.get_setting("voc_role_rules", [])
+    kept = [r for r in rules if int(r["role_id"]) != int(role.id)]
+    before = len(rules)
+    after = len(kept)
+    store.set_setting("voc_role_rules", kept)
+    role_reconciler.rules_changed(interaction.guild)
     await interaction.response.send_message(f"✅ Règles supprimées pour le rôle {role.name}: {before-after} supprimée(s)")
 
 
 @tree.command(name="vocrole_list", description="[ADMIN] Lister les règles de rôle voc")
+@metrics.timed("/vocrole_list")
 async def vocrole_list(interaction: discord.Interaction):
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Seuls les administrateurs peuvent utiliser cette commande.", ephemeral=True)
         return
 
-    # Group rules by role_id and merge ranges
-    grouped = {}
-    for r in settings.get("voc_role_rules", []):
-        rid = int(r["role_id"])
-        mn = int(r["min_seconds"])
-        mx = int(r["max_seconds"])
-        if rid not in grouped:
-            grouped[rid] = {"min": mn, "max": mx}
-        else:
-            grouped[rid]["min"] = min(grouped[rid]["min"], mn)
-            grouped[rid]["max"] = max(grouped[rid]["max"], mx)
-
-    if not grouped:
+    # Same compiled index as the role reconciler (ranges already merged per role)
+    index = role_reconciler.index_for(interaction.guild_id)
+    if not index.spans:
         await interaction.response.send_message("Aucune règle configurée.", ephemeral=True)
         return
 
     lines = []
-    for rid, span in grouped.items():
+    for rid, spans in sorted(index.spans.items(), key=lambda x: x[1][0]):
         role_name = None
         for g in bot.guilds:
             role = g.get_role(rid)
@@ -789,61 +907,110 @@ async def vocrole_list(interaction: discord.Interaction):
                 break
         if not role_name:
             role_name = str(rid)
-        lines.append(f"- {role_name}: {span['min']}s - {span['max']}s")
+        ranges = ", ".join(f"{mn}s - {mx}s" for mn, mx in spans)
+        lines.append(f"- {role_name}: {ranges}")
 
     embed = discord.Embed(title="Règles voc role", description="\n".join(lines), color=discord.Color.blue())
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 
+# ---------------- STATS (ADMIN) ----------------
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 : pas d'endpoint Prometheus
+
+
+def setup_metrics():
+    metrics.instrument_http(bot)
+    store.on_flush = lambda seconds: metrics.registry.observe("store.flush", seconds * 1000)
+    for prefix, source in (("store", store), ("economy", economy), ("names", name_resolver),
+                           ("voice", voice_tracker), ("voc_roles", role_reconciler), ("startup", startup), ("logs", logs)):
+        metrics.registry.add_collector(prefix, source.stats)
+    metrics.registry.add_collector("gateway", lambda: {"latency_ms": bot.latency * 1000, "guilds": len(bot.guilds)})
+    startup.supervise("retard boucle", metrics.monitor_loop_lag)
+    if METRICS_PORT:
+        startup.supervise("endpoint métriques", lambda: metrics.serve(METRICS_PORT))
+
+
+@tree.command(name="stats", description="[ADMIN] Latences des commandes, erreurs et appels REST")
+@metrics.timed("/stats")
+async def stats_command(interaction: discord.Interaction):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Seuls les administrateurs peuvent utiliser cette commande.", ephemeral=True)
+        return
+    lines = metrics.summary(15) or ["Aucune mesure pour le moment."]
+    embed = discord.Embed(title="📊 Statistiques", color=discord.Color.blue(), description="```\n" + "\n".join(lines) + "\n```")
+    store_stats = store.stats()
+    embed.add_field(name="Sauvegardes", value=f"{store_stats['flushes']} écritures, dernière {store_stats['last_flush_ms']} ms, {store_stats['errors']} erreurs")
+    embed.add_field(name="Gateway", value=f"latence {bot.latency * 1000:.0f} ms")
+    queue = role_reconciler.queue.stats()
+    embed.add_field(
+        name="File des rôles voc",
+        value=(f"{queue['backlog']} en attente, {queue['per_minute']}/min, {queue['applied']} appliqués, "
+               f"{queue['retries']} reprises, {queue['rate_limited']} rate limits, {queue['errors']} erreurs"),
+        inline=False,
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
 # ---------------- ON READY ----------------
 @bot.event
 async def on_ready():
-    print(f"✅ Connecté en tant que {bot.user}")
-    print(f"🌐 Serveurs connectés: {len(bot.guilds)}")
+    print(f"✅ Connecté en tant que {bot.user} ({len(bot.guilds)} serveurs)")
+
+    # on_ready est rappelé à chaque reconnexion : seules les phases non faites sont exécutées
+    first = await startup.run_once("permissions", check_permissions)
+    if OWNS_SHARD_0:
+        await startup.run_once("commandes", sync_command_tree)
+
+    # Aligne les sessions sur les membres en vocal (reprise après redémarrage ou reconnexion)
+    in_voice = []
     for guild in bot.guilds:
-        print(f"   - {guild.name} (ID: {guild.id})")
+        for vc in getattr(guild, 'voice_channels', []):
+            for member in vc.members:
+                in_voice.append((member.id, guild.id))
+    # Entrées et sorties manquées pendant la déconnexion : les rôles voc des concernés sont réévalués
+    for user_id in voice_tracker.sync(in_voice):
+        role_reconciler.member_changed(user_id)
+
+    startup.supervise("checkpoints vocaux", voice_tracker.run)
+    # Rôles voc : une évaluation complète, puis uniquement aux franchissements de seuil
+    startup.supervise("rôles voc", role_reconciler.run)
+    if MULTI_PROCESS:
+        # Les règles peuvent être modifiées depuis un autre processus
+        startup.supervise("règles voc partagées", watch_shared_rules)
+
+    if first:
+        print(startup.report())
+        print("🚀 Bot prêt à recevoir des commandes !")
+
+
+async def watch_shared_rules(interval=30.0):
+    while True:
+        await asyncio.sleep(interval)
+        role_reconciler.refresh_rules()
+
 
-    # Synchronisation globale des commandes (sans GUILD_IDS)
+async def sync_command_tree():
     try:
-        await tree.sync()
-        print("✅ Commandes synchronisées globalement (propagation lente)")
+        if await startup.sync_commands(tree, bot.application_id):
+            print("✅ Commandes synchronisées globalement (propagation lente)")
+        else:
+            print("✅ Commandes inchangées depuis le dernier sync, synchronisation ignorée")
     except Exception as e:
         print(f"❌ Erreur lors de la synchronisation globale des commandes: {e}")
 
-    print("📌 Commandes disponibles :", [cmd.name for cmd in tree.get_commands()])
-    
-    # Vérifier les permissions dans chaque serveur
-    for guild in bot.guilds:
-        me = guild.me
-        print(f"🔐 Permissions dans '{guild.name}':")
-        print(f"   - send_messages: {me.guild_permissions.send_messages}")
-        print(f"   - embed_links: {me.guild_permissions.embed_links}")
-        print(f"   - use_application_commands: {me.guild_permissions.use_application_commands}")
-        if not me.guild_permissions.use_application_commands:
-            print(f"   ⚠️  ATTENTION: Le bot n'a pas la permission use_application_commands !")
-    
-    print("🚀 Bot prêt à recevoir des commandes !")
 
-    # Initialize last_join for members already in voice channels (after restart)
-    changed = False
-    now = time.time()
+def check_permissions():
+    # Signale seulement les serveurs où il manque une permission utile
     for guild in bot.guilds:
-        for vc in getattr(guild, 'voice_channels', []):
-            for member in vc.members:
-                uid = str(member.id)
-                voc_data.setdefault(uid, {"total": 0, "last_join": None})
-                if not voc_data[uid].get("last_join"):
-                    voc_data[uid]["last_join"] = now
-                    changed = True
-    if changed:
-        save_voc()
-
-    # start background updater
-    bot.loop.create_task(_voc_updater_loop())
+        perms = guild.me.guild_permissions
+        missing = [name for name in ("send_messages", "embed_links", "use_application_commands") if not getattr(perms, name)]
+        if missing:
+            print(f"⚠️  Permissions manquantes dans '{guild.name}' (ID: {guild.id}) : {', '.join(missing)}")
 
 
 @tree.command(name="sync", description="[ADMIN] Forcer la synchronisation des commandes")
+@metrics.timed("/sync")
 async def sync_commands(interaction: discord.Interaction):
     # Restreint aux administrateurs
     if not interaction.user.guild_permissions.administrator:
@@ -857,12 +1024,20 @@ async def sync_commands(interaction: discord.Interaction):
         await interaction.response.send_message(f"✅ Synchronisation effectuée pour **{guild_name}** (instantané)")
         print(f"🔄 [SYNC] Synchronisation manuelle effectuée pour '{guild_name}' (ID: {interaction.guild_id}) par {interaction.user}")
     else:
-        await tree.sync()
+        await startup.sync_commands(tree, bot.application_id, force=True)
         await interaction.response.send_message("✅ Synchronisation globale lancée (propagation lente)")
         print(f"🔄 [SYNC] Synchronisation globale manuelle effectuée par {interaction.user}")
 
+AVATARS_CONCURRENCY = int(os.getenv("AVATARS_CONCURRENCY", "8"))
+# Cache disque des avatars (clé = hash d'avatar), réutilisé d'un export à l'autre
+avatar_cache = AvatarCache(
+    os.getenv("AVATAR_CACHE_DIR", "avatar_cache"),
+    max_bytes=int(os.getenv("AVATAR_CACHE_MB", "512")) * 1024 * 1024,
+)
+
 @tree.command(name="avatars", description="[ADMIN] Récupérer tous les avatars du serveur en un ZIP")
-async def avatars(interaction: discord.Interaction):
+@metrics.timed("/avatars")
+async def avatars(interaction: discord.Interaction, cache_only: bool = False):
     # Doit être exécuté dans un serveur
     if not interaction.guild:
         await interaction.response.send_message("❌ Cette commande doit être utilisée dans un serveur.", ephemeral=True)
@@ -880,33 +1055,13 @@ async def avatars(interaction: discord.Interaction):
     out_filename = f"avatars_{interaction.guild.id}_{timestamp}.zip"
     out_path = os.path.join(os.getcwd(), out_filename)
 
+    async def progress(done, total):
+        await interaction.edit_original_response(content=f"⏳ Avatars récupérés : {done}/{total}")
+
     try:
-        # Create ZIP on disk
-        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            async with aiohttp.ClientSession() as session:
-                for m in members:
-                    try:
-                        url = str(m.display_avatar.url)
-                        if not url:
-                            continue
-                        async with session.get(url) as resp:
-                            if resp.status != 200:
-                                continue
-                            content = await resp.read()
-                            ct = resp.headers.get("Content-Type", "")
-                            ext = "png"
-                            if "gif" in ct:
-                                ext = "gif"
-                            elif "webp" in ct:
-                                ext = "webp"
-                            elif "jpeg" in ct or "jpg" in ct:
-                                ext = "jpg"
-                            # sanitize filename
-                            name = re.sub(r"[^\w\-_. ]", "", m.display_name)[:50] or str(m.id)
-                            filename = f"{name}_{m.id}.{ext}"
-                            zf.writestr(filename, content)
-                    except Exception:
-                        continue
+        # Download concurrently, ZIP written from a worker thread
+        archiver = AvatarArchiver(concurrency=AVATARS_CONCURRENCY, cache=avatar_cache, cache_only=cache_only)
+        result = await archiver.archive(members, out_path, progress=progress)
 
         size = os.path.getsize(out_path)
         size_mb = size / (1024 * 1024)
@@ -914,7 +1069,7 @@ async def avatars(interaction: discord.Interaction):
 
         # Notify and provide local path
         await interaction.followup.send(f"✅ ZIP généré et sauvegardé localement : `{out_path}` ({size_mb:.2f} MB)")
-        log(f"[AVATARS] {interaction.user} a généré un ZIP d'avatars local: {out_path} ({len(members)} membres)")
+        log("avatars", "ZIP d'avatars généré", user=interaction.user.id, path=out_path, **result)
 
         # If small enough, also send via Discord
         if size <= limit:
@@ -927,4 +1082,10 @@ async def avatars(interaction: discord.Interaction):
     except Exception as e:
         await interaction.followup.send(f"❌ Erreur lors de la génération du ZIP: {e}", ephemeral=True)
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    try:
+        bot.run(TOKEN)
+    finally:
+        # Dernière écriture des modifications en attente
+        voice_tracker.flush_sync()
+        store.flush_sync()
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+
+
+STARTING_BALANCE = 1000
+
+
+class Reservation:
+    """Mise débitée en attente de règlement (gain, perte ou remboursement)."""
+
+    __slots__ = ("user_id", "amount", "game", "closed")
+
+    def __init__(self, user_id, amount, game):
+        self.user_id = user_id
+        self.amount = amount
+        self.game = game
+        self.closed = False
+
+
+class Economy:
+    """Opérations sur les soldes, sérialisées par utilisateur.
+
+    Une mise est débitée d'un bloc par `reserve()` (vérification du solde et
+    débit sous le même verrou), puis réglée une seule fois par `settle()` ou
+    `refund()`. Plusieurs parties ouvertes par un même joueur ne peuvent donc
+    pas miser un argent déjà engagé. Les verrous sont répartis sur `stripes`
+    verrous partagés pour garder une mémoire bornée, sans verrou global.
+    """
+
+    def __init__(self, store, stripes=64):
+        self.store = store
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+        # Compteurs
+        self.reserved = 0
+        self.settled = 0
+        self.refunded = 0
+        self.rejected = 0
+
+    def lock_for(self, user_id):
+        return self._locks[int(user_id) % len(self._locks)]
+
+    def balance(self, user_id):
+        """Solde de l'utilisateur (le compte est créé avec STARTING_BALANCE au besoin)"""
+        return self.store.open_account(user_id, STARTING_BALANCE, "init")
+
+    def credit(self, user_id, amount, reason):
+        """Variation de solde hors partie (daily, addcredits...)"""
+        self.balance(user_id)
+        return self.store.apply_delta(user_id, amount, reason)
+
+    async def reserve(self, user_id, amount, game):
+        """Débite la mise ; renvoie une Reservation, ou None si le solde est insuffisant"""
+        async with self.lock_for(user_id):
+            # try_debit vérifie le solde et débite d'un bloc (atomique aussi entre processus avec SQLite)
+            self.balance(user_id)
+            if amount <= 0 or self.store.try_debit(user_id, amount, f"{game}:mise") is None:
+                self.rejected += 1
+                return None
+        self.reserved += 1
+        return Reservation(user_id, amount, game)
+
+    async def settle(self, reservation, payout):
+        """Règle la mise en créditant `payout` (mise comprise, 0 si perdue). Sans effet si déjà réglée."""
+        async with self.lock_for(reservation.user_id):
+            if reservation.closed:
+                return False
+            reservation.closed = True
+            if payout > 0:
+                self.store.apply_delta(reservation.user_id, payout, f"{reservation.game}:gain")
+        self.settled += 1
+        return True
+
+    async def settle_many(self, payouts):
+        """Règle plusieurs mises [(reservation, payout)] en une seule écriture groupée.
+
+        Les gains d'un même joueur sont additionnés (une ligne de journal par
+        joueur). Renvoie le nombre de mises réglées ; celles déjà réglées sont
+        ignorées.
+        """
+        stripes = sorted({int(r.user_id) % len(self._locks) for r, _ in payouts})
+        settled = 0
+        gains = {}
+        async with contextlib.AsyncExitStack() as stack:
+            # Verrous pris dans un ordre fixe : pas d'interblocage avec un autre lot
+            for stripe in stripes:
+                await stack.enter_async_context(self._locks[stripe])
+            for reservation, payout in payouts:
+                if reservation.closed:
+                    continue
+                reservation.closed = True
+                settled += 1
+                if payout > 0:
+                    key = (reservation.user_id, f"{reservation.game}:gain")
+                    gains[key] = gains.get(key, 0) + payout
+            self.store.apply_deltas([(user_id, gain, reason) for (user_id, reason), gain in gains.items()])
+        self.settled += settled
+        return settled
+
+    async def refund(self, reservation):
+        """Rend la mise (partie abandonnée). Sans effet si déjà réglée."""
+        async with self.lock_for(reservation.user_id):
+            if reservation.closed:
+                return False
+            reservation.closed = True
+            self.store.apply_delta(reservation.user_id, reservation.amount, f"{reservation.game}:remboursement")
+        self.refunded += 1
+        return True
+
+    def stats(self):
+        return {
+            "reserved": self.reserved,
+            "settled": self.settled,
+            "refunded": self.refunded,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,169 @@
+import discord
+
+
+class EmbedTemplate:
+    """Embed dont le titre, la couleur, les noms de champs et le pied de page sont figés.
+
+    La base est sérialisée une seule fois en dict ; `render()` n'y ajoute que
+    les valeurs qui changent (description, valeurs des champs, couleur...).
+    """
+
+    def __init__(self, title, color=None, fields=(), footer=None, description=None):
+        base = discord.Embed(title=title, color=color, description=description)
+        for name, inline in fields:
+            base.add_field(name=name, value="\u200b", inline=inline)
+        if footer is not None:
+            base.set_footer(text=footer)
+        self.base = base.to_dict()
+        self.fields = self.base.pop("fields", [])
+
+    def render(self, *values, description=None, color=None, footer=None, extra=()):
+        """`values` remplit les champs du modèle dans l'ordre ; `extra` ajoute des champs (nom, valeur, inline)"""
+        data = dict(self.base)
+        if description is not None:
+            data["description"] = description
+        if color is not None:
+            data["color"] = color.value
+        if footer is not None:
+            data["footer"] = {"text": footer}
+        fields = [{"name": f["name"], "value": value, "inline": f["inline"]} for f, value in zip(self.fields, values)]
+        fields += [{"name": name, "value": value, "inline": inline} for name, value, inline in extra]
+        if fields:
+            data["fields"] = fields
+        return discord.Embed.from_dict(data)
+
+
+# ---------------- Grades ----------------
+# (nom, secondes de vocal requises), du plus haut au plus bas
+GRADES = [
+    ("Fou de la gare", 604800),
+    ("La frite de devon", 432000),
+    ("Jessy nous devont cuit", 259200),
+    ("Chèvre de benjamin", 172800),
+    ("Toilet de libraité", 86400),
+    ("RP Kurt Cobain", 57600),
+    ("Creep guy next door", 28800),
+    ("LE 10 balles de max", 10800),
+    ("Le voisin d'Émile", 3600),
+    ("Maluce plus de briquet", 0),
+]
+
+
+def _grade_line(name, seconds):
+    hours, days = seconds // 3600, seconds // 86400
+    if seconds == 0:
+        label = "gratuit"
+    elif seconds % 86400 == 0:
+        label = f"{hours}h / {days} jour{'s' if days > 1 else ''}"
+    else:
+        label = f"{hours}h"
+    return f"{name} → {seconds}s ({label})"
+
+
+GRADES_TEXT = "\n".join(_grade_line(name, seconds) for name, seconds in GRADES)
+
+
+# ---------------- Aide ----------------
+HELP_FIELDS = [
+    ("💎 Monnaie : écus", (
+        "- Chaque utilisateur commence avec 1000 écus.\n"
+        "- Les écus sont sauvegardés par le bot (banque, daily, temps vocal, réglages).\n"
+        "- Les mises retirent automatiquement ton solde ; les gains sont ajoutés automatiquement."
+    )),
+    ("/daily", (
+        "🎁 Récupérer tes écus quotidiens (500 écus).\n"
+        "- Utilisable une seule fois toutes les 24 heures.\n"
+        "- Le cooldown est précis : attend 24h depuis ta dernière récupération."
+    )),
+    ("/blackjack <mise>", (
+        "🃏 Blackjack interactif, sabot de 6 jeux.\n"
+        "- Deux cartes te sont distribuées, le croupier en a une cachée.\n"
+        "- `Hit 🟢` pour tirer, `Stand 🔴` pour rester, `Double` pour doubler ta mise (une seule carte), "
+        "`Split` pour séparer une paire.\n"
+        "- Un blackjack servi d'entrée est payé 3 pour 2."
+    )),
+    ("/roulette", (
+        "🎡 Roulette interactive.\n"
+        "- Choisis une case (couleur, pair/impair, manque/passe, douzaine, colonne ou numéro) puis une mise via les menus.\n"
+        "- Le message se met à jour à chaque mise pour suivre tes paris.\n"
+        "- Règles : numéro exact x35, douzaine/colonne x3, couleur/pair/impair/manque/passe x2."
+    )),
+    ("/roulette_table", (
+        "🎡 Table de roulette partagée par le salon.\n"
+        "- Ouvre la table (ou rappelle celle déjà ouverte) : chacun mise avec les menus pendant la fenêtre de mises (30 s par défaut).\n"
+        "- Un seul tirage pour tous, puis un message de résultat avec le gain de chaque joueur."
+    )),
+    ("/slots <mise>", (
+        "🎰 Machine à sous.\n"
+        "- Choisis une mise.\n"
+        "- Si tu alignes 3 symboles identiques sur la première ligne : x5 ta mise.\n"
+        "- Résultat affiché et solde mis à jour automatiquement."
+    )),
+    ("🎲 /random <maximum>", (
+        "Génère un nombre aléatoire entre 1 et le nombre choisi.\n"
+        "- Exemple : `/random 100` génère un nombre entre 1 et 100.\n"
+        "- Maximum autorisé : 1 000 000."
+    )),
+    ("🏆 /leaderboard", "Affiche le top 10 des joueurs par solde d'écus."),
+    ("🏅 /rank", "Affiche ta position dans le classement des écus."),
+    ("⏱️ /voc <utilisateur?>", (
+        "Voir le temps passé en vocal d'un utilisateur (par défaut toi-même).\n"
+        "- Le temps est cumulé et tient compte de la session en cours ; aujourd'hui, 7 et 30 derniers jours en détail."
+    )),
+    ("🏆 /vocrank <periode?>", (
+        "Affiche le top 10 des utilisateurs par temps vocal.\n"
+        "- Période au choix : aujourd'hui, 7 ou 30 derniers jours (par défaut : depuis toujours).\n"
+        "- Les sessions en cours sont prises en compte."
+    )),
+    ("🔧 Règles de rôle vocal (ADMIN)", (
+        "/vocrole_add <role> <min_seconds> <max_seconds> — ajouter une règle qui attribue un rôle si le temps vocal de l'utilisateur est entre min et max (en secondes).\n"
+        "/vocrole_remove <role> — supprimer les règles liées à un rôle.\n"
+        "/vocrole_list — lister les règles configurées.\n"
+        "- Le bot attribue/retire automatiquement les rôles dès qu'un seuil est franchi."
+    )),
+    ("🔒 Commandes Admin", (
+        "/addcredits <utilisateur> <montant> — ajouter des écus à un utilisateur (admins seulement).\n"
+        "/sync — forcer la synchronisation globale des commandes (admins seulement).\n"
+        "/stats — latences des commandes, erreurs et appels REST (admins seulement)."
+    )),
+    ("🏷️ Grades & temps requis", GRADES_TEXT),
+]
+
+# Construit une seule fois : l'embed d'aide ne dépend d'aucune donnée
+HELP = discord.Embed(
+    title="🎰 Bot Casino - Aide complète",
+    color=discord.Color.gold(),
+    description="Liste des commandes et mécaniques disponibles :"
+)
+for _name, _value in HELP_FIELDS:
+    HELP.add_field(name=_name, value=_value, inline=False)
+HELP.set_footer(text="Amuse-toi bien au casino ! 🎲")
+
+
+# ---------------- Modèles ----------------
+BLACKJACK = EmbedTemplate("🃏 Blackjack", discord.Color.blurple())
+ROULETTE = EmbedTemplate("🎡 Roulette", discord.Color.blurple(), description="Choisis une case et une mise via les menus.")
+ROULETTE_RESULT = EmbedTemplate("🎡 Roulette", discord.Color.gold(), fields=[("Résultat des mises", False), ("Solde actuel", True)])
+ROULETTE_TABLE = EmbedTemplate("🎡 Table de roulette", discord.Color.blurple(), footer="Un seul tirage pour tous les joueurs")
+ROULETTE_TABLE_RESULT = EmbedTemplate("🎡 Table de roulette", discord.Color.gold(), fields=[("Joueurs", False), ("Table", False)])
+SLOTS = EmbedTemplate("🎰 Machine à sous", discord.Color.blurple())
+SLOTS_RESULT = EmbedTemplate("🎰 Machine à sous", fields=[("Résultat", True), ("Nouveau solde", True)])
+
+LEADERBOARD = EmbedTemplate("🏆 Classement général", discord.Color.gold())
+RANK = EmbedTemplate("🏅 Ton classement", discord.Color.gold())
+DAILY_CLAIMED = EmbedTemplate(
+    "🎁 Daily Écus", discord.Color.green(),
+    fields=[("Écus reçus", True), ("Nouveau solde", True)],
+    footer="Reviens demain pour récupérer tes prochains crédits !",
+    description="Tu as récupéré tes écus quotidiens !",
+)
+DAILY_WAIT = EmbedTemplate(
+    "⏰ Daily Écus", discord.Color.orange(),
+    fields=[("Temps restant", False)],
+    footer="Patience, tu pourras bientôt récupérer tes prochains crédits !",
+    description="Tu as déjà récupéré tes écus quotidiens !",
+)
+ADD_CREDITS = EmbedTemplate(
+    "💳 Écus ajoutés", discord.Color.green(),
+    fields=[("Solde avant", True), ("Montant ajouté", True), ("Nouveau solde", True)],
+)
@@ -0,0 +1,4 @@
+"""Règles des jeux du casino, sans dépendance à Discord.
+
+Ces moteurs sont utilisés par bot.py et par le simulateur (`python -m games.simulate`).
+"""
@@ -0,0 +1,189 @@
+import random
+
+
+# Valeurs des 13 rangs : 10, valet, dame, roi valent 10 ; l'as vaut 11 (ou 1)
+CARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11)
+DECKS = 6
+PENETRATION = 0.75  # part du sabot distribuée avant de remélanger
+DEALER_STANDS_ON = 17
+MAX_HANDS = 4  # mains par joueur après séparations
+
+
+class Shoe:
+    """Sabot de `decks` jeux de 52 cartes, remélangé une fois la pénétration atteinte.
+
+    Avec un `seed`, la suite des cartes (remélanges compris) est reproductible.
+    """
+
+    def __init__(self, decks=DECKS, seed=None, penetration=PENETRATION):
+        self.rng = random.Random(seed)
+        self.decks = decks
+        self.cut = int(decks * 52 * (1 - penetration))
+        self.cards = []
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self):
+        self.cards = list(CARD_VALUES) * 4 * self.decks
+        self.rng.shuffle(self.cards)
+        self.shuffles += 1
+
+    def draw(self):
+        if len(self.cards) <= self.cut:
+            self.shuffle()
+        return self.cards.pop()
+
+
+class Hand:
+    """Main tenue à jour carte par carte : total courant et nombre d'as comptés 11."""
+
+    __slots__ = ("cards", "total", "soft", "bet", "doubled", "split", "done")
+
+    def __init__(self, bet=0, split=False):
+        self.cards = []
+        self.total = 0
+        self.soft = 0
+        self.bet = bet
+        self.doubled = False
+        self.split = split  # issue d'une séparation : 21 en deux cartes n'est pas un blackjack
+        self.done = False
+
+    def add(self, card):
+        self.cards.append(card)
+        self.total += card
+        if card == 11:
+            self.soft += 1
+        while self.total > 21 and self.soft:
+            self.total -= 10
+            self.soft -= 1
+
+    @property
+    def busted(self):
+        return self.total > 21
+
+    @property
+    def blackjack(self):
+        return self.total == 21 and len(self.cards) == 2 and not self.split
+
+    @property
+    def can_double(self):
+        return len(self.cards) == 2 and not self.done
+
+    def __repr__(self):
+        return f"{self.cards} → {self.total}"
+
+
+def settle(hand, dealer):
+    """(gain brut mise comprise, issue) ; issue parmi bust, blackjack, win, push, lose"""
+    if hand.busted:
+        return 0, "bust"
+    if hand.blackjack:
+        if dealer.blackjack:
+            return hand.bet, "push"
+        return hand.bet * 5 // 2, "blackjack"  # payé 3 pour 2
+    if dealer.blackjack:
+        return 0, "lose"
+    if dealer.busted or hand.total > dealer.total:
+        return 2 * hand.bet, "win"
+    if hand.total == dealer.total:
+        return hand.bet, "push"
+    return 0, "lose"
+
+
+class Round:
+    """Une partie : mains du joueur (séparations comprises) contre le croupier.
+
+    Les actions portent sur la main active (`hand`) ; la partie est terminée
+    (`finished`) une fois toutes les mains jouées et le croupier servi.
+    """
+
+    def __init__(self, shoe, bet):
+        self.shoe = shoe
+        self.hands = [Hand(bet)]
+        self.dealer = Hand()
+        self.active = 0
+        self.finished = False
+        for _ in range(2):
+            self.hands[0].add(shoe.draw())
+            self.dealer.add(shoe.draw())
+        # Blackjack d'un côté ou de l'autre : la partie s'arrête tout de suite
+        if self.hands[0].blackjack or self.dealer.blackjack:
+            self.hands[0].done = True
+            self.finished = True
+
+    @property
+    def hand(self):
+        return self.hands[self.active]
+
+    @property
+    def can_split(self):
+        hand = self.hand
+        return (not self.finished and len(hand.cards) == 2 and hand.cards[0] == hand.cards[1]
+                and len(self.hands) < MAX_HANDS)
+
+    @property
+    def can_double(self):
+        return not self.finished and self.hand.can_double
+
+    def _next_hand(self):
+        self.hand.done = True
+        self._advance_from(self.active + 1)
+
+    def _advance_from(self, index):
+        """Active la première main encore à jouer à partir de `index`, sinon sert le croupier"""
+        for i in range(index, len(self.hands)):
+            if self.hands[i].total >= 21:
+                self.hands[i].done = True
+            if not self.hands[i].done:
+                self.active = i
+                return
+        self.active = len(self.hands) - 1
+        self._play_dealer()
+
+    def _play_dealer(self):
+        # Inutile de servir le croupier si toutes les mains ont sauté
+        if not all(hand.busted for hand in self.hands):
+            while self.dealer.total < DEALER_STANDS_ON:
+                self.dealer.add(self.shoe.draw())
+        self.finished = True
+
+    def hit(self):
+        hand = self.hand
+        hand.add(self.shoe.draw())
+        if hand.total >= 21:
+            self._next_hand()
+        return hand
+
+    def stand(self):
+        self._next_hand()
+
+    def double(self):
+        """Double la mise de la main active, qui reçoit une seule carte"""
+        hand = self.hand
+        hand.bet *= 2
+        hand.doubled = True
+        hand.add(self.shoe.draw())
+        self._next_hand()
+        return hand
+
+    def split(self):
+        """Sépare une paire en deux mains de même mise ; des as séparés ne reçoivent qu'une carte"""
+        hand = self.hand
+        card = hand.cards.pop()
+        aces = card == 11
+        first = Hand(hand.bet, split=True)
+        second = Hand(hand.bet, split=True)
+        first.add(hand.cards[0])
+        second.add(card)
+        first.add(self.shoe.draw())
+        second.add(self.shoe.draw())
+        self.hands[self.active:self.active + 1] = [first, second]
+        if aces:
+            first.done = second.done = True
+        self._advance_from(self.active)
+        return first, second
+
+    def results(self):
+        """[(main, gain brut, issue)] une fois la partie terminée"""
+        return [(hand, *settle(hand, self.dealer)) for hand in self.hands]
+
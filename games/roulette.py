@@ -0,0 +1,63 @@
+import random
+
+
+RED_NUMBERS = frozenset({1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36})
+POCKETS = 37  # 0 à 36
+
+# Gain brut (mise comprise) par écu misé, par type de mise
+MULTIPLIERS = {
+    "number": 35,
+    "split": 18,
+    "column": 3,
+    "dozen": 3,
+    "color": 2,
+    "parity": 2,
+    "half": 2,
+}
+
+COLORS = ("vert",) + tuple("rouge" if n in RED_NUMBERS else "noir" for n in range(1, POCKETS))
+
+
+def _splits():
+    """Paires de cases voisines sur le tapis (3 colonnes), 0 compris avec 1, 2 et 3"""
+    pairs = [(0, 1), (0, 2), (0, 3)]
+    for n in range(1, POCKETS):
+        if n % 3 != 0:
+            pairs.append((n, n + 1))
+        if n + 3 < POCKETS:
+            pairs.append((n, n + 3))
+    return pairs
+
+
+def _winning_keys(number):
+    keys = [f"number:{number}"]
+    keys += [f"split:{a}-{b}" for a, b in _splits() if number in (a, b)]
+    if number != 0:
+        keys.append(f"color:{COLORS[number]}")
+        keys.append("parity:pair" if number % 2 == 0 else "parity:impair")
+        keys.append("half:1-18" if number <= 18 else "half:19-36")
+        low = (number - 1) // 12 * 12 + 1
+        keys.append(f"dozen:{low}-{low + 11}")
+        keys.append(f"column:{(number - 1) % 3 + 1}")
+    return keys
+
+
+# PAYOUTS[case] = {clé de mise gagnante: multiplicateur}, calculé une fois pour toutes
+PAYOUTS = tuple(
+    {key: MULTIPLIERS[key.split(":")[0]] for key in _winning_keys(number)}
+    for number in range(POCKETS)
+)
+BET_KEYS = frozenset(key for payouts in PAYOUTS for key in payouts)
+
+
+def spin(rng=random):
+    return rng.randint(0, POCKETS - 1)
+
+
+def pocket_color(number):
+    return COLORS[number]
+
+
+def payout_multiplier(selection, number):
+    """Gain brut (mise comprise) par écu misé sur `selection` (ex. "color:rouge") si la bille tombe sur `number`"""
+    return PAYOUTS[number].get(selection, 0)
@@ -0,0 +1,224 @@
+"""Simulateur Monte-Carlo des jeux du casino (RTP, variance, courbes de ruine).
+
+    python -m games.simulate --rounds 5000000
+    python -m games.simulate --games slots --slots-multiplier 20 --json
+
+Les tirages sont faits par lots avec NumPy (voir requirements-dev.txt) ; les
+multiplicateurs viennent des moteurs du paquet `games`, si bien que changer une
+règle dans le moteur change aussi la simulation.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from games import blackjack, roulette, slots
+
+
+CHUNK = 1_000_000
+
+
+# ---- Tirages vectorisés : chaque fonction renvoie le gain brut par écu misé ----
+def _add_cards(total, soft, cards):
+    """Ajoute une carte à chaque main (total, nombre d'as comptés 11)"""
+    total += cards
+    soft += cards == 11
+    # Au plus deux as à ramener à 1 par carte ajoutée (ex. as + 10 puis as)
+    for _ in range(2):
+        bust = (total > 21) & (soft > 0)
+        total -= 10 * bust
+        soft -= bust
+
+
+def blackjack_rounds(rng, n, stand_on=17):
+    """Parties de blackjack en sabot infini ; le joueur tire tant qu'il a moins de `stand_on`"""
+    values = np.array(blackjack.CARD_VALUES, dtype=np.int16)
+
+    def deal(n):
+        total = np.zeros(n, dtype=np.int16)
+        soft = np.zeros(n, dtype=np.int16)
+        for _ in range(2):
+            _add_cards(total, soft, rng.choice(values, n))
+        return total, soft
+
+    def draw_until(total, soft, threshold):
+        active = total < threshold
+        while active.any():
+            cards = rng.choice(values, n) * active
+            _add_cards(total, soft, cards)
+            active &= total < threshold
+
+    player, player_soft = deal(n)
+    dealer, dealer_soft = deal(n)
+    player_natural = player == 21
+    dealer_natural = dealer == 21
+    # Un blackjack servi d'entrée termine la partie : personne ne tire
+    draw_until(player, player_soft, np.where(player_natural | dealer_natural, 0, stand_on))
+    draw_until(dealer, dealer_soft, blackjack.DEALER_STANDS_ON)
+
+    payout = np.zeros(n, dtype=np.float64)
+    alive = (player <= 21) & ~dealer_natural
+    payout[alive & ((dealer > 21) | (player > dealer))] = 2.0
+    payout[alive & (dealer <= 21) & (player == dealer)] = 1.0
+    payout[player_natural] = np.where(dealer_natural[player_natural], 1.0, 2.5)
+    return payout
+
+
+def blackjack_shoe_rounds(shoe, n, stand_on=17):
+    """Parties jouées avec le moteur (sabot réel, sans double ni séparation) ; rejouables avec --seed"""
+    payout = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        # Mise de 2 pour que le blackjack payé 3 pour 2 reste entier
+        game = blackjack.Round(shoe, 2)
+        while not game.finished:
+            if game.hand.total < stand_on:
+                game.hit()
+            else:
+                game.stand()
+        payout[i] = blackjack.settle(game.hand, game.dealer)[0] / 2
+    return payout
+
+
+def roulette_table(selection):
+    """Multiplicateur de `selection` pour chaque case, calculé par le moteur"""
+    return np.array([roulette.payout_multiplier(selection, n) for n in range(roulette.POCKETS)], dtype=np.float64)
+
+
+def roulette_rounds(rng, n, selection="color:rouge"):
+    return roulette_table(selection)[rng.integers(0, roulette.POCKETS, n)]
+
+
+def slots_rounds(rng, n, multiplier=None):
+    """Seule la première ligne compte ; les autres lignes n'ont pas besoin d'être tirées"""
+    multiplier = slots.JACKPOT_MULTIPLIER if multiplier is None else multiplier
+    row = rng.integers(0, len(slots.SYMBOLS), (n, slots.REELS))
+    return np.where((row == row[:, :1]).all(axis=1), float(multiplier), 0.0)
+
+
+def check_slots_rule(rng, samples=2000):
+    """Vérifie que la version vectorisée suit la règle du moteur sur des grilles tirées au hasard"""
+    grids = rng.integers(0, len(slots.SYMBOLS), (samples, slots.ROWS, slots.REELS))
+    first_row = grids[:, 0, :]
+    vectorized = np.where((first_row == first_row[:, :1]).all(axis=1), slots.JACKPOT_MULTIPLIER, 0)
+    for grid, expected in zip(grids, vectorized):
+        symbols = [[slots.SYMBOLS[i] for i in row] for row in grid]
+        if slots.payout_multiplier(symbols) != expected:
+            raise SystemExit("La règle des machines à sous a changé : mettre à jour slots_rounds()")
+
+
+# ---- Mesures ----
+def measure(sample, rounds):
+    """RTP, variance et débit (parties/s) sur `rounds` parties"""
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+    start = time.perf_counter()
+    while count < rounds:
+        n = min(CHUNK, rounds - count)
+        payout = sample(n)
+        total += payout.sum()
+        total_sq += np.square(payout).sum()
+        count += n
+    elapsed = time.perf_counter() - start
+    mean = total / count
+    variance = total_sq / count - mean * mean
+    return {
+        "rounds": count,
+        "rtp": mean,
+        "house_edge": 1.0 - mean,
+        "variance": variance,
+        "stderr": (variance / count) ** 0.5,
+        "rounds_per_sec": count / elapsed if elapsed else None,
+    }
+
+
+def ruin_curve(sample, players, bankroll, bet, horizon, points=10):
+    """Part des joueurs ruinés (solde < mise) au fil des parties, `bet` écus misés par partie"""
+    checkpoints = sorted({max(1, round(horizon * (i + 1) / points)) for i in range(points)})
+    ruined_at = np.full(players, horizon + 1, dtype=np.int64)
+    per_batch = max(1, CHUNK // horizon)
+    for first in range(0, players, per_batch):
+        count = min(per_batch, players - first)
+        net = (sample(count * horizon).reshape(count, horizon) - 1.0) * bet
+        balance = bankroll + np.cumsum(net, axis=1)
+        broke = balance < bet
+        hit = broke.any(axis=1)
+        ruined_at[first:first + count][hit] = broke[hit].argmax(axis=1) + 1
+    return [{"round": r, "ruined": float((ruined_at <= r).mean())} for r in checkpoints]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m games.simulate", description=__doc__.splitlines()[0])
+    parser.add_argument("--games", nargs="+", choices=["blackjack", "roulette", "slots"],
+                        default=["blackjack", "roulette", "slots"])
+    parser.add_argument("--rounds", type=int, default=1_000_000, help="parties simulées par jeu")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--stand-on", type=int, default=17, help="le joueur de blackjack s'arrête à ce total")
+    parser.add_argument("--shoe", type=int, default=0, metavar="DECKS",
+                        help="joue le blackjack avec le moteur et un sabot de DECKS jeux (lent, mais rejouable)")
+    parser.add_argument("--roulette-bet", nargs="+", default=["color:rouge", "parity:pair", "dozen:1-12", "number:7"],
+                        metavar="SELECTION", help="mises de roulette à évaluer (format du bot, ex. color:rouge)")
+    parser.add_argument("--slots-multiplier", type=float, default=None,
+                        help=f"multiplicateur du jackpot à tester (production : {slots.JACKPOT_MULTIPLIER})")
+    parser.add_argument("--players", type=int, default=1000, help="joueurs simulés pour les courbes de ruine")
+    parser.add_argument("--bankroll", type=int, default=1000)
+    parser.add_argument("--bet", type=int, default=100)
+    parser.add_argument("--horizon", type=int, default=500, help="parties jouées par joueur")
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    check_slots_rule(rng)
+
+    scenarios = []
+    if "blackjack" in args.games:
+        if args.shoe:
+            shoe = blackjack.Shoe(decks=args.shoe, seed=args.seed)
+            scenarios.append((f"blackjack {args.shoe} jeux (stand {args.stand_on})",
+                              lambda n: blackjack_shoe_rounds(shoe, n, args.stand_on)))
+        else:
+            scenarios.append((f"blackjack (stand {args.stand_on})", lambda n: blackjack_rounds(rng, n, args.stand_on)))
+    if "roulette" in args.games:
+        for selection in args.roulette_bet:
+            scenarios.append((f"roulette {selection}", lambda n, s=selection: roulette_rounds(rng, n, s)))
+    if "slots" in args.games:
+        multiplier = args.slots_multiplier
+        label = f"slots x{multiplier if multiplier is not None else slots.JACKPOT_MULTIPLIER}"
+        scenarios.append((label, lambda n: slots_rounds(rng, n, multiplier)))
+
+    results = []
+    for name, sample in scenarios:
+        result = {"game": name, **measure(sample, args.rounds)}
+        result["ruin"] = ruin_curve(sample, args.players, args.bankroll, args.bet, args.horizon)
+        results.append(result)
+
+    if args.json:
+        json.dump({
+            "seed": args.seed,
+            "ruin_params": {"players": args.players, "bankroll": args.bankroll,
+                            "bet": args.bet, "horizon": args.horizon},
+            "results": results,
+        }, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"{'jeu':<28}{'RTP':>9}{'avantage':>10}{'variance':>10}{'parties/s':>14}{'ruine':>8}")
+    for r in results:
+        rate = f"{r['rounds_per_sec']:,.0f}" if r["rounds_per_sec"] else "-"
+        print(f"{r['game']:<28}{r['rtp']:>9.4f}{r['house_edge']:>+10.4f}{r['variance']:>10.3f}"
+              f"{rate:>14}{r['ruin'][-1]['ruined']:>8.1%}")
+    print()
+    print(f"Ruine : {args.players} joueurs, solde {args.bankroll}, mise {args.bet}, "
+          f"part des joueurs ruinés après n parties")
+    for r in results:
+        curve = "  ".join(f"{p['round']}:{p['ruined']:.0%}" for p in r["ruin"])
+        print(f"  {r['game']:<26}{curve}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import random
+
+
+SYMBOLS = ("🍒", "🍋", "🍉", "⭐", "💎")
+ROWS = 3
+REELS = 3
+JACKPOT_MULTIPLIER = 5
+
+
+def spin(rng=random):
+    """Grille ROWS x REELS de symboles tirés indépendamment"""
+    return [[rng.choice(SYMBOLS) for _ in range(REELS)] for _ in range(ROWS)]
+
+
+def payout_multiplier(grid):
+    """Gain brut (mise comprise) par écu misé : JACKPOT_MULTIPLIER si la première ligne est identique"""
+    first_row = grid[0]
+    if all(x == first_row[0] for x in first_row):
+        return JACKPOT_MULTIPLIER
+    return 0
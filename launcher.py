@@ -0,0 +1,92 @@
+"""Lance le bot sur plusieurs processus, chacun propriétaire d'une plage de shards.
+
+    python launcher.py --shards 4 --processes 2
+
+Chaque processus reçoit SHARD_COUNT et SHARD_IDS dans son environnement ; ils
+partagent la même base SQLite (STORAGE_BACKEND=sqlite, SQLITE_FILE). Un
+processus qui s'arrête est relancé après `--restart-delay` secondes.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def parse_shard_ids(spec):
+    """"0,2-3" -> [0, 2, 3] ; chaîne vide -> []"""
+    ids = set()
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        first, _, last = part.partition("-")
+        ids.update(range(int(first), int(last or first) + 1))
+    return sorted(ids)
+
+
+def split_shards(shard_count, processes):
+    """Répartit les shards 0..shard_count-1 en `processes` plages contiguës"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def format_shard_ids(ids):
+    return f"{ids[0]}-{ids[-1]}" if len(ids) > 1 and ids == list(range(ids[0], ids[-1] + 1)) else ",".join(map(str, ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, required=True, help="nombre total de shards")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--restart-delay", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if os.getenv("STORAGE_BACKEND", "sqlite") != "sqlite":
+        sys.exit("❌ Plusieurs processus ne peuvent partager que le backend sqlite (STORAGE_BACKEND=sqlite)")
+    base_port = int(os.getenv("METRICS_PORT", "0"))
+    bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+
+    def spawn(index, ids):
+        env = dict(os.environ, STORAGE_BACKEND="sqlite", SHARD_COUNT=str(args.shards), SHARD_IDS=format_shard_ids(ids))
+        if base_port:
+            env["METRICS_PORT"] = str(base_port + index)
+        print(f"🚀 Processus {index} : shards {env['SHARD_IDS']} / {args.shards}")
+        return subprocess.Popen([sys.executable, bot_path], env=env)
+
+    ranges = split_shards(args.shards, args.processes)
+    procs = [spawn(i, ids) for i, ids in enumerate(ranges)]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while not stopping:
+            time.sleep(1)
+            for i, proc in enumerate(procs):
+                code = proc.poll()
+                if code is not None and not stopping:
+                    print(f"❌ Processus {i} arrêté (code {code}), relance dans {args.restart_delay:.0f}s")
+                    time.sleep(args.restart_delay)
+                    procs[i] = spawn(i, ranges[i])
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+
+logger = logging.getLogger("casino")
+
+# Attributs standard d'un LogRecord : tout le reste vient de `extra` et part dans le JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par événement : ts, level, category, msg puis les champs structurés"""
+
+    def format(self, record):
+        event = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "category": getattr(record, "category", record.name),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key != "category":
+                event[key] = value
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Format lisible pour la console : [CATÉGORIE] message clé=valeur"""
+
+    def format(self, record):
+        category = getattr(record, "category", record.name)
+        fields = " ".join(f"{k}={v}" for k, v in vars(record).items() if k not in _RESERVED and k != "category")
+        return f"[{category.upper()}] {record.getMessage()} {fields}".rstrip()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Met l'enregistrement en file sans le formater : le formatage se fait dans le thread d'écriture"""
+
+    def prepare(self, record):
+        return record
+
+
+class Sampler:
+    """Garde 1 événement sur N par catégorie (`rates` = {catégorie: N})"""
+
+    def __init__(self, rates=None):
+        self.rates = dict(rates or {})
+        self._counters = {}
+        self.dropped = 0
+
+    def keep(self, category):
+        rate = self.rates.get(category)
+        if not rate or rate <= 1:
+            return True
+        counter = self._counters.get(category)
+        if counter is None:
+            counter = self._counters[category] = itertools.count()
+        if next(counter) % rate == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+def parse_rates(spec):
+    """"blackjack.hit=10,roulette.bet=5" -> {"blackjack.hit": 10, "roulette.bet": 5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        category, _, rate = item.partition("=")
+        rates[category.strip()] = int(rate)
+    return rates
+
+
+_sampler = Sampler()
+_listener = None
+
+
+def setup(path, level=logging.INFO, max_bytes=10 * 1024 * 1024, backups=5, sample_rates=None, console=True):
+    """Branche le logger "casino" sur une file ; un thread écrit les lignes JSON (avec rotation) et la console"""
+    global _listener, _sampler
+    if _listener is not None:
+        return
+    handlers = []
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+    q = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    logger.handlers[:] = [_DeferredQueueHandler(q)]
+    logger.setLevel(level)
+    logger.propagate = False
+    _sampler = Sampler(sample_rates)
+
+
+def shutdown():
+    """Vide la file et arrête le thread d'écriture"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log(category, message, *args, level=logging.INFO, **fields):
+    """Événement structuré : rien n'est construit si le niveau est coupé ou si l'échantillonnage l'écarte.
+
+    `message` est formaté avec `args` dans le thread d'écriture ; les valeurs
+    passées ne doivent donc plus être modifiées après l'appel.
+    """
+    if not logger.isEnabledFor(level) or not _sampler.keep(category):
+        return
+    fields["category"] = category
+    logger.log(level, message, *args, extra=fields)
+
+
+def stats():
+    return {
+        "queued": _listener.queue.qsize() if _listener is not None else 0,
+        "sampled_out": _sampler.dropped,
+        "sample_rates": dict(_sampler.rates),
+    }
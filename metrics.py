@@ -0,0 +1,210 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import time
+
+from aiohttp import web
+
+
+# Bornes des histogrammes, en millisecondes
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Commande ou callback en cours : les appels REST sont attribués à ce nom
+current = contextvars.ContextVar("metrics_current", default="autre")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def quantile(self, q):
+        """Borne supérieure du seau contenant le quantile `q` (None si vide)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Histogrammes de latence, compteurs d'erreurs et d'appels REST, plus des statistiques collectées à la demande."""
+
+    def __init__(self):
+        self.latency = {}  # nom -> Histogram
+        self.errors = {}
+        self.rest_calls = {}  # (nom, méthode) -> nombre
+        self.collectors = {}  # préfixe -> fonction renvoyant un dict de valeurs
+
+    def histogram(self, name):
+        hist = self.latency.get(name)
+        if hist is None:
+            hist = self.latency[name] = Histogram()
+        return hist
+
+    def observe(self, name, ms):
+        self.histogram(name).observe(ms)
+
+    def error(self, name):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def rest_call(self, method):
+        key = (current.get(), method)
+        self.rest_calls[key] = self.rest_calls.get(key, 0) + 1
+
+    def add_collector(self, prefix, func):
+        self.collectors[prefix] = func
+
+    def collect(self):
+        values = {}
+        for prefix, func in self.collectors.items():
+            try:
+                stats = func()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    for sub, v in value.items():
+                        values[f"{prefix}_{key}_{sub}"] = v
+                else:
+                    values[f"{prefix}_{key}"] = value
+        return {k: v for k, v in values.items() if isinstance(v, (int, float))}
+
+    def render(self):
+        """Format texte Prometheus"""
+        lines = ["# TYPE casino_latency_ms histogram"]
+        for name, hist in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS + ("+Inf",), hist.counts):
+                cumulative += n
+                lines.append(f'casino_latency_ms_bucket{{name="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'casino_latency_ms_sum{{name="{name}"}} {hist.sum:.3f}')
+            lines.append(f'casino_latency_ms_count{{name="{name}"}} {hist.count}')
+        lines.append("# TYPE casino_errors_total counter")
+        for name, n in sorted(self.errors.items()):
+            lines.append(f'casino_errors_total{{name="{name}"}} {n}')
+        lines.append("# TYPE casino_rest_calls_total counter")
+        for (name, method), n in sorted(self.rest_calls.items()):
+            lines.append(f'casino_rest_calls_total{{name="{name}",method="{method}"}} {n}')
+        for key, value in sorted(self.collect().items()):
+            metric = "casino_" + "".join(c if c.isalnum() else "_" for c in key)
+            lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _interaction_in(args):
+    for arg in args:
+        if hasattr(arg, "response") and hasattr(arg, "created_at"):
+            return arg
+    return None
+
+
+def timed(name):
+    """Décorateur : latence et erreurs de la commande ou du callback `name`.
+
+    Pour une interaction, l'attente entre sa création côté Discord et le début
+    du traitement est aussi mesurée (`interaction_lag`).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current.set(name)
+            interaction = _interaction_in(args)
+            if interaction is not None and interaction.created_at is not None:
+                lag = time.time() - interaction.created_at.timestamp()
+                registry.observe("interaction_lag", max(lag, 0.0) * 1000)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                registry.error(name)
+                raise
+            finally:
+                registry.observe(name, (time.perf_counter() - start) * 1000)
+                current.reset(token)
+        return wrapper
+    return decorator
+
+
+def instrument_http(client):
+    """Compte les appels REST (API et réponses aux interactions) par commande en cours"""
+    http = client.http
+    original = http.request
+
+    async def request(route, **kwargs):
+        registry.rest_call(route.method)
+        return await original(route, **kwargs)
+
+    http.request = request
+
+    # Les réponses aux interactions passent par l'adaptateur webhook de discord.py
+    try:
+        from discord.webhook.async_ import AsyncWebhookAdapter
+    except ImportError:
+        return
+    if getattr(AsyncWebhookAdapter.request, "__metrics__", False):
+        return
+    webhook_request = AsyncWebhookAdapter.request
+
+    async def adapter_request(self, route, *args, **kwargs):
+        registry.rest_call(route.method)
+        return await webhook_request(self, route, *args, **kwargs)
+
+    adapter_request.__metrics__ = True
+    AsyncWebhookAdapter.request = adapter_request
+
+
+async def monitor_loop_lag(interval=0.5):
+    """Retard de la boucle asyncio : un callback bloquant retarde tous les événements gateway"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        registry.observe("loop_lag", max(loop.time() - start - interval, 0.0) * 1000)
+
+
+async def serve(port, host="127.0.0.1"):
+    """Point d'accès Prometheus (GET /metrics) ; tourne jusqu'à l'annulation"""
+    async def handle(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def summary(limit=10):
+    """Lignes lisibles pour /stats : commandes les plus lentes (p95), erreurs et appels REST"""
+    lines = []
+    hists = sorted(registry.latency.items(), key=lambda item: item[1].quantile(0.95) or 0, reverse=True)
+    for name, hist in hists[:limit]:
+        mean = hist.sum / hist.count if hist.count else 0
+        p95 = hist.quantile(0.95)
+        p95 = "∞" if p95 == float("inf") else f"≤{p95}"
+        errors = registry.errors.get(name, 0)
+        rest = sum(n for (cmd, _), n in registry.rest_calls.items() if cmd == name)
+        lines.append(f"{name:<20} n={hist.count:<6} moy={mean:7.1f}ms p95{p95:>7}ms err={errors} rest={rest}")
+    return lines
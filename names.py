@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class NameResolver:
+    """Résolution des noms d'utilisateurs pour les classements.
+
+    Ordre de résolution : cache des membres du serveur (et cache utilisateurs
+    du client), puis cache TTL/LRU des utilisateurs déjà récupérés, et enfin
+    `fetch_user` (REST) en parallèle borné pour les seuls manquants.
+    Les comptes supprimés sont mis en cache négatif.
+    """
+
+    def __init__(self, client, ttl=3600, negative_ttl=86400, maxsize=5000, concurrency=4):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._cache = OrderedDict()  # user_id -> (expiration, nom ou None)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Compteurs
+        self.member_hits = 0
+        self.cache_hits = 0
+        self.negative_hits = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _cache_get(self, user_id):
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        expires, name = entry
+        if expires < time.monotonic():
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, name
+
+    def _cache_put(self, user_id, name):
+        ttl = self.ttl if name is not None else self.negative_ttl
+        self._cache[user_id] = (time.monotonic() + ttl, name)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, user_id):
+        async with self._semaphore:
+            self.fetches += 1
+            try:
+                user = await self.client.fetch_user(user_id)
+            except discord.NotFound:
+                # Compte supprimé : inutile de redemander avant negative_ttl
+                self._cache_put(user_id, None)
+                return None
+            except Exception:
+                self.fetch_errors += 1
+                return None
+        self._cache_put(user_id, user.name)
+        return user.name
+
+    async def resolve(self, user_ids, guild=None):
+        """Renvoie {user_id: nom} ; l'identifiant sert de nom si l'utilisateur est introuvable"""
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            user = guild.get_member(user_id) if guild is not None else None
+            if user is None:
+                user = self.client.get_user(user_id)
+            if user is not None:
+                self.member_hits += 1
+                names[user_id] = user.name
+                continue
+            hit, name = self._cache_get(user_id)
+            if hit:
+                if name is None:
+                    self.negative_hits += 1
+                else:
+                    self.cache_hits += 1
+                names[user_id] = name if name is not None else str(user_id)
+                continue
+            missing.append(user_id)
+
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(uid) for uid in missing))
+            for user_id, name in zip(missing, fetched):
+                names[user_id] = name if name is not None else str(user_id)
+        return names
+
+    def stats(self):
+        return {
+            "member_hits": self.member_hits,
+            "cache_hits": self.cache_hits,
+            "negative_hits": self.negative_hits,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "cached": len(self._cache),
+        }
@@ -0,0 +1,46 @@
+from sortedcontainers import SortedList
+
+
+class RankIndex:
+    """Classement par score décroissant, maintenu de façon incrémentale.
+
+    `update()` est en O(log n) ; `top(n)` ne lit que les n premières entrées et
+    `rank()` est une recherche dichotomique, sans trier toute la table.
+    À égalité de score, les clés sont ordonnées par valeur croissante.
+    """
+
+    def __init__(self, items=()):
+        self._scores = dict(items)
+        self._sorted = SortedList((-score, key) for key, score in self._scores.items())
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, key):
+        return key in self._scores
+
+    def update(self, key, score):
+        old = self._scores.get(key)
+        if old is not None:
+            if old == score:
+                return
+            self._sorted.remove((-old, key))
+        self._scores[key] = score
+        self._sorted.add((-score, key))
+
+    def discard(self, key):
+        old = self._scores.pop(key, None)
+        if old is not None:
+            self._sorted.remove((-old, key))
+
+    def top(self, n=10):
+        """Les n meilleures entrées [(clé, score)]"""
+        return [(key, -neg) for neg, key in self._sorted.islice(0, n)]
+
+    def rank(self, key):
+        """Position (1 = premier) de `key`, ex æquo compris ; None si absente"""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        # (-score,) se place avant toutes les entrées de même score
+        return self._sorted.bisect_left((-score,)) + 1
@@ -0,0 +1,109 @@
+from collections.abc import Mapping
+
+
+class UserRecord:
+    """État d'un utilisateur : solde, dernier daily, temps vocal et session enregistrée.
+
+    None signifie « absent » (pas de compte, jamais de daily, aucune entrée
+    vocale), comme une clé manquante dans l'ancien format.
+    """
+
+    __slots__ = ("balance", "last_daily", "voc_total", "voc_join")
+
+    def __init__(self, balance=None, last_daily=None, voc_total=None, voc_join=None):
+        self.balance = balance
+        self.last_daily = last_daily
+        self.voc_total = voc_total
+        self.voc_join = voc_join
+
+
+class _ColumnView(Mapping):
+    """Vue en lecture seule d'une colonne au format data.json (clés str)"""
+
+    def __init__(self, records, attr, value=None):
+        self._records = records
+        self._attr = attr
+        self._value = value
+
+    def _present(self):
+        attr = self._attr
+        return ((uid, rec) for uid, rec in self._records.items() if getattr(rec, attr) is not None)
+
+    def __getitem__(self, key):
+        rec = self._records.get(int(key))
+        if rec is None or getattr(rec, self._attr) is None:
+            raise KeyError(key)
+        return self._value(rec) if self._value else getattr(rec, self._attr)
+
+    def __iter__(self):
+        return (str(uid) for uid, _ in self._present())
+
+    def __len__(self):
+        return sum(1 for _ in self._present())
+
+
+def _voc_entry(rec):
+    return {"total": rec.voc_total, "last_join": rec.voc_join}
+
+
+class UserRecords:
+    """Enregistrements par utilisateur, indexés par snowflake (int).
+
+    Remplace les trois dicts parallèles `bank`, `daily` et `voc` de data.json
+    (clés str, entrées vocales en dicts imbriqués) par un seul dict d'objets à
+    `__slots__`. `bank`, `daily` et `voc` restent disponibles en vues au format
+    d'origine ; `to_layout()` produit ce format pour l'écriture sur disque.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.bank = _ColumnView(self.records, "balance")
+        self.daily = _ColumnView(self.records, "last_daily")
+        self.voc = _ColumnView(self.records, "voc_total", _voc_entry)
+
+    @classmethod
+    def from_layout(cls, bank=None, daily=None, voc=None):
+        """Construit les enregistrements depuis les sections de data.json"""
+        self = cls()
+        for uid, balance in (bank or {}).items():
+            self.record(int(uid)).balance = balance
+        for uid, ts in (daily or {}).items():
+            self.record(int(uid)).last_daily = ts
+        for uid, entry in (voc or {}).items():
+            rec = self.record(int(uid))
+            rec.voc_total = entry.get("total", 0)
+            rec.voc_join = entry.get("last_join")
+        return self
+
+    def to_layout(self):
+        """{"bank": ..., "daily": ..., "voc": ...} au format data.json (nouveaux dicts)"""
+        bank, daily, voc = {}, {}, {}
+        for uid, rec in self.records.items():
+            key = str(uid)
+            if rec.balance is not None:
+                bank[key] = rec.balance
+            if rec.last_daily is not None:
+                daily[key] = rec.last_daily
+            if rec.voc_total is not None:
+                voc[key] = {"total": rec.voc_total, "last_join": rec.voc_join}
+        return {"bank": bank, "daily": daily, "voc": voc}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, user_id):
+        return user_id in self.records
+
+    def get(self, user_id):
+        """Enregistrement de `user_id`, ou None"""
+        return self.records.get(user_id)
+
+    def record(self, user_id):
+        """Enregistrement de `user_id`, créé vide au besoin"""
+        rec = self.records.get(user_id)
+        if rec is None:
+            rec = self.records[user_id] = UserRecord()
+        return rec
+
+    def items(self):
+        return self.records.items()
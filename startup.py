@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import time
+
+from storage import atomic_write
+
+
+def _command_payload(command, tree):
+    try:
+        return command.to_dict(tree)  # discord.py >= 2.4
+    except TypeError:
+        return command.to_dict()
+
+
+def command_tree_hash(tree, application_id=None):
+    """Empreinte des commandes telles qu'envoyées à Discord lors d'un sync global"""
+    payload = sorted((_command_payload(cmd, tree) for cmd in tree.get_commands()), key=lambda c: c["name"])
+    raw = json.dumps({"application_id": application_id, "commands": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Startup:
+    """Démarrage du bot en phases exécutées une seule fois, et tâches de fond supervisées.
+
+    `on_ready` est rappelé à chaque reconnexion : les phases déjà faites sont
+    ignorées, et une tâche déjà lancée n'est jamais dupliquée. Une tâche qui
+    s'arrête sur une erreur est relancée après `restart_delay` secondes.
+    """
+
+    def __init__(self, snapshot_path, restart_delay=5.0):
+        self.snapshot_path = snapshot_path
+        self.restart_delay = restart_delay
+        self.started = time.perf_counter()
+        self.timings = {}  # phase -> durée (ms)
+        self.tasks = {}
+        self.restarts = {}
+        self.syncs = 0
+        self.syncs_skipped = 0
+
+    async def run_once(self, phase, func, *args):
+        """Exécute `func` (fonction ou coroutine) la première fois seulement ; renvoie False sinon"""
+        if phase in self.timings:
+            return False
+        self.timings[phase] = None
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+            if inspect.isawaitable(result):
+                await result
+        finally:
+            self.timings[phase] = (time.perf_counter() - start) * 1000
+        return True
+
+    def ready_in(self):
+        """Millisecondes écoulées depuis la création du gestionnaire"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def report(self):
+        phases = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.timings.items() if ms is not None)
+        return f"⏱️ Prêt en {self.ready_in():.0f} ms ({phases})"
+
+    # ---- Synchronisation des commandes ----
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        try:
+            with open(self.snapshot_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    async def sync_commands(self, tree, application_id=None, force=False):
+        """Sync global, sauté si l'arbre de commandes n'a pas changé depuis le dernier sync réussi"""
+        digest = command_tree_hash(tree, application_id)
+        if not force and self._load_snapshot().get("hash") == digest:
+            self.syncs_skipped += 1
+            return False
+        await tree.sync()
+        self.syncs += 1
+        atomic_write(self.snapshot_path, json.dumps({"hash": digest, "synced_at": time.time()}))
+        return True
+
+    # ---- Tâches de fond ----
+    def supervise(self, name, factory):
+        """Lance `factory()` comme tâche unique nommée ; sans effet si elle tourne déjà"""
+        task = self.tasks.get(name)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.get_running_loop().create_task(self._supervisor(name, factory), name=name)
+        self.tasks[name] = task
+        return task
+
+    async def _supervisor(self, name, factory):
+        while True:
+            try:
+                await factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.restarts[name] = self.restarts.get(name, 0) + 1
+                print(f"❌ Tâche '{name}' arrêtée ({e}), relance dans {self.restart_delay:.0f}s")
+                await asyncio.sleep(self.restart_delay)
+
+    def stats(self):
+        return {
+            "phases_ms": {phase: round(ms, 1) for phase, ms in self.timings.items() if ms is not None},
+            "tasks": {name: not task.done() for name, task in self.tasks.items()},
+            "restarts": dict(self.restarts),
+            "syncs": self.syncs,
+            "syncs_skipped": self.syncs_skipped,
+        }
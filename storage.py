@@ -0,0 +1,911 @@
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from ranking import RankIndex
+from records import UserRecords
+
+
+DEFAULT_DATA = {
+    "bank": {},
+    "daily": {},
+    "voc": {},
+    "settings": {"voc_role_rules": []}
+}
+
+
+def _snapshot(obj):
+    """Copie profonde minimale (dict/list) pour figer l'état avant l'écriture."""
+    if isinstance(obj, dict):
+        return {k: _snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_snapshot(v) for v in obj]
+    return obj
+
+
+def atomic_write(path, payload):
+    """Écrit `payload` dans `path` via un fichier temporaire + fsync + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Journal:
+    """Journal append-only des variations de solde, une ligne JSON par écriture.
+
+    Le fichier courant est renommé en segment `<path>.<dernier seq>` à chaque
+    compaction ; les segments couverts par un snapshot sont ensuite supprimés.
+    Chaque ligne est écrite et vidée vers l'OS immédiatement (pas de fsync).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.seq = 0
+        self._file = None
+
+    def _segments(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = os.path.basename(self.path) + "."
+        segments = []
+        for name in os.listdir(directory):
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit():
+                segments.append((int(suffix), os.path.join(directory, name)))
+        segments.sort()
+        return segments
+
+    def replay(self, after_seq):
+        """Renvoie les entrées postérieures à `after_seq` (segments puis fichier courant)."""
+        self.seq = max(self.seq, after_seq)
+        paths = [p for _, p in self._segments()]
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        for path in paths:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    if entry["seq"] > after_seq:
+                        self.seq = max(self.seq, entry["seq"])
+                        yield entry
+
+    def _open(self):
+        if self._file is None:
+            needs_newline = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b"\n"
+            self._file = open(self.path, "a")
+            if needs_newline:
+                self._file.write("\n")
+        return self._file
+
+    def append(self, user, delta, reason):
+        return self.append_many([(user, delta, reason)])
+
+    def append_many(self, entries):
+        """Ajoute plusieurs lignes [(user, delta, reason)] en une seule écriture ; renvoie le dernier seq"""
+        ts = round(time.time(), 3)
+        lines = []
+        for user, delta, reason in entries:
+            self.seq += 1
+            entry = {"seq": self.seq, "user": user, "delta": delta, "reason": reason, "ts": ts}
+            lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+        f = self._open()
+        f.write("".join(lines))
+        f.flush()
+        return self.seq
+
+    def rotate(self):
+        """Ferme le fichier courant et le renomme en segment. Renvoie le seq couvert."""
+        self.close()
+        if os.path.exists(self.path):
+            if os.path.getsize(self.path) > 0:
+                os.replace(self.path, f"{self.path}.{self.seq}")
+            else:
+                os.unlink(self.path)
+        return self.seq
+
+    def drop_segments(self, upto):
+        """Supprime les segments entièrement couverts par un snapshot."""
+        for last_seq, path in self._segments():
+            if last_seq <= upto:
+                os.unlink(path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Store:
+    """Interface commune des backends de persistance (banque, daily, temps vocal, réglages).
+
+    Les identifiants utilisateurs sont des int. Les écritures sont différées :
+    les mutations appellent `mark_dirty()` et une tâche de fond regroupe les
+    modifications, toutes les `flush_interval` secondes ou dès que `max_dirty`
+    modifications sont en attente.
+    """
+
+    def __init__(self, flush_interval=5.0, max_dirty=100):
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        # Base partagée avec d'autres processus (voir SqliteStore)
+        self.shared = False
+        self.dirty = 0
+        # Compteurs
+        self.flushes = 0
+        self.coalesced = 0
+        self.flush_errors = 0
+        self.last_flush_seconds = 0.0
+        # Appelé avec la durée (s) de chaque écriture réussie (métriques)
+        self.on_flush = None
+        self._wake = None
+        self._flush_lock = None
+        self._task = None
+
+    # ---- Écus ----
+    def get_balance(self, user_id):
+        """Solde de l'utilisateur, ou None s'il n'a pas encore de compte"""
+        raise NotImplementedError
+
+    def apply_delta(self, user_id, delta, reason):
+        """Applique une variation de solde et renvoie le nouveau solde"""
+        raise NotImplementedError
+
+    def apply_deltas(self, deltas):
+        """Applique d'un bloc plusieurs variations [(user_id, delta, reason)] ; renvoie {user_id: nouveau solde}"""
+        return {user_id: self.apply_delta(user_id, delta, reason) for user_id, delta, reason in deltas}
+
+    def top_balances(self, limit=10):
+        """Liste [(user_id, solde)] des plus gros soldes"""
+        raise NotImplementedError
+
+    def balance_rank(self, user_id):
+        """(position, nombre de comptes) de l'utilisateur, ou None s'il n'a pas de compte"""
+        raise NotImplementedError
+
+    def open_account(self, user_id, amount, reason):
+        """Crée le compte avec `amount` s'il n'existe pas encore ; renvoie le solde"""
+        balance = self.get_balance(user_id)
+        if balance is None:
+            balance = self.apply_delta(user_id, amount, reason)
+        return balance
+
+    def try_debit(self, user_id, amount, reason):
+        """Débite `amount` si le solde suffit ; renvoie le nouveau solde, ou None"""
+        balance = self.get_balance(user_id)
+        if balance is None or balance < amount:
+            return None
+        return self.apply_delta(user_id, -amount, reason)
+
+    # ---- Daily ----
+    def get_daily(self, user_id):
+        raise NotImplementedError
+
+    def set_daily(self, user_id, timestamp):
+        raise NotImplementedError
+
+    def try_claim_daily(self, user_id, now, cooldown):
+        """Enregistre le daily si le dernier date d'au moins `cooldown` secondes ; renvoie True si c'est le cas"""
+        last_claim = self.get_daily(user_id)
+        if last_claim is not None and now - last_claim < cooldown:
+            return False
+        self.set_daily(user_id, now)
+        return True
+
+    # ---- Temps vocal ----
+    def get_voc(self, user_id):
+        """(total, last_join) de l'utilisateur ; (0, None) s'il est inconnu"""
+        raise NotImplementedError
+
+    def set_voc(self, user_id, total, last_join):
+        raise NotImplementedError
+
+    def add_voc(self, user_id, seconds):
+        """Ajoute `seconds` au total vocal (et clôt l'éventuelle session enregistrée)"""
+        total, _ = self.get_voc(user_id)
+        self.set_voc(user_id, total + seconds, None)
+
+    def voc_sessions(self):
+        """{user_id: last_join} des sessions vocales en cours"""
+        raise NotImplementedError
+
+    def claim_voc(self, user_ids, owner, ttl):
+        """Prend (ou prolonge de `ttl` secondes) le comptage vocal de `user_ids` pour `owner`.
+
+        Renvoie l'ensemble des utilisateurs comptés par `owner` : un seul
+        processus crédite une session même si l'utilisateur est vu en vocal
+        par plusieurs. Sans base partagée, le seul processus compte tout.
+        """
+        return set(user_ids)
+
+    def release_voc(self, user_ids, owner):
+        """Rend le comptage vocal de `user_ids` (fin de session chez `owner`)"""
+
+    def _top_voc_totals(self, limit):
+        raise NotImplementedError
+
+    def add_voc_days(self, rows):
+        """Ajoute à l'historique vocal par jour des secondes [(user_id, jour, secondes)] (voir voice.VoiceHistory)"""
+        raise NotImplementedError
+
+    def voc_days(self, since):
+        """Historique vocal [(user_id, jour, secondes)] à partir du jour `since`"""
+        raise NotImplementedError
+
+    def prune_voc_days(self, before):
+        """Oublie l'historique vocal antérieur au jour `before`"""
+        raise NotImplementedError
+
+    def top_voc(self, limit=10, live=None):
+        """Top des temps vocaux ; `live` ajoute des secondes de session en cours par user_id.
+
+        Seuls le top `limit` des totaux enregistrés et les sessions en cours
+        peuvent apparaître dans le classement, inutile de parcourir le reste.
+        """
+        live = live or {}
+        candidates = dict(self._top_voc_totals(limit))
+        for user_id in live:
+            if user_id not in candidates:
+                candidates[user_id] = self.get_voc(user_id)[0]
+        entries = ((uid, total + int(live.get(uid, 0))) for uid, total in candidates.items())
+        return heapq.nlargest(limit, entries, key=lambda x: x[1])
+
+    # ---- Réglages ----
+    def get_setting(self, key, default=None):
+        raise NotImplementedError
+
+    def set_setting(self, key, value):
+        raise NotImplementedError
+
+    # ---- Write-behind ----
+    def mark_dirty(self):
+        """Signale une modification ; l'écriture réelle est différée."""
+        self.dirty += 1
+        if self.dirty >= self.max_dirty and self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        """Démarre le flusher de fond (à appeler depuis la boucle du bot)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.flush_errors += 1
+                print(f"❌ Erreur lors de la sauvegarde ({type(self).__name__}): {e}")
+
+    def _needs_write(self, force=False):
+        return bool(self.dirty)
+
+    async def flush(self, force=False):
+        """Écrit les modifications en attente (utilisable aussi sans start(), ex. scripts de migration)."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._needs_write(force):
+                return
+            pending = self.dirty
+            self.dirty = 0
+            start = time.perf_counter()
+            try:
+                await self._flush()
+            except BaseException:
+                self.dirty += pending
+                raise
+            self.last_flush_seconds = time.perf_counter() - start
+            self.flushes += 1
+            self.coalesced += max(pending - 1, 0)
+            if self.on_flush is not None:
+                self.on_flush(self.last_flush_seconds)
+
+    def flush_sync(self):
+        """Écriture synchrone et fermeture, utilisée à l'arrêt du bot une fois la boucle fermée."""
+        if self._needs_write(force=True):
+            pending = self.dirty
+            self._flush_sync()
+            self.dirty = 0
+            self.flushes += 1
+            self.coalesced += max(pending - 1, 0)
+        self.close()
+
+    async def _flush(self):
+        raise NotImplementedError
+
+    def _flush_sync(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {
+            "backend": type(self).__name__,
+            "flushes": self.flushes,
+            "coalesced": self.coalesced,
+            "pending": self.dirty,
+            "errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+        }
+
+
+class JsonStore(Store):
+    """Backend data.json, réécrit de façon atomique par le flusher de fond.
+
+    L'écriture tourne dans un executor pour ne pas bloquer la boucle.
+    Si `journal_path` est fourni, chaque variation de solde est ajoutée au
+    journal (O(1)) au lieu de réécrire la banque, et le journal est replié dans
+    un nouveau snapshot toutes les `compact_every` entrées ou toutes les
+    `compact_interval` secondes.
+
+    En mémoire, banque, daily et temps vocal sont un seul enregistrement par
+    utilisateur indexé par int (voir records.py) ; le format de data.json ne
+    change pas. L'historique vocal par jour est une section à part, "voc_days" :
+    {user_id: [premier jour, [secondes par jour]]}.
+    """
+
+    def __init__(self, path, journal_path=None, flush_interval=5.0, max_dirty=100,
+                 compact_every=1000, compact_interval=300.0):
+        super().__init__(flush_interval, max_dirty)
+        self.path = path
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.journal = Journal(journal_path) if journal_path else None
+        self.journal_pending = 0
+        self.replayed = 0
+        self.compactions = 0
+        self._last_compaction = time.monotonic()
+        self.data = self._load()
+        self.settings = self.data["settings"]
+        # Vues au format data.json (clés str), pour la migration et les outils
+        self.bank = self.records.bank
+        self.daily = self.records.daily
+        self.voc = self.records.voc
+        # Classements maintenus à chaque écriture (voir ranking.py)
+        self.balance_index = RankIndex(
+            (uid, rec.balance) for uid, rec in self.records.items() if rec.balance is not None)
+        self.voc_index = RankIndex(
+            (uid, rec.voc_total) for uid, rec in self.records.items() if rec.voc_total is not None)
+
+    def _load(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        else:
+            data = _snapshot(DEFAULT_DATA)
+        for key, default in DEFAULT_DATA.items():
+            data.setdefault(key, _snapshot(default))
+        meta = data.pop("meta", {})
+        # data ne garde que les réglages (et les sections inconnues, recopiées telles quelles)
+        self.records = UserRecords.from_layout(data.pop("bank"), data.pop("daily"), data.pop("voc"))
+        # user_id -> {jour: secondes}
+        self.voc_history = {}
+        for uid, (first, seconds) in data.pop("voc_days", {}).items():
+            days = self.voc_history[int(uid)] = {}
+            for offset, secs in enumerate(seconds):
+                if secs:
+                    days[first + offset] = secs
+        if self.journal is not None:
+            # Snapshot + fin du journal = état au moment de l'arrêt
+            for entry in self.journal.replay(meta.get("journal_seq", 0)):
+                rec = self.records.record(int(entry["user"]))
+                rec.balance = (rec.balance or 0) + entry["delta"]
+                self.journal_pending += 1
+                self.replayed += 1
+        return data
+
+    def get_balance(self, user_id):
+        rec = self.records.get(user_id)
+        return rec.balance if rec is not None else None
+
+    def apply_delta(self, user_id, delta, reason):
+        rec = self.records.record(user_id)
+        rec.balance = balance = (rec.balance or 0) + delta
+        self.balance_index.update(user_id, balance)
+        if self.journal is None:
+            self.mark_dirty()
+            return balance
+        # Le journal garde des clés str, comme la section "bank" de data.json
+        self.journal.append(str(user_id), delta, reason)
+        self.journal_pending += 1
+        if self.journal_pending >= self.compact_every and self._wake is not None:
+            self._wake.set()
+        return balance
+
+    def apply_deltas(self, deltas):
+        balances = {}
+        for user_id, delta, _ in deltas:
+            rec = self.records.record(user_id)
+            rec.balance = balances[user_id] = (rec.balance or 0) + delta
+            self.balance_index.update(user_id, rec.balance)
+        if not deltas:
+            return balances
+        if self.journal is None:
+            self.mark_dirty()
+            return balances
+        # Une seule écriture dans le journal pour tout le lot
+        self.journal.append_many([(str(user_id), delta, reason) for user_id, delta, reason in deltas])
+        self.journal_pending += len(deltas)
+        if self.journal_pending >= self.compact_every and self._wake is not None:
+            self._wake.set()
+        return balances
+
+    def top_balances(self, limit=10):
+        return self.balance_index.top(limit)
+
+    def balance_rank(self, user_id):
+        position = self.balance_index.rank(user_id)
+        if position is None:
+            return None
+        return position, len(self.balance_index)
+
+    def get_daily(self, user_id):
+        rec = self.records.get(user_id)
+        return rec.last_daily if rec is not None else None
+
+    def set_daily(self, user_id, timestamp):
+        self.records.record(user_id).last_daily = timestamp
+        self.mark_dirty()
+
+    def get_voc(self, user_id):
+        rec = self.records.get(user_id)
+        if rec is None or rec.voc_total is None:
+            return 0, None
+        return rec.voc_total, rec.voc_join
+
+    def set_voc(self, user_id, total, last_join):
+        rec = self.records.record(user_id)
+        rec.voc_total = total
+        rec.voc_join = last_join
+        self.voc_index.update(user_id, total)
+        self.mark_dirty()
+
+    def voc_sessions(self):
+        return {uid: rec.voc_join for uid, rec in self.records.items() if rec.voc_join}
+
+    def _top_voc_totals(self, limit):
+        return self.voc_index.top(limit)
+
+    def add_voc_days(self, rows):
+        for user_id, day, seconds in rows:
+            days = self.voc_history.setdefault(user_id, {})
+            days[day] = days.get(day, 0) + seconds
+        if rows:
+            self.mark_dirty()
+
+    def voc_days(self, since):
+        return [(uid, day, secs) for uid, days in self.voc_history.items() for day, secs in days.items() if day >= since]
+
+    def prune_voc_days(self, before):
+        for user_id in list(self.voc_history):
+            days = self.voc_history[user_id]
+            for day in [d for d in days if d < before]:
+                del days[day]
+            if not days:
+                del self.voc_history[user_id]
+        self.mark_dirty()
+
+    def _voc_days_layout(self):
+        """Section "voc_days" de data.json : jours consécutifs en liste, plus compact qu'un dict par jour"""
+        layout = {}
+        for uid, days in self.voc_history.items():
+            first = min(days)
+            seconds = [0] * (max(days) - first + 1)
+            for day, secs in days.items():
+                seconds[day - first] = secs
+            layout[str(uid)] = [first, seconds]
+        return layout
+
+    def get_setting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def set_setting(self, key, value):
+        self.settings[key] = value
+        self.mark_dirty()
+
+    def _needs_write(self, force=False):
+        if self.dirty:
+            return True
+        if not self.journal_pending:
+            return False
+        return (force or self.journal_pending >= self.compact_every
+                or time.monotonic() - self._last_compaction >= self.compact_interval)
+
+    def _begin_write(self):
+        """Fige l'état (et fait tourner le journal) avant une écriture de snapshot."""
+        snapshot = self.records.to_layout()
+        snapshot["voc_days"] = self._voc_days_layout()
+        snapshot.update(_snapshot(self.data))
+        journal_seq = None
+        if self.journal is not None:
+            journal_seq = self.journal.rotate()
+            snapshot["meta"] = {"journal_seq": journal_seq}
+        return self.journal_pending, journal_seq, snapshot
+
+    def _end_write(self, compacted, journal_seq):
+        if journal_seq is not None:
+            self.journal.drop_segments(journal_seq)
+            self.journal_pending -= compacted
+            self.compactions += 1
+            self._last_compaction = time.monotonic()
+
+    async def _flush(self):
+        compacted, journal_seq, snapshot = self._begin_write()
+        # En cas d'échec, les segments du journal restent sur disque et seront rejoués
+        await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+        self._end_write(compacted, journal_seq)
+
+    def _flush_sync(self):
+        compacted, journal_seq, snapshot = self._begin_write()
+        self._write(snapshot)
+        self._end_write(compacted, journal_seq)
+
+    def _write(self, snapshot):
+        atomic_write(self.path, json.dumps(snapshot, indent=4))
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def stats(self):
+        stats = super().stats()
+        stats["journal_pending"] = self.journal_pending
+        stats["compactions"] = self.compactions
+        return stats
+
+
+class SqliteStore(Store):
+    """Backend SQLite (mode WAL).
+
+    Les écritures sont regroupées dans une transaction validée par le flusher
+    de fond. Avec synchronous=NORMAL en WAL, le commit ne fait pas de fsync et
+    reste sur la boucle (la connexion n'est pas partagée entre threads).
+    Les classements utilisent les index via ORDER BY ... LIMIT.
+
+    Avec `shared=True` (plusieurs processus sur la même base, voir launcher.py),
+    chaque opération est validée immédiatement pour ne pas garder le verrou
+    d'écriture, et les opérations conditionnelles (débit, daily, temps vocal)
+    sont faites en une seule requête atomique.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bank (user_id INTEGER PRIMARY KEY, balance INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS bank_balance ON bank (balance DESC);
+        CREATE TABLE IF NOT EXISTS ledger (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL, delta INTEGER NOT NULL, reason TEXT, ts REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS daily (user_id INTEGER PRIMARY KEY, last_claim REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS voc (user_id INTEGER PRIMARY KEY, total INTEGER NOT NULL DEFAULT 0, last_join REAL);
+        CREATE INDEX IF NOT EXISTS voc_total ON voc (total DESC);
+        CREATE INDEX IF NOT EXISTS voc_live ON voc (last_join) WHERE last_join IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS voc_owner (user_id INTEGER PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS voc_days (
+            user_id INTEGER NOT NULL, day INTEGER NOT NULL, seconds INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        );
+        CREATE INDEX IF NOT EXISTS voc_days_day ON voc_days (day);
+        CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+
+    def __init__(self, path, flush_interval=5.0, max_dirty=100, shared=False):
+        super().__init__(flush_interval, max_dirty)
+        self.path = path
+        self.shared = shared
+        # isolation_level=None : les transactions sont ouvertes explicitement par _write()
+        # timeout : attente du verrou d'écriture tenu par un autre processus
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=10.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+        self._in_tx = False
+
+    def _write(self, sql, params=()):
+        if not self._in_tx:
+            self.db.execute("BEGIN IMMEDIATE")
+            self._in_tx = True
+        cursor = self.db.execute(sql, params)
+        self.mark_dirty()
+        return cursor
+
+    def _write_many(self, sql, rows):
+        if not self._in_tx:
+            self.db.execute("BEGIN IMMEDIATE")
+            self._in_tx = True
+        self.db.executemany(sql, rows)
+        self.mark_dirty()
+
+    def _done(self):
+        """Fin d'une opération d'écriture : validée tout de suite en mode partagé"""
+        if self.shared:
+            self._commit()
+
+    def _one(self, sql, params=()):
+        return self.db.execute(sql, params).fetchone()
+
+    def get_balance(self, user_id):
+        row = self._one("SELECT balance FROM bank WHERE user_id = ?", (int(user_id),))
+        return row[0] if row else None
+
+    def apply_delta(self, user_id, delta, reason):
+        user_id = int(user_id)
+        self._write(
+            "INSERT INTO bank (user_id, balance) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance",
+            (user_id, delta),
+        )
+        self._write(
+            "INSERT INTO ledger (user_id, delta, reason, ts) VALUES (?, ?, ?, ?)",
+            (user_id, delta, reason, time.time()),
+        )
+        balance = self.get_balance(user_id)
+        self._done()
+        return balance
+
+    def apply_deltas(self, deltas):
+        if not deltas:
+            return {}
+        ts = time.time()
+        self._write_many(
+            "INSERT INTO bank (user_id, balance) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance",
+            [(int(user_id), delta) for user_id, delta, _ in deltas],
+        )
+        self._write_many(
+            "INSERT INTO ledger (user_id, delta, reason, ts) VALUES (?, ?, ?, ?)",
+            [(int(user_id), delta, reason, ts) for user_id, delta, reason in deltas],
+        )
+        balances = {user_id: self.get_balance(user_id) for user_id, _, _ in deltas}
+        self._done()
+        return balances
+
+    def open_account(self, user_id, amount, reason):
+        user_id = int(user_id)
+        balance = self.get_balance(user_id)
+        if balance is not None:
+            return balance  # cas courant : simple lecture, sans transaction d'écriture
+        # Création conditionnelle en une requête : un seul processus crédite le solde initial
+        cursor = self._write(
+            "INSERT INTO bank (user_id, balance) VALUES (?, ?) ON CONFLICT (user_id) DO NOTHING",
+            (user_id, amount),
+        )
+        if cursor.rowcount:
+            self._write(
+                "INSERT INTO ledger (user_id, delta, reason, ts) VALUES (?, ?, ?, ?)",
+                (user_id, amount, reason, time.time()),
+            )
+        balance = self.get_balance(user_id)
+        self._done()
+        return balance
+
+    def try_debit(self, user_id, amount, reason):
+        user_id = int(user_id)
+        # Vérification et débit dans la même requête : sûr entre processus
+        cursor = self._write(
+            "UPDATE bank SET balance = balance - ? WHERE user_id = ? AND balance >= ?",
+            (amount, user_id, amount),
+        )
+        if cursor.rowcount == 0:
+            self._done()
+            return None
+        self._write(
+            "INSERT INTO ledger (user_id, delta, reason, ts) VALUES (?, ?, ?, ?)",
+            (user_id, -amount, reason, time.time()),
+        )
+        balance = self.get_balance(user_id)
+        self._done()
+        return balance
+
+    def top_balances(self, limit=10):
+        return self.db.execute(
+            "SELECT user_id, balance FROM bank ORDER BY balance DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def balance_rank(self, user_id):
+        balance = self.get_balance(user_id)
+        if balance is None:
+            return None
+        # COUNT sur une plage de l'index bank_balance
+        above = self._one("SELECT COUNT(*) FROM bank WHERE balance > ?", (balance,))[0]
+        count = self._one("SELECT COUNT(*) FROM bank")[0]
+        return above + 1, count
+
+    def get_daily(self, user_id):
+        row = self._one("SELECT last_claim FROM daily WHERE user_id = ?", (int(user_id),))
+        return row[0] if row else None
+
+    def set_daily(self, user_id, timestamp):
+        self._write(
+            "INSERT INTO daily (user_id, last_claim) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET last_claim = excluded.last_claim",
+            (int(user_id), timestamp),
+        )
+        self._done()
+
+    def try_claim_daily(self, user_id, now, cooldown):
+        cursor = self._write(
+            "INSERT INTO daily (user_id, last_claim) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET last_claim = excluded.last_claim "
+            "WHERE daily.last_claim <= ?",
+            (int(user_id), now, now - cooldown),
+        )
+        self._done()
+        return cursor.rowcount > 0
+
+    def get_voc(self, user_id):
+        row = self._one("SELECT total, last_join FROM voc WHERE user_id = ?", (int(user_id),))
+        return (row[0], row[1]) if row else (0, None)
+
+    def set_voc(self, user_id, total, last_join):
+        self._write(
+            "INSERT INTO voc (user_id, total, last_join) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET total = excluded.total, last_join = excluded.last_join",
+            (int(user_id), total, last_join),
+        )
+        self._done()
+
+    def add_voc(self, user_id, seconds):
+        self._write(
+            "INSERT INTO voc (user_id, total, last_join) VALUES (?, ?, NULL) "
+            "ON CONFLICT (user_id) DO UPDATE SET total = total + excluded.total, last_join = NULL",
+            (int(user_id), seconds),
+        )
+        self._done()
+
+    def voc_sessions(self):
+        return dict(self.db.execute("SELECT user_id, last_join FROM voc WHERE last_join IS NOT NULL"))
+
+    def claim_voc(self, user_ids, owner, ttl):
+        if not self.shared or not user_ids:
+            return set(user_ids)
+        now = time.time()
+        # Bail repris seulement s'il est à nous ou expiré (processus arrêté sans le rendre)
+        self._write_many(
+            "INSERT INTO voc_owner (user_id, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE voc_owner.owner = excluded.owner OR voc_owner.expires < ?",
+            [(int(user_id), owner, now + ttl, now) for user_id in user_ids],
+        )
+        held = {row[0] for row in self.db.execute("SELECT user_id FROM voc_owner WHERE owner = ?", (owner,))}
+        self._done()
+        return held.intersection(user_ids)
+
+    def release_voc(self, user_ids, owner):
+        if not self.shared or not user_ids:
+            return
+        self._write_many("DELETE FROM voc_owner WHERE user_id = ? AND owner = ?",
+                         [(int(user_id), owner) for user_id in user_ids])
+        self._done()
+
+    def _top_voc_totals(self, limit):
+        return self.db.execute(
+            "SELECT user_id, total FROM voc ORDER BY total DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def add_voc_days(self, rows):
+        if not rows:
+            return
+        # Addition côté base : plusieurs processus peuvent créditer le même jour
+        self._write_many(
+            "INSERT INTO voc_days (user_id, day, seconds) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, day) DO UPDATE SET seconds = seconds + excluded.seconds",
+            [(int(user_id), day, seconds) for user_id, day, seconds in rows],
+        )
+        self._done()
+
+    def voc_days(self, since):
+        return self.db.execute("SELECT user_id, day, seconds FROM voc_days WHERE day >= ?", (since,)).fetchall()
+
+    def prune_voc_days(self, before):
+        self._write("DELETE FROM voc_days WHERE day < ?", (before,))
+        self._done()
+
+    def get_setting(self, key, default=None):
+        row = self._one("SELECT value FROM settings WHERE key = ?", (key,))
+        return json.loads(row[0]) if row else default
+
+    def set_setting(self, key, value):
+        self._write(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+        self._done()
+
+    def _commit(self):
+        if self._in_tx:
+            self.db.execute("COMMIT")
+            self._in_tx = False
+
+    async def _flush(self):
+        self._commit()
+
+    def _flush_sync(self):
+        self._commit()
+
+    def close(self):
+        self._commit()
+        self.db.close()
+
+
+def migrate_json_to_sqlite(json_path, db_path, journal_path=None):
+    """Copie data.json (+ journal éventuel) dans une base SQLite, en une transaction."""
+    source = JsonStore(json_path, journal_path=journal_path)
+    target = SqliteStore(db_path)
+    db = target.db
+    db.execute("BEGIN IMMEDIATE")
+    db.executemany(
+        "INSERT OR REPLACE INTO bank (user_id, balance) VALUES (?, ?)",
+        ((int(uid), balance) for uid, balance in source.bank.items()),
+    )
+    db.executemany(
+        "INSERT OR REPLACE INTO daily (user_id, last_claim) VALUES (?, ?)",
+        ((int(uid), ts) for uid, ts in source.daily.items()),
+    )
+    db.executemany(
+        "INSERT OR REPLACE INTO voc (user_id, total, last_join) VALUES (?, ?, ?)",
+        ((int(uid), d.get("total", 0), d.get("last_join")) for uid, d in source.voc.items()),
+    )
+    db.executemany(
+        "INSERT OR REPLACE INTO voc_days (user_id, day, seconds) VALUES (?, ?, ?)",
+        ((uid, day, secs) for uid, days in source.voc_history.items() for day, secs in days.items()),
+    )
+    db.executemany(
+        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+        ((key, json.dumps(value)) for key, value in source.settings.items()),
+    )
+    db.execute("COMMIT")
+    counts = {"bank": len(source.bank), "daily": len(source.daily), "voc": len(source.voc)}
+    source.close()
+    target.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outils de persistance du bot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Migrer data.json vers SQLite")
+    migrate.add_argument("--json", default="data.json")
+    migrate.add_argument("--journal", default="ledger.jsonl")
+    migrate.add_argument("--db", default="data.db")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        # Toujours passé : les segments rotés sont rejoués même si le fichier courant n'existe plus
+        counts = migrate_json_to_sqlite(args.json, args.db, journal_path=args.journal)
+        print(f"✅ Migration terminée vers {args.db}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def bot(tmp_path_factory):
+    """bot.py importé avec des fichiers de données isolés (voir benchmarks.loadtest)"""
+    from benchmarks.loadtest import load_bot
+    return load_bot(str(tmp_path_factory.mktemp("bot")), "json", 1.0)
@@ -0,0 +1,195 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from games.blackjack import Hand, Round, Shoe, settle
+
+
+def stacked(*cards):
+    """Sabot dont les prochaines cartes tirées sont `cards`, dans l'ordre"""
+    shoe = Shoe(seed=0)
+    # Assez de cartes sous la coupe pour ne pas déclencher de remélange
+    shoe.cards = [2] * 200 + list(reversed(cards))
+    return shoe
+
+
+def hand_of(*cards, bet=10, split=False):
+    hand = Hand(bet, split=split)
+    for card in cards:
+        hand.add(card)
+    return hand
+
+
+def play(shoe, bet):
+    """Stratégie fixe : tirer jusqu'à 17"""
+    game = Round(shoe, bet)
+    while not game.finished:
+        if game.hand.total < 17:
+            game.hit()
+        else:
+            game.stand()
+    return [(hand.cards, payout, outcome) for hand, payout, outcome in game.results()], game.dealer.cards
+
+
+# ---- Sabot ----
+def test_seeded_shoe_replays_same_cards_across_shuffles():
+    first, second = Shoe(seed=42), Shoe(seed=42)
+    draws = 6 * 52 * 2  # plusieurs remélanges
+    assert [first.draw() for _ in range(draws)] == [second.draw() for _ in range(draws)]
+    assert first.shuffles == second.shuffles > 1
+
+
+def test_shoe_reshuffles_at_penetration():
+    shoe = Shoe(decks=1, seed=1, penetration=0.5)
+    for _ in range(26):
+        shoe.draw()
+    assert shoe.shuffles == 1
+    shoe.draw()
+    assert shoe.shuffles == 2
+    assert len(shoe.cards) == 51
+
+
+def test_seeded_rounds_replay():
+    first, second = Shoe(seed=7), Shoe(seed=7)
+    assert [play(first, 10) for _ in range(50)] == [play(second, 10) for _ in range(50)]
+
+
+# ---- Totaux ----
+@pytest.mark.parametrize("cards, total, soft", [
+    ((11, 6), 17, 1),            # soft 17
+    ((11, 6, 10), 17, 0),        # l'as repasse à 1 : hard 17
+    ((11, 11), 12, 1),
+    ((11, 11, 9), 21, 1),
+    ((11, 11, 10), 12, 0),
+    ((10, 7), 17, 0),
+    ((10, 9, 5), 24, 0),
+])
+def test_hand_totals(cards, total, soft):
+    hand = hand_of(*cards)
+    assert (hand.total, hand.soft) == (total, soft)
+    assert hand.busted == (total > 21)
+
+
+def test_blackjack_needs_two_cards_outside_split():
+    assert hand_of(11, 10).blackjack
+    assert not hand_of(5, 6, 10).blackjack
+    assert not hand_of(11, 10, split=True).blackjack
+
+
+# ---- Règlement ----
+@pytest.mark.parametrize("player, dealer, payout, outcome", [
+    ((11, 10), (10, 9), 25, "blackjack"),
+    ((11, 10), (11, 10), 10, "push"),
+    ((10, 10), (11, 10), 0, "lose"),
+    ((10, 10), (10, 9), 20, "win"),
+    ((10, 9), (10, 9), 10, "push"),
+    ((10, 8), (10, 9), 0, "lose"),
+    ((10, 8), (10, 6, 10), 20, "win"),
+    ((10, 8, 5), (10, 6, 10), 0, "bust"),
+])
+def test_settle_outcomes(player, dealer, payout, outcome):
+    assert settle(hand_of(*player), hand_of(*dealer, bet=0)) == (payout, outcome)
+
+
+def test_blackjack_pays_three_to_two_rounded_down():
+    assert settle(hand_of(11, 10, bet=7), hand_of(10, 9, bet=0)) == (17, "blackjack")
+
+
+def test_double_pays_on_doubled_bet():
+    # Joueur 5 + 6, croupier 10 + 6 ; le double tire un 10, le croupier saute avec un 10
+    game = Round(stacked(5, 10, 6, 6, 10, 10), 10)
+    assert game.can_double
+    hand = game.double()
+    assert (hand.bet, hand.doubled, hand.total) == (20, True, 21)
+    assert game.finished
+    assert [(payout, outcome) for _, payout, outcome in game.results()] == [(40, "win")]
+
+
+def test_split_then_double_second_hand():
+    # Paire de 8 contre 10 + 7 : 8 + 10 reste, 8 + 3 double et tire un 10
+    game = Round(stacked(8, 10, 8, 7, 10, 3, 10), 10)
+    assert game.can_split
+    first, second = game.split()
+    assert (first.total, second.total) == (18, 11)
+    game.stand()
+    assert game.hand is second and game.can_double
+    game.double()
+    assert game.finished and game.dealer.total == 17
+    assert [(hand.bet, payout, outcome) for hand, payout, outcome in game.results()] == [
+        (10, 20, "win"),
+        (20, 40, "win"),
+    ]
+
+
+def test_split_aces_get_one_card_and_no_blackjack():
+    game = Round(stacked(11, 10, 11, 9, 10, 5), 10)
+    first, second = game.split()
+    assert first.done and second.done and game.finished
+    assert (first.total, second.total) == (21, 16)
+    # 21 après séparation : simple gain, pas 3 pour 2
+    assert [(payout, outcome) for _, payout, outcome in game.results()] == [(20, "win"), (0, "lose")]
+
+
+# ---- BlackjackView.settle ----
+class Interaction:
+    """Interaction minimale : les boutons ne font que rééditer le message"""
+
+    def __init__(self, user_id):
+        self.user = SimpleNamespace(id=user_id)
+        self.response = self
+        self.embed = None
+
+    async def edit_message(self, embed=None, view=None):
+        self.embed = embed
+
+    async def send_message(self, content=None, **payload):
+        raise AssertionError(content)
+
+
+def play_view(bot, user_id, shoe, bet, buttons):
+    """Joue `buttons` sur une vraie BlackjackView ; renvoie la variation de solde et l'embed final"""
+
+    async def main():
+        bot.store.apply_delta(user_id, 1000, "test")
+        start = bot.get_balance(user_id)
+        view = bot.BlackjackView(Round(shoe, bet), await bot.economy.reserve(user_id, bet, "blackjack"))
+        interaction = Interaction(user_id)
+        for name in buttons:
+            await getattr(view, name).callback(interaction)
+        assert view.game.finished
+        if not buttons:
+            await view.refresh(interaction)
+        return bot.get_balance(user_id) - start, interaction.embed
+
+    return asyncio.run(main())
+
+
+def test_view_settles_odd_blackjack_rounded_down(bot):
+    net, _ = play_view(bot, 1, stacked(11, 10, 10, 9), 7, [])
+    assert net == 17 - 7
+
+
+def test_view_settles_doubled_odd_bet(bot):
+    net, embed = play_view(bot, 2, stacked(5, 10, 6, 6, 10, 10), 7, ["double"])
+    # Deux réservations de 7, gain 28 : rien ne se perd à l'arrondi par réservation
+    assert net == 28 - 14
+    assert "14 écus" in str(embed.to_dict())
+
+
+def test_view_settles_split_hands_separately(bot):
+    net, _ = play_view(bot, 3, stacked(8, 10, 8, 7, 10, 3, 10), 5, ["split", "stand", "double"])
+    assert net == (10 - 5) + (20 - 10)
+
+
+def test_view_refunds_nothing_twice_on_timeout(bot):
+    async def main():
+        bot.store.apply_delta(4, 1000, "test")
+        start = bot.get_balance(4)
+        view = bot.BlackjackView(Round(stacked(10, 10, 8, 9), 9), await bot.economy.reserve(4, 9, "blackjack"))
+        await view.stand.callback(Interaction(4))
+        await view.on_timeout()
+        return bot.get_balance(4) - start
+
+    # 18 contre 19 : mise perdue, le délai d'inactivité ne la rend pas
+    assert asyncio.run(main()) == -9
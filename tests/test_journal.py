@@ -0,0 +1,137 @@
+import json
+import os
+
+from storage import Journal, JsonStore
+
+
+def read_entries(journal, after_seq=0):
+    return [(e["seq"], e["user"], e["delta"]) for e in journal.replay(after_seq)]
+
+
+def test_replay_returns_entries_after_seq(tmp_path):
+    journal = Journal(str(tmp_path / "ledger.jsonl"))
+    journal.append("1", 10, "test")
+    journal.append_many([("2", 5, "test"), ("1", -3, "test")])
+    journal.close()
+
+    reopened = Journal(str(tmp_path / "ledger.jsonl"))
+    assert read_entries(reopened) == [(1, "1", 10), (2, "2", 5), (3, "1", -3)]
+    assert read_entries(reopened, after_seq=2) == [(3, "1", -3)]
+    # La numérotation reprend après le dernier seq rejoué
+    assert reopened.append("2", 1, "test") == 4
+
+
+def test_truncated_last_line_is_skipped_and_not_glued_to_the_next(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    journal = Journal(str(path))
+    journal.append("1", 10, "test")
+    journal.close()
+    with open(path, "a") as f:
+        f.write('{"seq": 2, "user": "1", "del')  # arrêt brutal en pleine écriture
+
+    reopened = Journal(str(path))
+    assert read_entries(reopened) == [(1, "1", 10)]
+    reopened.append("1", 7, "test")
+    reopened.close()
+    assert read_entries(Journal(str(path))) == [(1, "1", 10), (2, "1", 7)]
+
+
+def test_rotate_then_drop_segments(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    journal = Journal(path)
+    journal.append_many([("1", 1, "test"), ("1", 2, "test")])
+    assert journal.rotate() == 2
+    assert not os.path.exists(path)
+    assert os.path.exists(path + ".2")
+    journal.append("1", 3, "test")
+    journal.rotate()
+    journal.append("1", 4, "test")
+
+    # Segments dans l'ordre, puis le fichier courant
+    assert read_entries(Journal(path)) == [(1, "1", 1), (2, "1", 2), (3, "1", 3), (4, "1", 4)]
+
+    journal.drop_segments(2)
+    assert not os.path.exists(path + ".2")
+    assert os.path.exists(path + ".3")
+    assert read_entries(Journal(path)) == [(3, "1", 3), (4, "1", 4)]
+
+
+def test_rotate_removes_empty_current_file(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    journal = Journal(path)
+    open(path, "w").close()
+    assert journal.rotate() == 0
+    assert os.listdir(tmp_path) == []
+
+
+def make_store(tmp_path, **kwargs):
+    return JsonStore(str(tmp_path / "data.json"), journal_path=str(tmp_path / "ledger.jsonl"), **kwargs)
+
+
+def test_store_replays_journal_after_crash(tmp_path):
+    store = make_store(tmp_path)
+    store.apply_delta(1, 100, "test")
+    store.apply_deltas([(1, -30, "test"), (2, 50, "test")])
+    store.journal.close()  # arrêt sans snapshot
+
+    reopened = make_store(tmp_path)
+    assert reopened.replayed == 3
+    assert (reopened.get_balance(1), reopened.get_balance(2)) == (70, 50)
+    assert reopened.top_balances() == [(1, 70), (2, 50)]
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    for _ in range(5):
+        store.apply_delta(1, 10, "test")
+    store.flush_sync()
+
+    with open(tmp_path / "data.json") as f:
+        data = json.load(f)
+    assert data["bank"] == {"1": 50}
+    assert data["meta"] == {"journal_seq": 5}
+    assert store.compactions == 1
+    # Segments couverts supprimés : rien à rejouer
+    assert sorted(os.listdir(tmp_path)) == ["data.json"]
+
+    reopened = make_store(tmp_path)
+    assert reopened.replayed == 0
+    assert reopened.get_balance(1) == 50
+    reopened.apply_delta(1, 1, "test")
+    assert reopened.journal.seq == 6
+
+
+def test_rotated_segments_survive_a_failed_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    store.apply_delta(1, 10, "test")
+    # Compaction commencée (journal roté) mais snapshot jamais écrit
+    store._begin_write()
+    store.apply_delta(1, 5, "test")
+    store.journal.close()
+
+    reopened = make_store(tmp_path)
+    assert reopened.get_balance(1) == 15
+    assert reopened.replayed == 2
+
+
+def test_compaction_threshold(tmp_path):
+    store = make_store(tmp_path, compact_every=3, compact_interval=3600)
+    store.apply_delta(1, 1, "test")
+    store.apply_delta(1, 1, "test")
+    assert not store._needs_write()
+    store.apply_delta(1, 1, "test")
+    assert store._needs_write()
+    store.flush_sync()
+    assert store.journal_pending == 0
+
+
+def test_flush_without_start(tmp_path):
+    import asyncio
+
+    store = make_store(tmp_path)
+    store.apply_delta(1, 100, "test")
+    asyncio.run(store.flush(force=True))  # sans start() : pas de flusher de fond
+    assert store.flushes == 1 and store.dirty == 0
+    with open(tmp_path / "data.json") as f:
+        assert json.load(f)["bank"] == {"1": 100}
+    store.journal.close()
@@ -0,0 +1,48 @@
+from ranking import RankIndex
+from storage import JsonStore, SqliteStore
+
+
+def test_ties_are_ordered_by_key():
+    index = RankIndex([(3, 50), (1, 50), (2, 80), (4, 10)])
+    assert index.top(4) == [(2, 80), (1, 50), (3, 50), (4, 10)]
+    assert index.top(2) == [(2, 80), (1, 50)]
+
+
+def test_ties_share_the_same_rank():
+    index = RankIndex([(1, 50), (2, 80), (3, 50), (4, 10)])
+    assert [index.rank(key) for key in (2, 1, 3, 4)] == [1, 2, 2, 4]
+    assert index.rank(5) is None
+
+
+def test_update_moves_between_ties():
+    index = RankIndex([(1, 50), (2, 50), (3, 50)])
+    index.update(3, 60)
+    assert index.top(3) == [(3, 60), (1, 50), (2, 50)]
+    assert (index.rank(3), index.rank(1), index.rank(2)) == (1, 2, 2)
+    index.update(3, 50)
+    assert index.top(3) == [(1, 50), (2, 50), (3, 50)]
+    # Même score : rien ne bouge, pas de doublon
+    index.update(1, 50)
+    assert len(index) == 3 and index.top(10) == [(1, 50), (2, 50), (3, 50)]
+
+
+def test_discard():
+    index = RankIndex([(1, 50), (2, 50)])
+    index.discard(1)
+    index.discard(9)
+    assert 1 not in index and index.top() == [(2, 50)]
+    assert index.rank(2) == 1
+
+
+def test_stores_agree_on_tied_ranks(tmp_path):
+    json_store = JsonStore(str(tmp_path / "data.json"))
+    sqlite_store = SqliteStore(str(tmp_path / "data.db"))
+    balances = {1: 100, 2: 300, 3: 100, 4: 100, 5: 20}
+    for store in (json_store, sqlite_store):
+        store.apply_deltas([(uid, balance, "test") for uid, balance in balances.items()])
+    for uid in balances:
+        assert json_store.balance_rank(uid) == sqlite_store.balance_rank(uid)
+    assert json_store.balance_rank(4) == (2, 5)
+    assert json_store.balance_rank(5) == (5, 5)
+    assert [uid for uid, _ in json_store.top_balances(5)] == [2, 1, 3, 4, 5]
+    sqlite_store.close()
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from voc_roles import RuleIndex
+
+
+def rule(mn, mx, role_id):
+    return {"min_seconds": mn, "max_seconds": mx, "role_id": role_id}
+
+
+def brute_force(rules, total):
+    return frozenset(r["role_id"] for r in rules if r["min_seconds"] <= total <= r["max_seconds"])
+
+
+@pytest.mark.parametrize("total, roles", [
+    (-1, set()),
+    (0, set()),
+    (59, set()),
+    (60, {1}),
+    (3599, {1}),
+    (3600, {1, 2}),   # bornes inclusives, chevauchement
+    (7200, {1, 2}),
+    (7201, {2}),
+    (36000, {2}),
+    (36001, set()),
+])
+def test_lookup_inclusive_bounds(total, roles):
+    index = RuleIndex([rule(60, 7200, 1), rule(3600, 36000, 2)])
+    assert index.lookup(total) == roles
+
+
+def test_lookup_matches_linear_scan():
+    rng = random.Random(3)
+    for _ in range(50):
+        rules = []
+        for _ in range(rng.randint(0, 12)):
+            mn = rng.randint(0, 1000)
+            rules.append(rule(mn, mn + rng.randint(0, 500), rng.randint(1, 5)))
+        index = RuleIndex(rules)
+        for total in range(-5, 1600, 7):
+            assert index.lookup(total) == brute_force(rules, total)
+
+
+def test_next_boundary():
+    index = RuleIndex([rule(60, 120, 1), rule(100, 200, 2)])
+    assert index.next_boundary(0) == 60
+    assert index.next_boundary(60) == 100
+    assert index.next_boundary(120) == 121
+    assert index.next_boundary(200) == 201
+    assert index.next_boundary(201) is None
+    # Le jeu de rôles ne change jamais entre deux bornes successives
+    for total in range(0, 250):
+        boundary = index.next_boundary(total)
+        end = boundary if boundary is not None else 250
+        assert {index.lookup(t) for t in range(total, end)} == {index.lookup(total)}
+
+
+def test_empty_rules():
+    index = RuleIndex([])
+    assert index.lookup(1000) == RuleIndex.EMPTY
+    assert index.next_boundary(0) is None
+    assert index.role_ids == frozenset()
+
+
+def test_spans_merge_adjacent_and_overlapping_rules():
+    index = RuleIndex([rule(0, 59, 1), rule(60, 120, 1), rule(100, 150, 1), rule(300, 400, 1), rule(10, 20, 2)])
+    assert index.spans == {1: [(0, 150), (300, 400)], 2: [(10, 20)]}
+    assert index.role_ids == {1, 2}
+
+
+def test_reconciler_yields_between_batches():
+    import asyncio
+
+    from voc_roles import VocRoleReconciler
+
+    async def scenario():
+        reconciler = VocRoleReconciler(None, lambda user_id: (0, False), lambda: [], queue=object(), batch=10)
+        evaluated = []
+        reconciler._evaluate = lambda guild_id, member_id: evaluated.append(member_id)
+        reconciler._wake = asyncio.Event()
+        for member_id in range(35):
+            reconciler.schedule(1, member_id)
+        task = asyncio.create_task(reconciler._run())
+        seen = []
+        while len(evaluated) < 35:
+            seen.append(len(evaluated))
+            await asyncio.sleep(0)
+        task.cancel()
+        return seen
+
+    # Les autres tâches reprennent la main tous les 10 membres évalués
+    assert asyncio.run(scenario()) == [0, 10, 20, 30]
+
+
+def test_role_queue_retry_logs_guild_and_abandon():
+    import asyncio
+    import logging
+
+    from voc_roles import RoleQueue
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("casino")
+    logger.addHandler(handler)
+    try:
+        queue = RoleQueue(None, pacing=0, max_retries=1)
+        pending = {}
+        asyncio.run(queue._retry(pending, 7, 42, {1}, {1}, 0, OSError()))
+        asyncio.run(queue._retry(pending, 7, 43, {1}, {1}, 1, OSError()))
+    finally:
+        logger.removeHandler(handler)
+    assert pending == {42: ({1}, {1}, 1)}
+    assert [(r.category, r.guild, r.member) for r in records] == [("voc_roles.retry", 7, 42),
+                                                                 ("voc_roles.abandon", 7, 43)]
@@ -0,0 +1,23 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+
+class FailingResponse:
+    async def send_message(self, content=None, **payload):
+        raise discord.HTTPException(SimpleNamespace(status=503, reason="Service Unavailable"), "indisponible")
+
+
+def test_stake_is_refunded_when_the_spin_cannot_be_shown(bot):
+    interaction = SimpleNamespace(user=SimpleNamespace(id=10), response=FailingResponse())
+
+    async def main():
+        bot.store.apply_delta(10, 1000, "test")
+        start = bot.get_balance(10)
+        with pytest.raises(discord.HTTPException):
+            await bot.slots.callback(interaction, mise=50)
+        return bot.get_balance(10) - start
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,130 @@
+import pytest
+
+from storage import JsonStore, SqliteStore
+from voice import VoiceHistory
+
+DAY = 86400
+NOW = 1000 * DAY + 12 * 3600  # midi, jour 1000 (UTC)
+
+
+def history(buckets=8):
+    return VoiceHistory(buckets=buckets, utc_offset=0)
+
+
+def test_period_includes_today_and_counts_back():
+    h = history()
+    h.add(1, 600, end=NOW)                 # aujourd'hui
+    h.add(1, 300, end=NOW - DAY)           # hier
+    h.add(1, 100, end=NOW - 3 * DAY)       # il y a 3 jours
+    assert h.period(1, 1, now=NOW) == 600
+    assert h.period(1, 2, now=NOW) == 900
+    assert h.period(1, 3, now=NOW) == 900
+    assert h.period(1, 4, now=NOW) == 1000
+    assert h.period(2, 4, now=NOW) == 0
+
+
+def test_session_across_midnight_is_split():
+    h = history()
+    midnight = 1000 * DAY
+    h.add(1, 3600, end=midnight + 1800)
+    assert h.period(1, 1, now=midnight + 1800) == 1800
+    assert h.period(1, 2, now=midnight + 1800) == 3600
+
+
+def test_period_after_idle_days():
+    h = history()
+    h.add(1, 500, end=NOW - 2 * DAY)
+    # Aucune activité depuis : le cumul reste valable
+    assert h.period(1, 1, now=NOW) == 0
+    assert h.period(1, 3, now=NOW) == 500
+
+
+def test_days_outside_window_are_dropped():
+    h = history(buckets=4)
+    h.add(1, 100, end=NOW - 5 * DAY)
+    h.add(1, 10, end=NOW)
+    assert h.period(1, 3, now=NOW) == 10
+    # Écriture antérieure à la fenêtre du tampon : ignorée
+    h.add_day(1, h.day(NOW) - 10, 999)
+    assert h.period(1, 3, now=NOW) == 10
+
+
+@pytest.mark.parametrize("days", [0, 8, -1])
+def test_period_bounds(days):
+    with pytest.raises(ValueError):
+        history(buckets=8).period(1, days, now=NOW)
+
+
+def test_top_with_live_sessions():
+    h = history()
+    h.add(1, 500, end=NOW)
+    h.add(2, 900, end=NOW - 5 * DAY)
+    h.add(3, 200, end=NOW)
+    assert h.top(1, now=NOW) == [(1, 500), (3, 200)]
+    assert h.top(7, now=NOW) == [(2, 900), (1, 500), (3, 200)]
+    assert h.top(1, limit=2, live={3: 400, 4: 50}, now=NOW) == [(3, 600), (1, 500)]
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: JsonStore(str(tmp_path / "data.json")),
+    lambda tmp_path: SqliteStore(str(tmp_path / "data.db")),
+])
+def test_drain_and_reload_through_store(tmp_path, make_store):
+    store = make_store(tmp_path)
+    h = history()
+    h.add(1, 600, end=NOW)
+    h.add(1, 300, end=NOW - DAY)
+    rows, prune_before = h.drain(now=NOW)
+    assert sorted(rows) == [(1, 999, 300), (1, 1000, 600)]
+    assert prune_before == 1000 - 8 + 1
+    store.add_voc_days(rows)
+    # Rien de nouveau, purge déjà faite aujourd'hui
+    assert h.drain(now=NOW) == ([], None)
+    h.add(1, 50, end=NOW)
+    store.add_voc_days(h.drain(now=NOW)[0])
+    store.flush_sync()
+
+    store = make_store(tmp_path)
+    reloaded = history()
+    reloaded.load(store, now=NOW)
+    assert reloaded.period(1, 1, now=NOW) == 650
+    assert reloaded.period(1, 2, now=NOW) == 950
+    # Les jours rechargés sont déjà sauvegardés
+    assert reloaded.drain(now=NOW)[0] == []
+
+    store.prune_voc_days(1000)
+    assert store.voc_days(0) == [(1, 1000, 650)]
+    store.close()
+
+
+def test_live_session_only_counts_inside_window():
+    h = history()
+    midnight = 1000 * DAY
+    # Session en cours depuis 23 h la veille, il est 1 h
+    assert h.in_window(7200, 1, now=midnight + 3600) == 3600
+    assert h.in_window(7200, 2, now=midnight + 3600) == 7200
+    assert h.top(1, live={1: 7200}, now=midnight + 3600) == [(1, 3600)]
+
+
+def test_shared_tracker_sees_other_processes_and_counts_held_sessions_only(tmp_path):
+    from voice import VoiceTracker
+
+    path = str(tmp_path / "data.db")
+    first = VoiceTracker(SqliteStore(path, shared=True), str(tmp_path / "a.json"), history=history(), owner="a")
+    second = VoiceTracker(SqliteStore(path, shared=True), str(tmp_path / "b.json"), history=history(), owner="b")
+    first.sync([(1, 10)])
+    second.sync([(1, 20), (2, 20)])
+    assert first.sessions[1][2] and not second.sessions[1][2]
+    first.sessions[1][0] -= 120
+    second.sessions[1][0] -= 120
+    second.sessions[2][0] -= 30
+    # Seul le détenteur du bail ajoute le temps en cours
+    assert second.live() == {2: 30}
+    assert second.total(1) == (0, True)
+
+    first.checkpoint()
+    second.checkpoint()
+    first.checkpoint()
+    # Chaque processus relit l'historique crédité par l'autre (fenêtre de 2 jours : insensible à minuit)
+    assert second.period(1, 2) == first.period(1, 2) == 120
+    assert dict(second.top_period(2)) == dict(first.top_period(2)) == {1: 120, 2: 30}
@@ -0,0 +1,35 @@
+import asyncio
+import zipfile
+
+from avatars import ZipWriter
+
+
+def test_bounded_queue_writes_every_file(tmp_path):
+    out = str(tmp_path / "avatars.zip")
+
+    async def scenario():
+        writer = ZipWriter(out, maxsize=2)
+        writer.start()
+        # Plus de fichiers que de places dans la file : les producteurs attendent sans bloquer la boucle
+        await asyncio.gather(*(writer.put(f"{i}.png", b"x" * i, "png") for i in range(20)))
+        assert writer.queue.qsize() <= 2
+        await writer.close()
+        await asyncio.get_running_loop().run_in_executor(None, writer.join)
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.error is None and writer.written == 20
+    with zipfile.ZipFile(out) as zf:
+        assert sorted(zf.namelist()) == sorted(f"{i}.png" for i in range(20))
+
+
+def test_failed_writer_does_not_block_producers(tmp_path):
+    async def scenario():
+        writer = ZipWriter(str(tmp_path / "absent" / "avatars.zip"), maxsize=1)
+        writer.start()
+        await asyncio.gather(*(writer.put(f"{i}.png", b"x", "png") for i in range(5)))
+        await writer.close()
+        await asyncio.get_running_loop().run_in_executor(None, writer.join)
+        return writer
+
+    assert isinstance(asyncio.run(scenario()).error, OSError)
@@ -0,0 +1,353 @@
+import asyncio
+import bisect
+import collections
+import heapq
+import logging
+import time
+
+import aiohttp
+import discord
+
+from logs import log
+
+
+class RuleIndex:
+    """Règles de rôle voc compilées en intervalles disjoints.
+
+    Les bornes (min et max + 1 de chaque règle) sont triées ; chaque segment
+    [bounds[i], bounds[i + 1]) porte le jeu de rôles qui s'y applique, d'où une
+    recherche en O(log r) par dichotomie. `spans` garde, par rôle, les plages
+    fusionnées utilisées par /vocrole_list.
+    """
+
+    EMPTY = frozenset()
+
+    def __init__(self, rules):
+        rules = [(int(r["min_seconds"]), int(r["max_seconds"]), int(r["role_id"])) for r in rules]
+        self.bounds = sorted({mn for mn, _, _ in rules} | {mx + 1 for _, mx, _ in rules})
+        self.segments = [
+            frozenset(rid for mn, mx, rid in rules if mn <= start <= mx)
+            for start in self.bounds
+        ]
+        self.role_ids = frozenset(rid for _, _, rid in rules)
+        self.spans = {}
+        for mn, mx, rid in sorted(rules):
+            spans = self.spans.setdefault(rid, [])
+            if spans and mn <= spans[-1][1] + 1:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], mx))
+            else:
+                spans.append((mn, mx))
+
+    def lookup(self, total):
+        """Jeu de rôles qui s'applique à `total` secondes"""
+        i = bisect.bisect_right(self.bounds, total) - 1
+        return self.segments[i] if i >= 0 else self.EMPTY
+
+    def next_boundary(self, total):
+        """Prochain total (en secondes) auquel le jeu de rôles peut changer, ou None"""
+        i = bisect.bisect_right(self.bounds, total)
+        return self.bounds[i] if i < len(self.bounds) else None
+
+
+class RoleQueue:
+    """File des modifications de rôles, appliquées en un seul `member.edit(roles=...)` par membre.
+
+    Une demande porte sur les rôles gérés (`managed`) et ceux qui doivent en
+    rester (`target`) ; une nouvelle demande pour un membre remplace celle en
+    attente. Le jeu de rôles final est recalculé au moment de l'appel, à partir
+    des rôles actuels du membre. Chaque serveur (un bucket de rate limit par
+    serveur pour cette route) a son propre worker et son propre délai entre
+    appels : il double quand Discord nous fait attendre (429 ou appel
+    ralenti par le rate limiter) et redescend doucement après des succès. Les
+    erreurs transitoires (5xx, réseau) sont retentées avec backoff.
+    """
+
+    def __init__(self, client, pacing=0.25, max_pacing=30.0, max_retries=5, reason="Rôle voc automatique"):
+        self.client = client
+        self.pacing = pacing
+        self.max_pacing = max_pacing
+        self.max_retries = max_retries
+        self.reason = reason
+        self._pending = {}  # guild_id -> {member_id: (rôles gérés, rôles cibles, tentatives)}
+        self._delays = {}  # guild_id -> délai courant entre deux appels
+        self._workers = {}
+        self._recent = collections.deque()  # instants des derniers appels réussis (débit)
+        # Compteurs
+        self.submitted = 0
+        self.deduped = 0
+        self.applied = 0
+        self.noops = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def submit(self, guild_id, member_id, managed, target):
+        pending = self._pending.setdefault(guild_id, {})
+        if member_id in pending:
+            self.deduped += 1
+        pending[member_id] = (frozenset(managed), frozenset(target), 0)
+        self.submitted += 1
+        worker = self._workers.get(guild_id)
+        if worker is None or worker.done():
+            self._workers[guild_id] = asyncio.get_running_loop().create_task(self._worker(guild_id))
+
+    def _slow_down(self, guild_id, wait=0.0):
+        delay = self._delays.get(guild_id, self.pacing)
+        self._delays[guild_id] = min(max(delay * 2, wait), self.max_pacing)
+
+    async def _worker(self, guild_id):
+        pending = self._pending[guild_id]
+        while pending:
+            member_id = next(iter(pending))
+            managed, target, attempts = pending.pop(member_id)
+            try:
+                await self._apply(guild_id, member_id, managed, target)
+            except (discord.Forbidden, discord.NotFound) as e:
+                self._fail(guild_id, member_id, e)
+            except discord.RateLimited as e:
+                self.rate_limited += 1
+                self._slow_down(guild_id, e.retry_after)
+                await self._retry(pending, guild_id, member_id, managed, target, attempts, e)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited += 1
+                    self._slow_down(guild_id)
+                if e.status == 429 or e.status >= 500:
+                    await self._retry(pending, guild_id, member_id, managed, target, attempts, e)
+                else:
+                    self._fail(guild_id, member_id, e)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                await self._retry(pending, guild_id, member_id, managed, target, attempts, e)
+            except Exception as e:
+                self._fail(guild_id, member_id, e)
+            await asyncio.sleep(self._delays.get(guild_id, self.pacing))
+        self._pending.pop(guild_id, None)
+        self._workers.pop(guild_id, None)
+
+    def _fail(self, guild_id, member_id, error):
+        self.errors += 1
+        log("voc_roles.fail", "échec de mise à jour des rôles voc", guild=guild_id, member=member_id,
+            error=repr(error), level=logging.ERROR)
+
+    async def _retry(self, pending, guild_id, member_id, managed, target, attempts, error):
+        if attempts >= self.max_retries:
+            self.errors += 1
+            log("voc_roles.abandon", "rôles voc abandonnés après reprises", guild=guild_id, member=member_id,
+                attempts=attempts, error=repr(error), level=logging.ERROR)
+            return
+        if member_id in pending:
+            return  # une demande plus récente remplace celle-ci
+        # Remise en fin de file, après un backoff
+        self.retries += 1
+        log("voc_roles.retry", "nouvelle tentative", guild=guild_id, member=member_id, attempt=attempts + 1,
+            error=repr(error), level=logging.WARNING)
+        await asyncio.sleep(min(self.pacing * 2 ** attempts, self.max_pacing))
+        if member_id not in pending:
+            pending[member_id] = (managed, target, attempts + 1)
+
+    async def _apply(self, guild_id, member_id, managed, target):
+        guild = self.client.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild is not None else None
+        if member is None:
+            return
+        current = [role for role in member.roles if not role.is_default()]
+        roles = [role for role in current if role.id not in managed]
+        roles += [role for role in (guild.get_role(rid) for rid in target) if role is not None]
+        if {role.id for role in roles} == {role.id for role in current}:
+            self.noops += 1
+            return
+        start = time.monotonic()
+        await member.edit(roles=roles, reason=self.reason)
+        elapsed = time.monotonic() - start
+        delay = self._delays.get(guild_id, self.pacing)
+        if elapsed > max(1.0, 4 * delay):
+            # discord.py a attendu la fin d'un rate limit avant d'envoyer l'appel
+            self._slow_down(guild_id, elapsed)
+        else:
+            self._delays[guild_id] = max(self.pacing, delay * 0.9)
+        self.applied += 1
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - 60:
+            self._recent.popleft()
+
+    def backlog(self):
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "backlog": self.backlog(),
+            "guilds": len(self._workers),
+            "per_minute": sum(1 for t in self._recent if t >= now - 60),
+            "submitted": self.submitted,
+            "deduped": self.deduped,
+            "applied": self.applied,
+            "noops": self.noops,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "max_delay": max(self._delays.values(), default=self.pacing),
+        }
+
+
+class VocRoleReconciler:
+    """Attribution des rôles vocaux pilotée par les événements.
+
+    Au lieu de balayer tous les membres chaque minute, on calcule pour chaque
+    membre en vocal l'instant où son total franchira la prochaine borne d'une
+    règle, et on ne le réévalue qu'à ce moment-là (file de priorité). Les
+    entrées/sorties de vocal et les modifications de règles déclenchent une
+    réévaluation ciblée. Les changements passent par une RoleQueue (un appel par membre).
+
+    `total_of(user_id)` renvoie (secondes cumulées session en cours comprise, en_vocal).
+    `rules_of()` renvoie la liste des règles {min_seconds, max_seconds, role_id, guild_id?} ;
+    une règle sans guild_id s'applique à tous les serveurs.
+    """
+
+    def __init__(self, client, total_of, rules_of, queue=None, batch=100):
+        self.client = client
+        self.total_of = total_of
+        self.rules_of = rules_of
+        self.queue = queue or RoleQueue(client)
+        self.batch = batch  # évaluations enchaînées avant de rendre la main à la boucle
+        self._rules = []
+        self._indexes = {}
+        self._heap = []  # (échéance monotonic, guild_id, member_id, génération)
+        self._generation = {}
+        self._wake = None
+        # Compteurs
+        self.evaluations = 0
+        self.changes = 0
+        self.errors = 0
+        self.load_rules()
+
+    # ---- Règles ----
+    def load_rules(self):
+        self._rules = list(self.rules_of())
+        # Les index sont recompilés paresseusement, uniquement après une modification
+        self._indexes = {}
+
+    def index_for(self, guild_id):
+        """Index compilé des règles applicables à un serveur"""
+        index = self._indexes.get(guild_id)
+        if index is None:
+            index = RuleIndex(r for r in self._rules if r.get("guild_id") in (None, guild_id))
+            self._indexes[guild_id] = index
+        return index
+
+    def refresh_rules(self):
+        """Recharge les règles si elles ont changé ailleurs (autre processus) ; renvoie True si c'est le cas"""
+        if list(self.rules_of()) == self._rules:
+            return False
+        self.rules_changed()
+        return True
+
+    # ---- Planification ----
+    def schedule(self, guild_id, member_id, delay=0.0):
+        key = (guild_id, member_id)
+        generation = self._generation.get(key, 0) + 1
+        self._generation[key] = generation
+        heapq.heappush(self._heap, (time.monotonic() + delay, guild_id, member_id, generation))
+        if self._wake is not None:
+            self._wake.set()
+
+    def member_changed(self, user_id):
+        """À appeler quand le temps vocal d'un utilisateur change de rythme (entrée/sortie)"""
+        for guild in self.client.guilds:
+            if guild.get_member(user_id) is not None:
+                self.schedule(guild.id, user_id)
+
+    def schedule_guild(self, guild):
+        for member in guild.members:
+            self.schedule(guild.id, member.id)
+
+    def schedule_all(self):
+        for guild in self.client.guilds:
+            self.schedule_guild(guild)
+
+    def rules_changed(self, guild=None):
+        """Recharge les règles et réévalue les membres des serveurs concernés.
+
+        `guild` : serveur dont les règles viennent d'être modifiées. Sinon, les
+        serveurs sont déduits des règles ajoutées ou retirées ; une règle
+        globale (sans guild_id) réévalue tous les serveurs. Seuls les membres
+        dont le jeu de rôles diffère génèrent des appels API.
+        """
+        previous = self._rules
+        self.load_rules()
+        changed = [r for r in previous if r not in self._rules] + [r for r in self._rules if r not in previous]
+        guild_ids = {r.get("guild_id") for r in changed}
+        if None in guild_ids:
+            self.schedule_all()
+        elif guild is not None and guild_ids <= {guild.id}:
+            self.schedule_guild(guild)
+        else:
+            for guild_id in guild_ids:
+                target = self.client.get_guild(guild_id)
+                if target is not None:
+                    self.schedule_guild(target)
+
+    # ---- Évaluation ----
+    def _evaluate(self, guild_id, member_id):
+        guild = self.client.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild is not None else None
+        if member is None:
+            self._generation.pop((guild_id, member_id), None)
+            return
+        self.evaluations += 1
+        total, live = self.total_of(member_id)
+        index = self.index_for(guild_id)
+        target = index.lookup(total)
+
+        current = {role.id for role in member.roles} & index.role_ids
+        if current != target:
+            self.changes += 1
+            self.queue.submit(guild_id, member_id, index.role_ids, target)
+
+        if live:
+            boundary = index.next_boundary(total)
+            if boundary is not None:
+                self.schedule(guild_id, member_id, delay=boundary - total)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            done = 0
+            while self._heap and self._heap[0][0] <= now:
+                if done >= self.batch:
+                    # Gros lot (démarrage, changement de règles) : on laisse passer les autres tâches
+                    await asyncio.sleep(0)
+                    now, done = time.monotonic(), 0
+                    continue
+                done += 1
+                _, guild_id, member_id, generation = heapq.heappop(self._heap)
+                if self._generation.get((guild_id, member_id)) != generation:
+                    continue  # remplacé par une planification plus récente
+                try:
+                    self._evaluate(guild_id, member_id)
+                except Exception as e:
+                    self.errors += 1
+                    log("voc_roles.evaluate", "erreur d'évaluation des rôles voc", guild=guild_id, member=member_id,
+                        error=repr(e), level=logging.ERROR)
+            self._wake.clear()
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        """Réconciliation : une évaluation complète au démarrage, puis événementielle."""
+        self._wake = asyncio.Event()
+        self.schedule_all()
+        await self._run()
+
+    def stats(self):
+        return {
+            "scheduled": len(self._heap),
+            "evaluations": self.evaluations,
+            "changes": self.changes,
+            "errors": self.errors,
+            "queue": self.queue.stats(),
+        }
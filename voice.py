@@ -0,0 +1,352 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from array import array
+
+from storage import atomic_write
+
+
+class VoiceHistory:
+    """Temps vocal par jour et par utilisateur, sur les `buckets` derniers jours.
+
+    Chaque utilisateur a un tampon circulaire (array) de cumuls : la case du
+    jour d contient le total vocal jusqu'à la fin de ce jour. Le temps sur
+    une période est donc une différence de deux cases, en O(1), et un
+    classement sur n'importe quelle fenêtre ne coûte qu'un passage sur les
+    utilisateurs actifs. Les jours sont des journées locales
+    (`bucket_seconds` = 3600 donnerait des heures).
+    """
+
+    def __init__(self, buckets=31, bucket_seconds=86400, utc_offset=None):
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self.utc_offset = time.localtime().tm_gmtoff if utc_offset is None else utc_offset
+        # user_id -> [dernier jour écrit, array de cumuls indexée par jour % buckets]
+        self.users = {}
+        # Sauvegarde incrémentale : (user_id, jour) -> secondes pas encore écrites dans le store
+        self._pending = {}
+        self._pruned_day = None
+
+    def day(self, ts=None):
+        return int(((time.time() if ts is None else ts) + self.utc_offset) // self.bucket_seconds)
+
+    def _cumulative(self, entry, day):
+        """Cumul à la fin de `day` (day doit être dans la fenêtre du tampon)"""
+        last, cum = entry
+        if day >= last:
+            return cum[last % self.buckets]
+        if day <= last - self.buckets:
+            return 0
+        return cum[day % self.buckets]
+
+    def add_day(self, user_id, day, seconds, pending=True):
+        entry = self.users.get(user_id)
+        if entry is None:
+            entry = self.users[user_id] = [day, array("q", bytes(8 * self.buckets))]
+        last, cum = entry
+        size = self.buckets
+        if day > last:
+            # Jours sans activité : le cumul reste celui du dernier jour écrit
+            total = cum[last % size]
+            for d in range(max(last + 1, day - size + 1), day + 1):
+                cum[d % size] = total
+            entry[0] = last = day
+        elif day <= last - size:
+            return
+        # Le cumul de `day` et de tous les jours suivants augmente
+        for d in range(day, last + 1):
+            cum[d % size] += seconds
+        if pending:
+            key = (user_id, day)
+            self._pending[key] = self._pending.get(key, 0) + seconds
+
+    def add(self, user_id, seconds, end=None):
+        """Répartit `seconds` terminées à `end` sur les jours qu'elles couvrent"""
+        end = time.time() if end is None else end
+        start = end - seconds
+        day, last_day = self.day(start), self.day(end)
+        while day <= last_day:
+            boundary = (day + 1) * self.bucket_seconds - self.utc_offset
+            chunk = min(end, boundary) - start
+            if chunk >= 1:
+                self.add_day(user_id, day, int(chunk))
+            start = boundary
+            day += 1
+
+    def period(self, user_id, days, now=None):
+        """Secondes de vocal sur les `days` derniers jours (aujourd'hui compris)"""
+        if not 0 < days < self.buckets:
+            raise ValueError(f"période de 1 à {self.buckets - 1} jours")
+        entry = self.users.get(user_id)
+        if entry is None:
+            return 0
+        today = self.day(now)
+        return self._cumulative(entry, today) - self._cumulative(entry, today - days)
+
+    def in_window(self, seconds, days, now=None):
+        """Part des `seconds` terminées à `now` qui tombe dans les `days` derniers jours"""
+        now = time.time() if now is None else now
+        start = (self.day(now) - days + 1) * self.bucket_seconds - self.utc_offset
+        return max(0, min(int(seconds), int(now - start)))
+
+    def top(self, days, limit=10, live=None, now=None):
+        """Top [(user_id, secondes)] sur les `days` derniers jours ; `live` ajoute les sessions en cours"""
+        if not 0 < days < self.buckets:
+            raise ValueError(f"période de 1 à {self.buckets - 1} jours")
+        live = live or {}
+        now = time.time() if now is None else now
+        today = self.day(now)
+        since = today - days
+        totals = {}
+        for user_id, entry in self.users.items():
+            if entry[0] > since:
+                totals[user_id] = self._cumulative(entry, today) - self._cumulative(entry, since)
+        for user_id, seconds in live.items():
+            # Une session commencée avant la fenêtre n'y compte que pour sa partie récente
+            totals[user_id] = totals.get(user_id, 0) + self.in_window(seconds, days, now)
+        return heapq.nlargest(limit, ((uid, secs) for uid, secs in totals.items() if secs > 0), key=lambda x: x[1])
+
+    # ---- Persistance ----
+    def drain(self, now=None):
+        """Secondes ajoutées depuis le dernier appel, [(user_id, jour, secondes)], et jour de purge.
+
+        Une fois par jour, les utilisateurs sortis de la fenêtre sont oubliés et
+        le jour renvoyé (sinon None) indique au store ce qui peut être effacé.
+        """
+        today = self.day(now)
+        prune_before = None
+        if self._pruned_day != today:
+            self._pruned_day = today
+            prune_before = today - self.buckets + 1
+            for user_id in [uid for uid, entry in self.users.items() if entry[0] < prune_before]:
+                del self.users[user_id]
+        rows = [(user_id, day, seconds) for (user_id, day), seconds in self._pending.items()]
+        self._pending = {}
+        return rows, prune_before
+
+    def restore(self, rows):
+        """Recharge l'historique [(user_id, jour, secondes)] lu dans le store (déjà sauvegardé)"""
+        for user_id, day, seconds in rows:
+            self.add_day(user_id, day, seconds, pending=False)
+
+    def load(self, store, now=None):
+        """Recharge depuis le store les jours encore dans la fenêtre (remplace l'historique en mémoire)"""
+        self.users = {}
+        self.restore(store.voc_days(self.day(now) - self.buckets + 1))
+
+    def stats(self):
+        return {"users": len(self.users), "buckets": self.buckets}
+
+
+class VoiceTracker:
+    """Comptabilité des sessions vocales en mémoire.
+
+    Les sessions en cours sont gardées par utilisateur avec un départ en
+    horloge monotone (insensible aux sauts de l'horloge système). Les
+    changements de salon, mutes et sourdines ne touchent pas à la persistance :
+    les totaux ne sont écrits qu'à la sortie du vocal et à chaque checkpoint
+    (toutes les `checkpoint_interval` secondes, en un seul lot). Le checkpoint
+    écrit aussi un petit fichier listant les sessions en cours, utilisé pour
+    reprendre les sessions après un redémarrage.
+
+    Avec `history`, le temps compté alimente aussi l'historique par jour
+    (VoiceHistory), reporté dans le store à chaque checkpoint.
+
+    Plusieurs processus (voir launcher.py) peuvent voir le même utilisateur en
+    vocal sur des serveurs différents : seul celui qui détient son bail
+    (`Store.claim_voc`, au nom de `owner`) crédite la session. Les autres la
+    suivent sans la compter et reprennent le bail s'il est rendu ou expire.
+    """
+
+    def __init__(self, store, checkpoint_path, checkpoint_interval=60.0, recover_window=600.0,
+                 history=None, owner="local"):
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.history = history
+        if history is not None:
+            history.load(store)
+        self.checkpoint_interval = checkpoint_interval
+        self.recover_window = recover_window
+        self.owner = owner
+        # Bail renouvelé à chaque checkpoint ; quelques checkpoints manqués le font expirer
+        self.lease = 3 * checkpoint_interval
+        # user_id -> [début monotonic non encore compté, {guild_id en vocal}, session comptée ici]
+        self.sessions = {}
+        self._recovered = False
+        # Compteurs
+        self.checkpoints = 0
+        self.recovered_sessions = 0
+
+    # ---- Événements ----
+    def join(self, user_id, guild_id, started=None):
+        session = self.sessions.get(user_id)
+        if session is None:
+            counted = user_id in self.store.claim_voc([user_id], self.owner, self.lease)
+            self.sessions[user_id] = [started or time.monotonic(), {guild_id}, counted]
+            return True
+        session[1].add(guild_id)
+        return False
+
+    def leave(self, user_id, guild_id):
+        session = self.sessions.get(user_id)
+        if session is None:
+            return False
+        session[1].discard(guild_id)
+        if session[1]:
+            return False
+        del self.sessions[user_id]
+        if session[2]:
+            self._credit(user_id, time.monotonic() - session[0])
+            self.store.release_voc([user_id], self.owner)
+        return True
+
+    def handle_voice_state(self, member, before, after):
+        """Renvoie True si l'utilisateur entre ou sort du vocal (les déplacements et mutes ne changent rien)"""
+        if before.channel is None and after.channel is not None:
+            return self.join(member.id, member.guild.id)
+        if before.channel is not None and after.channel is None:
+            return self.leave(member.id, member.guild.id)
+        return False
+
+    def _credit(self, user_id, seconds):
+        self.store.add_voc(user_id, int(seconds))
+        if self.history is not None:
+            self.history.add(user_id, int(seconds))
+
+    # ---- Lecture ----
+    # Seules les sessions comptées ici ajoutent leur temps en cours : celui des
+    # autres est crédité (et lu dans le store) par le processus qui tient le bail.
+    def live_seconds(self, user_id):
+        session = self.sessions.get(user_id)
+        return int(time.monotonic() - session[0]) if session and session[2] else 0
+
+    def live(self):
+        """{user_id: secondes non encore comptées} des sessions en cours comptées ici"""
+        now = time.monotonic()
+        return {uid: int(now - session[0]) for uid, session in self.sessions.items() if session[2]}
+
+    def total(self, user_id):
+        """(total session en cours comprise, en_vocal)"""
+        total, _ = self.store.get_voc(user_id)
+        if user_id not in self.sessions:
+            return total, False
+        return total + self.live_seconds(user_id), True
+
+    def period(self, user_id, days):
+        """Secondes de vocal sur les `days` derniers jours, session en cours comprise"""
+        live = self.history.in_window(self.live_seconds(user_id), days)
+        return self.history.period(user_id, days) + live
+
+    def top_period(self, days, limit=10):
+        return self.history.top(days, limit, live=self.live())
+
+    # ---- Checkpoints ----
+    def checkpoint(self):
+        """Reporte le temps des sessions en cours dans les totaux (un seul lot d'écritures)."""
+        now = time.monotonic()
+        # Renouvelle nos baux et tente de reprendre ceux des sessions suivies sans être comptées
+        held = self.store.claim_voc(list(self.sessions), self.owner, self.lease)
+        for user_id, session in self.sessions.items():
+            elapsed = int(now - session[0])
+            if elapsed >= 1:
+                if session[2]:
+                    self._credit(user_id, elapsed)
+                # On ne retire que les secondes entières comptées, la fraction est conservée ;
+                # sans bail, le temps écoulé est compté par un autre processus
+                session[0] += elapsed
+            session[2] = user_id in held
+        if self.history is not None:
+            # Un seul lot par checkpoint : une ligne par utilisateur et par jour touché
+            rows, prune_before = self.history.drain()
+            self.store.add_voc_days(rows)
+            if prune_before is not None:
+                self.store.prune_voc_days(prune_before)
+            if self.store.shared:
+                # Les autres processus créditent aussi : la fenêtre est relue depuis la base
+                self.history.load(self.store)
+        self.checkpoints += 1
+        return json.dumps({
+            "saved_at": time.time(),
+            "sessions": {str(uid): sorted(session[1]) for uid, session in self.sessions.items()},
+        })
+
+    async def run(self):
+        """Boucle des checkpoints (lancée une seule fois, voir startup.Startup.supervise)"""
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            payload = self.checkpoint()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, atomic_write, self.checkpoint_path, payload)
+            except OSError as e:
+                print(f"❌ Erreur lors du checkpoint vocal: {e}")
+
+    def flush_sync(self):
+        """Dernier checkpoint à l'arrêt du bot ; les baux sont rendus aux autres processus."""
+        atomic_write(self.checkpoint_path, self.checkpoint())
+        self.store.release_voc([uid for uid, session in self.sessions.items() if session[2]], self.owner)
+
+    def _load_checkpoint(self):
+        saved = {}
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, "r") as f:
+                    checkpoint = json.load(f)
+                saved = {int(uid): checkpoint["saved_at"] for uid in checkpoint["sessions"]}
+            except (OSError, ValueError, KeyError):
+                saved = {}
+        # Anciennes données : last_join tenait lieu de checkpoint
+        for user_id, last_join in self.store.voc_sessions().items():
+            saved.setdefault(user_id, last_join)
+            total, _ = self.store.get_voc(user_id)
+            self.store.set_voc(user_id, total, None)
+        return saved
+
+    def sync(self, in_voice):
+        """Aligne les sessions sur l'état vocal réel ; `in_voice` = [(user_id, guild_id)].
+
+        Au premier appel, les utilisateurs toujours en vocal dont le dernier
+        checkpoint date de moins de `recover_window` secondes récupèrent le
+        temps écoulé depuis. Les appels suivants (reconnexions) ferment les
+        sessions manquées et ouvrent les nouvelles.
+
+        Renvoie les ids des utilisateurs dont la session a été ouverte ou fermée.
+        """
+        now_wall = time.time()
+        now = time.monotonic()
+        saved = {} if self._recovered else self._load_checkpoint()
+        self._recovered = True
+
+        present = {}
+        for user_id, guild_id in in_voice:
+            present.setdefault(user_id, set()).add(guild_id)
+        changed = []
+        for user_id in list(self.sessions):
+            if user_id not in present:
+                for guild_id in list(self.sessions[user_id][1]):
+                    self.leave(user_id, guild_id)
+                changed.append(user_id)
+        opened = []
+        for user_id, guild_ids in present.items():
+            if user_id in self.sessions:
+                self.sessions[user_id][1] = guild_ids
+                continue
+            opened.append(user_id)
+        held = self.store.claim_voc(opened, self.owner, self.lease)
+        for user_id in opened:
+            started = now
+            saved_at = saved.get(user_id)
+            if user_id in held and saved_at is not None and 0 <= now_wall - saved_at <= self.recover_window:
+                started = now - (now_wall - saved_at)
+                self.recovered_sessions += 1
+            self.sessions[user_id] = [started, present[user_id], user_id in held]
+        return changed + opened
+
+    def stats(self):
+        return {
+            "live": len(self.sessions),
+            "checkpoints": self.checkpoints,
+            "recovered": self.recovered_sessions,
+            "history_users": len(self.history.users) if self.history is not None else 0,
+        }